@@ -20,6 +20,7 @@ import functools
 import re
 
 from nova import availability_zones
+from nova import cache_utils
 from nova import context
 from nova import db
 from nova import exception
@@ -27,7 +28,6 @@ from nova.network import model as network_model
 from nova.objects import instance as instance_obj
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
-from nova.openstack.common import memorycache
 from nova.openstack.common import timeutils
 from nova.openstack.common import uuidutils
 
@@ -42,7 +42,7 @@ def memoize(func):
     def memoizer(context, reqid):
         global _CACHE
         if not _CACHE:
-            _CACHE = memorycache.get_client()
+            _CACHE = cache_utils.get_client()
         key = "%s:%s" % (func.__name__, reqid)
         key = str(key)
         value = _CACHE.get(key)
@@ -30,6 +30,7 @@ from nova.compute import task_states
 from nova.compute import utils as compute_utils
 from nova.compute import vm_states
 from nova import exception
+from nova.network import model as network_model
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
 from nova import quota
@@ -319,8 +320,15 @@ def dict_to_query_str(params):
 def get_networks_for_instance_from_nw_info(nw_info):
     networks = {}
     for vif in nw_info:
-        ips = vif.fixed_ips()
-        floaters = vif.floating_ips()
+        # The VIFs may be the dicts of get_nw_info_primitive_for_instance(),
+        # so only the fixed IPs are turned into the network model here
+        ips = []
+        for subnet in vif['network']['subnets']:
+            for ip in subnet['ips']:
+                if not isinstance(ip, network_model.FixedIP):
+                    ip = network_model.FixedIP.hydrate(ip)
+                ips.append(ip)
+        floaters = [floater for ip in ips for floater in ip['floating_ips']]
         label = vif['network']['label']
         if label not in networks:
             networks[label] = {'ips': [], 'floating_ips': []}
@@ -352,7 +360,7 @@ def get_networks_for_instance(context, instance):
                                       'mac_address': 'aa:aa:aa:aa:aa:aa'}]},
          ...}
     """
-    nw_info = compute_utils.get_nw_info_for_instance(instance)
+    nw_info = compute_utils.get_nw_info_primitive_for_instance(instance)
     return get_networks_for_instance_from_nw_info(nw_info)
 
 
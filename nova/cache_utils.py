@@ -0,0 +1,192 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Memcache clients, with an in process cache when no server is set.
+
+This replaces the client of nova.openstack.common.memorycache, whose get()
+walks the whole cache, with one whose operations do not depend on the
+number of items and which can evict the least recently used ones.
+"""
+
+import heapq
+
+from oslo.config import cfg
+
+from nova.openstack.common import timeutils
+
+cache_opts = [
+    cfg.IntOpt('memory_cache_max_items',
+               default=0,
+               help='Maximum number of items kept by the in process cache, '
+                    'evicting the least recently used ones. 0 means '
+                    'unlimited.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(cache_opts)
+CONF.import_opt('memcached_servers', 'nova.openstack.common.memorycache')
+
+
+def get_client(memcached_servers=None):
+    """Return a memcache client, or an in process Client if no memcached
+    servers are configured or the memcache module is missing.
+    """
+    if not memcached_servers:
+        memcached_servers = CONF.memcached_servers
+    if memcached_servers:
+        try:
+            import memcache
+            return memcache.Client(memcached_servers, debug=0)
+        except ImportError:
+            pass
+
+    return Client()
+
+
+# Indexes into the entries of the LRU list.
+_PREV, _NEXT, _KEY, _VALUE, _TIMEOUT = range(5)
+
+
+class Client(object):
+    """Replicates a tiny subset of memcached client interface.
+
+    Items are kept in a dict for constant time lookups and in a circular
+    doubly linked list ordered by use, so the least recently used item can
+    be evicted once max_items is reached.  Expiry times are kept in a heap,
+    so expired items are dropped without walking the whole cache.
+    """
+
+    def __init__(self, max_items=None):
+        if max_items is None:
+            max_items = CONF.memory_cache_max_items
+        self.max_items = max_items
+        self.cache = {}
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None, 0]
+        self._timeouts = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _unlink(self, entry):
+        entry[_PREV][_NEXT] = entry[_NEXT]
+        entry[_NEXT][_PREV] = entry[_PREV]
+
+    def _link(self, entry):
+        """Make entry the most recently used item."""
+        last = self._root[_PREV]
+        entry[_PREV] = last
+        entry[_NEXT] = self._root
+        last[_NEXT] = self._root[_PREV] = entry
+
+    def _remove(self, key):
+        self._unlink(self.cache.pop(key))
+
+    def _expire(self):
+        """Drop the items whose timeout has passed."""
+        now = timeutils.utcnow_ts()
+        timeouts = self._timeouts
+        while timeouts and now >= timeouts[0][0]:
+            timeout, key = heapq.heappop(timeouts)
+            entry = self.cache.get(key)
+            # the heap keeps stale timeouts of items set again or deleted
+            if entry is not None and entry[_TIMEOUT] == timeout:
+                self._remove(key)
+
+    def _push_timeout(self, timeout, key):
+        """Add an item's timeout to the heap.
+
+        Once stale timeouts make up most of the heap, it is rebuilt from
+        the items, so keys set again and again with long timeouts do not
+        grow it without bound.
+        """
+        timeouts = self._timeouts
+        if len(timeouts) < 2 * len(self.cache) + 16:
+            heapq.heappush(timeouts, (timeout, key))
+        else:
+            # the rebuilt heap includes the timeout of the item being set
+            timeouts[:] = [(entry[_TIMEOUT], item_key)
+                           for item_key, entry in self.cache.iteritems()
+                           if entry[_TIMEOUT]]
+            heapq.heapify(timeouts)
+
+    def get(self, key):
+        """Retrieves the value for a key or None."""
+        self._expire()
+
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._unlink(entry)
+        self._link(entry)
+        return entry[_VALUE]
+
+    def set(self, key, value, time=0, min_compress_len=0):
+        """Sets the value for a key."""
+        timeout = 0
+        if time != 0:
+            timeout = timeutils.utcnow_ts() + time
+
+        self._expire()
+        entry = self.cache.get(key)
+        if entry is not None:
+            self._unlink(entry)
+            entry[_VALUE] = value
+            entry[_TIMEOUT] = timeout
+        else:
+            if self.max_items and len(self.cache) >= self.max_items:
+                self._remove(self._root[_NEXT][_KEY])
+                self.evictions += 1
+            entry = [None, None, key, value, timeout]
+            self.cache[key] = entry
+        self._link(entry)
+
+        if timeout:
+            self._push_timeout(timeout, key)
+        return True
+
+    def add(self, key, value, time=0, min_compress_len=0):
+        """Sets the value for a key if it doesn't exist."""
+        self._expire()
+        if key in self.cache:
+            return False
+        return self.set(key, value, time, min_compress_len)
+
+    def incr(self, key, delta=1):
+        """Increments the value for a key."""
+        self._expire()
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        new_value = int(entry[_VALUE]) + delta
+        entry[_VALUE] = str(new_value)
+        return new_value
+
+    def delete(self, key, time=0):
+        """Deletes the value associated with a key."""
+        if key in self.cache:
+            self._remove(key)
+
+    def get_stats(self):
+        """Returns the cache statistics, shaped like memcache's."""
+        return [('memory', {'curr_items': len(self.cache),
+                            'get_hits': self.hits,
+                            'get_misses': self.misses,
+                            'evictions': self.evictions})]
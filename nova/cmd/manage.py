@@ -65,6 +65,7 @@ from nova.api.ec2 import ec2utils
 from nova import availability_zones
 from nova.cells import rpc_driver
 from nova.compute import flavors
+from nova.compute import rpcapi as compute_rpcapi
 from nova import config
 from nova import context
 from nova import db
@@ -91,6 +92,7 @@ CONF.import_opt('vlan_start', 'nova.network.manager')
 CONF.import_opt('vpn_start', 'nova.network.manager')
 CONF.import_opt('default_floating_pool', 'nova.network.floating_ips')
 CONF.import_opt('public_interface', 'nova.network.linux_net')
+CONF.import_opt('compute_topic', 'nova.compute.rpcapi')
 
 QUOTAS = quota.QUOTAS
 
@@ -873,6 +875,48 @@ class HostCommands(object):
             print("%-25s\t%-15s" % (h['host'], h['availability_zone']))
 
 
+class ImageCommands(object):
+    """Manage the image caches of compute hosts."""
+
+    @args('--image_ids', metavar='<image ids>',
+          help='Comma separated list of image ids')
+    @args('--host', metavar='<host>',
+          help='Comma separated list of compute hosts, all by default')
+    @args('--zone', metavar='<zone>', help='Availability zone of the hosts')
+    def prefetch(self, image_ids, host=None, zone=None):
+        """Download images into the image cache of compute hosts.
+
+        The hosts download the images in the background, this command
+        returns once the requests are sent.
+        """
+        image_ids = [i.strip() for i in (image_ids or '').split(',')
+                     if i.strip()]
+        if not image_ids:
+            print(_("error: no image ids given, use --image_ids"))
+            return(2)
+        ctxt = context.get_admin_context()
+        services = db.service_get_all_by_topic(ctxt, CONF.compute_topic)
+        if zone:
+            services = availability_zones.set_availability_zones(ctxt,
+                                                                 services)
+            services = [s for s in services if s['availability_zone'] == zone]
+        hosts = sorted(set(s['host'] for s in services))
+        if host:
+            wanted = set(h.strip() for h in host.split(','))
+            unknown = wanted - set(hosts)
+            if unknown:
+                print(_("error: unknown compute hosts: %s") %
+                      ', '.join(sorted(unknown)))
+                return(2)
+            hosts = [h for h in hosts if h in wanted]
+
+        compute_api = compute_rpcapi.ComputeAPI()
+        for h in hosts:
+            compute_api.prefetch_images(ctxt, h, image_ids)
+            print(_("Prefetching %(images)s on %(host)s") %
+                  {'images': ', '.join(image_ids), 'host': h})
+
+
 class DbCommands(object):
     """Class for managing the database."""
 
@@ -1250,6 +1294,7 @@ CATEGORIES = {
     'flavor': FlavorCommands,
     'floating': FloatingIpCommands,
     'host': HostCommands,
+    'image': ImageCommands,
     # Deprecated, remove in Icehouse
     'instance_type': FlavorCommands,
     'logs': GetLogCommands,
@@ -29,6 +29,7 @@ from nova import utils
 
 CONF = cfg.CONF
 CONF.import_opt('scheduler_topic', 'nova.scheduler.rpcapi')
+CONF.import_opt('scheduler_workers', 'nova.scheduler.manager')
 
 
 def main():
@@ -37,5 +38,5 @@ def main():
     utils.monkey_patch()
     server = service.Service.create(binary='nova-scheduler',
                                     topic=CONF.scheduler_topic)
-    service.serve(server)
+    service.serve(server, workers=CONF.scheduler_workers)
     service.wait()
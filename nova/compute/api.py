@@ -523,6 +523,11 @@ class API(base.Base):
         return options_from_image
 
     def _apply_instance_name_template(self, context, instance, index):
+        self._populate_instance_name_from_template(instance, index)
+        instance.save()
+        return instance
+
+    def _populate_instance_name_from_template(self, instance, index):
         params = {
             'uuid': instance['uuid'],
             'name': instance['display_name'],
@@ -538,8 +543,6 @@ class API(base.Base):
         instance.display_name = new_name
         if not instance.get('hostname', None):
             instance.hostname = utils.sanitize_hostname(new_name)
-        instance.save()
-        return instance
 
     def _check_config_drive(self, config_drive):
         if config_drive:
@@ -719,18 +722,26 @@ class API(base.Base):
         LOG.debug(_("Going to run %s instances...") % num_instances)
         instances = []
         try:
-            for i in xrange(num_instances):
+            if num_instances > 1:
+                instances.extend(self._create_db_entries_for_new_instances(
+                        context, boot_meta, base_options, security_groups,
+                        block_device_mapping, num_instances))
+                for instance in instances:
+                    self._populate_instance_for_bdm(context, instance,
+                            instance_type, boot_meta, block_device_mapping)
+            else:
                 instance = instance_obj.Instance()
                 instance.update(base_options)
-                instance = self.create_db_entry_for_new_instance(
+                instances.append(self.create_db_entry_for_new_instance(
                         context, instance_type, boot_meta, instance,
                         security_groups, block_device_mapping,
-                        num_instances, i)
+                        num_instances, 0))
 
-                instances.append(instance)
+            for instance in instances:
                 self._validate_bdm(context, instance)
-                # send a state update notification for the initial create to
-                # show it going from non-existent to BUILDING
+            # send a state update notification for the initial create to
+            # show it going from non-existent to BUILDING
+            for instance in instances:
                 notifications.send_update_with_states(context, instance, None,
                         vm_states.BUILDING, None, None, service="api")
 
@@ -1086,6 +1097,32 @@ class API(base.Base):
 
         return instance
 
+    def _create_db_entries_for_new_instances(self, context, image,
+            base_options, security_group, block_device_mapping,
+            num_instances):
+        """Create the DB entries for several new instances at once.
+
+        This does what create_db_entry_for_new_instance() does for each
+        instance, except for the block device mappings, but creates all of
+        the instance records in one database transaction.
+        """
+        new_instances = []
+        for index in xrange(num_instances):
+            instance = instance_obj.Instance()
+            instance.update(base_options)
+            self._populate_instance_for_create(instance, image, index,
+                                               security_group)
+            self._populate_instance_names(instance, num_instances)
+            self._populate_instance_shutdown_terminate(instance, image,
+                                                       block_device_mapping)
+            # The uuid is already set, so the display name template can be
+            # applied before the instance is created.
+            self._populate_instance_name_from_template(instance, index)
+            new_instances.append(instance)
+
+        self.security_group_api.ensure_default(context)
+        return instance_obj.InstanceList.create_bulk(context, new_instances)
+
     def _check_create_policies(self, context, availability_zone,
             requested_networks, block_device_mapping):
         """Check policies for create()."""
@@ -376,7 +376,7 @@ class ComputeVirtAPI(virtapi.VirtAPI):
 class ComputeManager(manager.SchedulerDependentManager):
     """Manages the running instances from creation to destruction."""
 
-    RPC_API_VERSION = '2.36'
+    RPC_API_VERSION = '2.37'
 
     def __init__(self, compute_driver=None, *args, **kwargs):
         """Load configuration options and connect to the hypervisor."""
@@ -856,6 +856,15 @@ class ComputeManager(manager.SchedulerDependentManager):
             return self.driver.refresh_instance_security_rules(instance)
         return _sync_refresh()
 
+    @exception.wrap_exception(notifier=notifier, publisher_id=publisher_id())
+    def prefetch_images(self, context, image_ids):
+        """Download images into the driver's image cache."""
+        try:
+            self.driver.prefetch_images(context, image_ids)
+        except NotImplementedError:
+            LOG.warn(_('Image prefetch is not supported by the %s driver'),
+                     self.driver.__class__.__name__)
+
     @exception.wrap_exception(notifier=notifier, publisher_id=publisher_id())
     def refresh_provider_fw_rules(self, context):
         """This call passes straight through to the virtualization driver."""
@@ -1017,19 +1026,41 @@ class ComputeManager(manager.SchedulerDependentManager):
 
         except exception.RescheduledException as e:
             # Instance build encountered an error, and has been rescheduled.
+            self._release_scheduler_claim(context, node, instance,
+                                          filter_properties)
             notify("error", msg=unicode(e))  # notify that build failed
 
         except exception.BuildAbortException as e:
             # Instance build aborted due to a non-failure
             LOG.info(e)
+            self._release_scheduler_claim(context, node, instance,
+                                          filter_properties)
             notify("end", msg=unicode(e))  # notify that build is done
 
         except Exception as e:
             # Instance build encountered a non-recoverable error:
             with excutils.save_and_reraise_exception():
+                self._release_scheduler_claim(context, node, instance,
+                                              filter_properties)
                 self._set_instance_error_state(context, instance['uuid'])
                 notify("error", msg=unicode(e))  # notify that build failed
 
+    def _release_scheduler_claim(self, context, node, instance,
+                                 filter_properties):
+        """Give back the resources claimed by the scheduler for a build
+        which failed before the resource tracker claimed them.
+        """
+        if not filter_properties.pop('scheduler_claim', False):
+            return
+        if node is None:
+            node = self.driver.get_available_nodes()[0]
+        try:
+            rt = self._get_resource_tracker(node)
+            rt.release_scheduler_claim(context.elevated(), instance)
+        except Exception:
+            LOG.exception(_("Failed to release the resources claimed by "
+                            "the scheduler"), instance=instance)
+
     def _prebuild_instance(self, context, instance):
         self._check_instance_exists(context, instance)
 
@@ -1077,6 +1108,8 @@ class ComputeManager(manager.SchedulerDependentManager):
         try:
             limits = filter_properties.get('limits', {})
             with rt.instance_claim(context, instance, limits):
+                # The resource tracker's claim replaces the scheduler's.
+                filter_properties.pop('scheduler_claim', None)
                 macs = self.driver.macs_for_instance(instance)
 
                 network_info = self._allocate_network(context, instance,
@@ -4310,27 +4343,36 @@ class ComputeManager(manager.SchedulerDependentManager):
                 # they just don't get the info in the usage events.
                 return
 
-            refreshed = timeutils.utcnow()
+            # Fetch the usage of this audit period for all of the counters
+            # at once, then the usage of the previous period for those which
+            # have none yet, and finally send all of the updates together.
+            batch = self.conductor_api.batched(context)
             for bw_ctr in bw_counters:
-                # Allow switching of greenthreads between queries.
+                batch.bw_usage_get(bw_ctr['uuid'], start_time,
+                                   bw_ctr['mac_address'])
+            usages = batch.commit()
+
+            for bw_ctr, usage in zip(bw_counters, usages):
+                if not usage:
+                    batch.bw_usage_get(bw_ctr['uuid'], prev_time,
+                                       bw_ctr['mac_address'])
+            prev_usages = iter(batch.commit())
+
+            refreshed = timeutils.utcnow()
+            for bw_ctr, usage in zip(bw_counters, usages):
+                # Allow switching of greenthreads between counters.
                 greenthread.sleep(0)
                 bw_in = 0
                 bw_out = 0
                 last_ctr_in = None
                 last_ctr_out = None
-                usage = self.conductor_api.bw_usage_get(context,
-                                                        bw_ctr['uuid'],
-                                                        start_time,
-                                                        bw_ctr['mac_address'])
                 if usage:
                     bw_in = usage['bw_in']
                     bw_out = usage['bw_out']
                     last_ctr_in = usage['last_ctr_in']
                     last_ctr_out = usage['last_ctr_out']
                 else:
-                    usage = self.conductor_api.bw_usage_get(
-                        context, bw_ctr['uuid'], prev_time,
-                        bw_ctr['mac_address'])
+                    usage = next(prev_usages)
                     if usage:
                         last_ctr_in = usage['last_ctr_in']
                         last_ctr_out = usage['last_ctr_out']
@@ -4349,16 +4391,16 @@ class ComputeManager(manager.SchedulerDependentManager):
                     else:
                         bw_out += (bw_ctr['bw_out'] - last_ctr_out)
 
-                self.conductor_api.bw_usage_update(context,
-                                                   bw_ctr['uuid'],
-                                                   bw_ctr['mac_address'],
-                                                   start_time,
-                                                   bw_in,
-                                                   bw_out,
-                                                   bw_ctr['bw_in'],
-                                                   bw_ctr['bw_out'],
-                                                   last_refreshed=refreshed,
-                                                   update_cells=update_cells)
+                batch.bw_usage_update(bw_ctr['uuid'],
+                                      bw_ctr['mac_address'],
+                                      start_time,
+                                      bw_in,
+                                      bw_out,
+                                      bw_ctr['bw_in'],
+                                      bw_ctr['bw_out'],
+                                      last_refreshed=refreshed,
+                                      update_cells=update_cells)
+            batch.commit()
 
     def _get_host_volume_bdms(self, context, host):
         """Return all block device mappings on a compute host."""
@@ -4374,15 +4416,15 @@ class ComputeManager(manager.SchedulerDependentManager):
 
     def _update_volume_usage_cache(self, context, vol_usages):
         """Updates the volume usage cache table with a list of stats."""
+        batch = self.conductor_api.batched(context)
         for usage in vol_usages:
-            # Allow switching of greenthreads between queries.
-            greenthread.sleep(0)
-            self.conductor_api.vol_usage_update(context, usage['volume'],
-                                                usage['rd_req'],
-                                                usage['rd_bytes'],
-                                                usage['wr_req'],
-                                                usage['wr_bytes'],
-                                                usage['instance'])
+            batch.vol_usage_update(usage['volume'],
+                                   usage['rd_req'],
+                                   usage['rd_bytes'],
+                                   usage['wr_req'],
+                                   usage['wr_bytes'],
+                                   usage['instance'])
+        batch.commit()
 
     @periodic_task.periodic_task
     def _poll_volume_usage(self, context, start_time=None):
@@ -4430,16 +4472,23 @@ class ComputeManager(manager.SchedulerDependentManager):
     def _sync_power_states(self, context):
         """Align power states between the database and the hypervisor.
 
-        To sync power state data we make a DB call to get the number of
-        virtual machines known by the hypervisor and if the number matches the
-        number of virtual machines known by the database, we proceed in a lazy
-        loop, one database record at a time, checking if the hypervisor has the
-        same power state as is in the database.
+        To sync power state data we take a single listing of the power states
+        of the virtual machines known by the hypervisor and compare it with
+        the instances the database has on this host.  Only the instances
+        whose power state differs are re-read from the database before being
+        synced.  Drivers without a bulk listing fall back to a lazy loop, one
+        database record at a time, checking if the hypervisor has the same
+        power state as is in the database.
         """
         db_instances = instance_obj.InstanceList.get_by_host(context,
                                                              self.host)
 
-        num_vm_instances = self.driver.get_num_instances()
+        try:
+            vm_power_states = self.driver.list_instance_power_states()
+            num_vm_instances = len(vm_power_states)
+        except NotImplementedError:
+            vm_power_states = None
+            num_vm_instances = self.driver.get_num_instances()
         num_db_instances = len(db_instances)
 
         if num_vm_instances != num_db_instances:
@@ -4454,27 +4503,41 @@ class ComputeManager(manager.SchedulerDependentManager):
                            "pending task. Skip."), instance=db_instance)
                 continue
             # No pending tasks. Now try to figure out the real vm_power_state.
-            try:
-                vm_instance = self.driver.get_info(db_instance)
-                vm_power_state = vm_instance['state']
-            except exception.InstanceNotFound:
-                vm_power_state = power_state.NOSTATE
-            # Note(maoy): the above get_info call might take a long time,
-            # for example, because of a broken libvirt driver.
+            if vm_power_states is not None:
+                vm_power_state = vm_power_states.get(db_instance['uuid'],
+                                                     power_state.NOSTATE)
+                # The listing was taken right after the instances were
+                # read, so only re-read the ones whose power state differs.
+                refresh = vm_power_state != db_instance['power_state']
+            else:
+                try:
+                    vm_instance = self.driver.get_info(db_instance)
+                    vm_power_state = vm_instance['state']
+                except exception.InstanceNotFound:
+                    vm_power_state = power_state.NOSTATE
+                # Note(maoy): the above get_info call might take a long time,
+                # for example, because of a broken libvirt driver.
+                refresh = True
             self._sync_instance_power_state(context,
                                             db_instance,
-                                            vm_power_state)
+                                            vm_power_state,
+                                            refresh=refresh)
 
-    def _sync_instance_power_state(self, context, db_instance, vm_power_state):
+    def _sync_instance_power_state(self, context, db_instance, vm_power_state,
+                                   refresh=True):
         """Align instance power state between the database and hypervisor.
 
         If the instance is not found on the hypervisor, but is in the database,
         then a stop() API will be called on the instance.
+
+        :param refresh: re-read the instance from the database first; callers
+                        holding a fresh copy of the instance may skip this.
         """
 
-        # We re-query the DB to get the latest instance info to minimize
-        # (not eliminate) race condition.
-        db_instance.refresh()
+        if refresh:
+            # We re-query the DB to get the latest instance info to minimize
+            # (not eliminate) race condition.
+            db_instance.refresh()
         db_power_state = db_instance.power_state
         vm_state = db_instance.vm_state
 
@@ -50,6 +50,21 @@ CONF.register_opts(resource_tracker_opts)
 LOG = logging.getLogger(__name__)
 COMPUTE_RESOURCE_SEMAPHORE = "compute_resources"
 
+# The compute node fields changed by the scheduler's claims.
+_RESERVED_FIELDS = ('memory_mb_used', 'free_ram_mb', 'local_gb_used',
+                    'free_disk_gb', 'disk_available_least', 'vcpus_used')
+
+
+def _stats_dict(stats):
+    """Normalize stats, either a dict or a list of the stat rows of a
+    compute node record, to a dict of the string values stored in the DB.
+    """
+    if isinstance(stats, dict):
+        items = stats.iteritems()
+    else:
+        items = ((stat['key'], stat['value']) for stat in stats)
+    return dict((key, unicode(value)) for key, value in items)
+
 
 class ResourceTracker(object):
     """Compute helper class for keeping track of resource usage as instances
@@ -61,6 +76,7 @@ class ResourceTracker(object):
         self.driver = driver
         self.nodename = nodename
         self.compute_node = None
+        self._persisted_node = None
         self.stats = importutils.import_object(CONF.compute_stats_class)
         self.tracked_instances = {}
         self.tracked_migrations = {}
@@ -122,6 +138,29 @@ class ResourceTracker(object):
         else:
             raise exception.ComputeResourcesUnavailable()
 
+    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    def release_scheduler_claim(self, context, instance_ref):
+        """Give back the resources the scheduler claimed for an instance
+        on this node in the database.
+
+        This is only needed when the build fails before instance_claim(),
+        whose update of the compute node replaces the scheduler's claim.
+
+        Any write of the usage fields by this tracker since the scheduler's
+        claim also replaced it, in which case the release leaves the node
+        with more free resources than it has.  The usage fields are
+        therefore written again by the next update or audit, which bounds
+        that window to the audit interval.
+        """
+        if self.disabled:
+            return
+
+        local_gb = instance_ref['root_gb'] + instance_ref['ephemeral_gb']
+        self.conductor_api.compute_node_release(context, self.compute_node,
+                instance_ref['memory_mb'], local_gb, instance_ref['vcpus'])
+        for key in _RESERVED_FIELDS:
+            self._persisted_node.pop(key, None)
+
     @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
     def resize_claim(self, context, instance_ref, instance_type, limits=None):
         """Indicate that resources are needed for a resize operation to this
@@ -305,7 +344,7 @@ class ResourceTracker(object):
             if compute_node_refs:
                 for cn in compute_node_refs:
                     if cn.get('hypervisor_hostname') == self.nodename:
-                        self.compute_node = cn
+                        self._set_compute_node(cn)
                         break
 
         if not self.compute_node:
@@ -324,8 +363,19 @@ class ResourceTracker(object):
     def _create(self, context, values):
         """Create the compute node in the DB."""
         # initialize load stats from existing instances:
-        self.compute_node = self.conductor_api.compute_node_create(context,
-                                                                   values)
+        self._set_compute_node(self.conductor_api.compute_node_create(context,
+                                                                      values))
+
+    def _set_compute_node(self, compute_node):
+        """Track a compute node record as read from or written to the DB.
+
+        A copy of the persisted values is kept so that later updates only
+        need to send the fields which have changed since.
+        """
+        self.compute_node = compute_node
+        persisted = dict(compute_node)
+        persisted['stats'] = _stats_dict(compute_node.get('stats') or {})
+        self._persisted_node = persisted
 
     def _get_service(self, context):
         try:
@@ -368,11 +418,54 @@ class ResourceTracker(object):
             LOG.audit(_("Free VCPU information unavailable"))
 
     def _update(self, context, values, prune_stats=False):
-        """Persist the compute node updates to the DB."""
+        """Persist the compute node updates to the DB.
+
+        Only the fields which differ from the last persisted copy of the
+        compute node are written, and the write is skipped altogether when
+        nothing has changed.
+        """
         if "service" in self.compute_node:
             del self.compute_node['service']
-        self.compute_node = self.conductor_api.compute_node_update(
-            context, self.compute_node, values, prune_stats)
+        changes, prune_stats = self._get_changes(values, prune_stats)
+        if not changes:
+            LOG.debug(_("Compute node record for %(host)s:%(node)s is "
+                        "unchanged, skipping update"),
+                      {'host': self.host, 'node': self.nodename})
+            return
+        self._set_compute_node(self.conductor_api.compute_node_update(
+            context, self.compute_node, changes, prune_stats))
+
+    def _get_changes(self, values, prune_stats):
+        """Compare values against the last persisted copy of the compute
+        node and return the changed fields along with the prune_stats flag
+        to write them with.
+
+        Changed stats are sent on their own.  The complete stats are only
+        sent when pruning was requested and some stats were removed, since
+        pruning deletes every stat which is not part of the update.
+        """
+        persisted = self._persisted_node
+        changes = {}
+        for key, value in values.iteritems():
+            if key == 'stats':
+                continue
+            if key not in persisted or persisted[key] != value:
+                changes[key] = value
+
+        if 'stats' in values or prune_stats:
+            stats = values.get('stats') or {}
+            new_stats = _stats_dict(stats)
+            old_stats = persisted['stats']
+            if prune_stats and set(old_stats) - set(new_stats):
+                changes['stats'] = stats
+            else:
+                prune_stats = False
+                changed_stats = dict((key, stats[key]) for key in new_stats
+                                     if old_stats.get(key) != new_stats[key])
+                if changed_stats:
+                    changes['stats'] = changed_stats
+
+        return changes, prune_stats
 
     def _update_usage(self, resources, usage, sign=1):
         mem_usage = usage['memory_mb']
@@ -191,6 +191,7 @@ class ComputeAPI(nova.openstack.common.rpc.proxy.RpcProxy):
                new-world instance objects
         2.36 - Made pause_instance() and unpause_instance() take new-world
                instance objects
+        2.37 - Added prefetch_images()
     '''
 
     #
@@ -500,6 +501,12 @@ class ComputeAPI(nova.openstack.common.rpc.proxy.RpcProxy):
                 topic=_compute_topic(self.topic, ctxt, host, instance),
                 version='2.22')
 
+    def prefetch_images(self, ctxt, host, image_ids):
+        self.cast(ctxt, self.make_msg('prefetch_images',
+                image_ids=image_ids),
+                topic=_compute_topic(self.topic, ctxt, host, None),
+                version='2.37')
+
     def refresh_provider_fw_rules(self, ctxt, host):
         self.cast(ctxt, self.make_msg('refresh_provider_fw_rules'),
                 _compute_topic(self.topic, ctxt, host, None))
@@ -288,6 +288,17 @@ def get_nw_info_for_instance(instance):
     return nw_info
 
 
+def get_nw_info_primitive_for_instance(instance):
+    """Return the network info of an instance as a list of VIF dicts.
+
+    This does not build the network model from the info cache of instance
+    objects, so it only gives the keys of the model and not its methods.
+    """
+    if isinstance(instance, instance_obj.Instance):
+        return instance.info_cache.network_info_primitive()
+    return get_nw_info_for_instance(instance)
+
+
 def has_audit_been_run(context, conductor, host, timestamp=None):
     begin, end = utils.last_completed_audit_period(before=timestamp)
     task_log = conductor.task_log_get(context, "instance_usage_audit",
@@ -44,6 +44,75 @@ CONF.register_opts(conductor_opts, conductor_group)
 LOG = logging.getLogger(__name__)
 
 
+class Batch(object):
+    """A group of conductor operations run by a single batch() call.
+
+    Operations are added by calling the methods below, which take the same
+    arguments as the conductor API methods of the same name less the
+    context. commit() runs them in order and returns their results, or
+    raises the exception of the first operation which failed, in which
+    case the operations after it have not been run.
+    """
+
+    def __init__(self, conductor_api, context, service):
+        self._conductor_api = conductor_api
+        self._context = context
+        self._service = service
+        self.operations = []
+
+    def __len__(self):
+        return len(self.operations)
+
+    def _add(self, method, **kwargs):
+        self.operations.append((method, kwargs))
+
+    def instance_update(self, instance_uuid, **updates):
+        self._add('instance_update', instance_uuid=instance_uuid,
+                  updates=updates, service=self._service)
+
+    def instance_info_cache_update(self, instance, values):
+        self._add('instance_info_cache_update', instance=instance,
+                  values=values)
+
+    def instance_fault_create(self, values):
+        self._add('instance_fault_create', values=values)
+
+    def block_device_mapping_update_or_create(self, values):
+        self._add('block_device_mapping_update_or_create', values=values)
+
+    def action_event_start(self, values):
+        self._add('action_event_start', values=values)
+
+    def action_event_finish(self, values):
+        self._add('action_event_finish', values=values)
+
+    def bw_usage_get(self, uuid, start_period, mac):
+        self._add('bw_usage_update', uuid=uuid, mac=mac,
+                  start_period=start_period)
+
+    def bw_usage_update(self, uuid, mac, start_period, bw_in, bw_out,
+                        last_ctr_in, last_ctr_out, last_refreshed=None,
+                        update_cells=True):
+        self._add('bw_usage_update', uuid=uuid, mac=mac,
+                  start_period=start_period, bw_in=bw_in, bw_out=bw_out,
+                  last_ctr_in=last_ctr_in, last_ctr_out=last_ctr_out,
+                  last_refreshed=last_refreshed, update_cells=update_cells)
+
+    def vol_usage_update(self, vol_id, rd_req, rd_bytes, wr_req, wr_bytes,
+                         instance, last_refreshed=None, update_totals=False):
+        self._add('vol_usage_update', vol_id=vol_id, rd_req=rd_req,
+                  rd_bytes=rd_bytes, wr_req=wr_req, wr_bytes=wr_bytes,
+                  instance=instance, last_refreshed=last_refreshed,
+                  update_totals=update_totals)
+
+    def commit(self):
+        """Run the operations added so far and return their results."""
+        operations, self.operations = self.operations, []
+        if not operations:
+            return []
+        return self._conductor_api._run_batch(self._context, operations)
+
+
 class LocalAPI(object):
     """A local version of the conductor API that does database updates
     locally instead of via RPC.
@@ -275,6 +344,11 @@ class LocalAPI(object):
     def compute_node_delete(self, context, node):
         return self._manager.compute_node_delete(context, node)
 
+    def compute_node_release(self, context, node, memory_mb, local_gb,
+                             vcpus):
+        return self._manager.compute_node_release(context, node, memory_mb,
+                                                  local_gb, vcpus)
+
     def service_update(self, context, service, values):
         return self._manager.service_update(context, service, values)
 
@@ -341,6 +415,19 @@ class LocalAPI(object):
     def compute_unrescue(self, context, instance):
         return self._manager.compute_unrescue(context, instance)
 
+    def batched(self, context):
+        """Return a Batch to group several operations in one call."""
+        return Batch(self, context, 'compute')
+
+    def _run_batch(self, context, operations):
+        results = []
+        for result in self._manager.batch(context, operations):
+            if 'failure' in result:
+                raise rpc_common.deserialize_remote_exception(
+                        CONF, result['failure'])
+            results.append(result['result'])
+        return results
+
 
 class LocalComputeTaskAPI(object):
     def __init__(self):
@@ -414,6 +501,18 @@ class API(LocalAPI):
         return self._manager.instance_update(context, instance_uuid,
                                              updates, 'conductor')
 
+    def batched(self, context):
+        """Return a Batch to group several operations in one call."""
+        return Batch(self, context, 'conductor')
+
+    def _run_batch(self, context, operations):
+        if not self._manager.can_send_version('1.56'):
+            # The conductor is too old for batch(), so send the operations
+            # one by one.
+            return [getattr(self._manager, method)(context, **kwargs)
+                    for method, kwargs in operations]
+        return super(API, self)._run_batch(context, operations)
+
 
 class ComputeTaskAPI(object):
     """ComputeTask API that queues up compute tasks for nova-conductor."""
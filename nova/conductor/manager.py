@@ -15,6 +15,7 @@
 """Handles database requests from other nova services."""
 
 import copy
+import sys
 
 from nova.api.ec2 import ec2utils
 from nova import block_device
@@ -58,6 +59,13 @@ allowed_updates = ['task_state', 'vm_state', 'expected_task_state',
                    'system_metadata', 'updated_at'
                    ]
 
+# The methods which can be run by batch().
+batch_methods = ['action_event_finish', 'action_event_start',
+                 'block_device_mapping_update_or_create', 'bw_usage_update',
+                 'instance_fault_create', 'instance_info_cache_update',
+                 'instance_update', 'vol_usage_update',
+                 ]
+
 # Fields that we want to convert back into a datetime object.
 datetime_fields = ['launched_at', 'terminated_at', 'updated_at']
 
@@ -75,7 +83,7 @@ class ConductorManager(manager.Manager):
     namespace.  See the ComputeTaskManager class for details.
     """
 
-    RPC_API_VERSION = '1.55'
+    RPC_API_VERSION = '1.58'
 
     def __init__(self, *args, **kwargs):
         super(ConductorManager, self).__init__(service_name='conductor',
@@ -451,6 +459,11 @@ class ConductorManager(manager.Manager):
         result = self.db.compute_node_delete(context, node['id'])
         return jsonutils.to_primitive(result)
 
+    def compute_node_release(self, context, node, memory_mb, local_gb,
+                             vcpus):
+        self.db.compute_node_release(context, node['id'], memory_mb,
+                                     local_gb, vcpus)
+
     @rpc_common.client_exceptions(exception.ServiceNotFound)
     def service_update(self, context, service, values):
         svc = self.db.service_update(context, service['id'], values)
@@ -570,6 +583,37 @@ class ConductorManager(manager.Manager):
     def compute_reboot(self, context, instance, reboot_type):
         self.compute_api.reboot(context, instance, reboot_type)
 
+    @rpc_common.client_exceptions(KeyError)
+    def batch(self, context, operations):
+        """Run a list of (method, kwargs) operations in order.
+
+        Returns a list with a dict for each operation which was run, holding
+        either the 'result' of the operation or, for an operation which
+        failed, its serialized 'failure'. The operations after a failed
+        one are not run.
+        """
+        for method, kwargs in operations:
+            if method not in batch_methods:
+                LOG.error(_("Batch attempted to run '%s'"), method)
+                raise KeyError("unexpected batch method '%s'" % method)
+
+        results = []
+        for method, kwargs in operations:
+            try:
+                result = getattr(self, method)(context, **kwargs)
+            except rpc_common.ClientException as e:
+                failure = rpc_common.serialize_remote_exception(
+                        e._exc_info, log_failure=False)
+                results.append({'failure': failure})
+                break
+            except Exception:
+                failure = rpc_common.serialize_remote_exception(
+                        sys.exc_info())
+                results.append({'failure': failure})
+                break
+            results.append({'result': result})
+        return results
+
 
 class ComputeTaskManager(base.Base):
     """Namespace for compute methods.
@@ -106,6 +106,10 @@ class ConductorAPI(nova.openstack.common.rpc.proxy.RpcProxy):
     1.53 - Added compute_reboot
     1.54 - Added 'update_cells' argument to bw_usage_update
     1.55 - Pass instance objects for compute_stop
+    1.56 - Added batch()
+    1.57 - object_action() takes objects holding only the fields needed
+           by the method, see NovaObject.obj_delta_methods
+    1.58 - Added compute_node_release
     """
 
     BASE_RPC_API_VERSION = '1.0'
@@ -397,6 +401,14 @@ class ConductorAPI(nova.openstack.common.rpc.proxy.RpcProxy):
         msg = self.make_msg('compute_node_delete', node=node_p)
         return self.call(context, msg, version='1.44')
 
+    def compute_node_release(self, context, node, memory_mb, local_gb,
+                             vcpus):
+        node_p = jsonutils.to_primitive(node)
+        msg = self.make_msg('compute_node_release', node=node_p,
+                            memory_mb=memory_mb, local_gb=local_gb,
+                            vcpus=vcpus)
+        return self.call(context, msg, version='1.58')
+
     def service_update(self, context, service, values):
         service_p = jsonutils.to_primitive(service)
         msg = self.make_msg('service_update', service=service_p, values=values)
@@ -503,9 +515,20 @@ class ConductorAPI(nova.openstack.common.rpc.proxy.RpcProxy):
         return self.call(context, msg, version='1.50')
 
     def object_action(self, context, objinst, objmethod, args, kwargs):
+        if (objmethod in objinst.obj_delta_methods and
+                self.can_send_version('1.57')):
+            objinst = objinst.obj_to_delta_primitive()
+            version = '1.57'
+        else:
+            version = '1.50'
         msg = self.make_msg('object_action', objinst=objinst,
                             objmethod=objmethod, args=args, kwargs=kwargs)
-        return self.call(context, msg, version='1.50')
+        return self.call(context, msg, version=version)
+
+    def batch(self, context, operations):
+        operations_p = jsonutils.to_primitive(operations)
+        msg = self.make_msg('batch', operations=operations_p)
+        return self.call(context, msg, version='1.56')
 
 
 class ComputeTaskAPI(nova.openstack.common.rpc.proxy.RpcProxy):
@@ -183,6 +183,15 @@ def compute_node_get_all(context):
     return IMPL.compute_node_get_all(context)
 
 
+def compute_node_get_all_changed_since(context, changed_since):
+    """Get all computeNodes created, updated or deleted since a time.
+
+    Deleted computeNodes are included so that callers caching compute
+    node data can drop them.
+    """
+    return IMPL.compute_node_get_all_changed_since(context, changed_since)
+
+
 def compute_node_search_by_hypervisor(context, hypervisor_match):
     """Get computeNodes given a hypervisor hostname match string."""
     return IMPL.compute_node_search_by_hypervisor(context, hypervisor_match)
@@ -201,6 +210,24 @@ def compute_node_update(context, compute_id, values, prune_stats=False):
     return IMPL.compute_node_update(context, compute_id, values, prune_stats)
 
 
+def compute_node_reserve(context, compute_id, memory_mb, local_gb, vcpus,
+                         limits=None):
+    """Provisionally consume resources on a computeNode.
+
+    The resources are only consumed if the computeNode still has room for
+    them within the given limits (as computed by the scheduler filters).
+    Returns True if the resources were reserved, False otherwise.
+    """
+    return IMPL.compute_node_reserve(context, compute_id, memory_mb,
+                                     local_gb, vcpus, limits)
+
+
+def compute_node_release(context, compute_id, memory_mb, local_gb, vcpus):
+    """Give back resources consumed by compute_node_reserve."""
+    return IMPL.compute_node_release(context, compute_id, memory_mb,
+                                     local_gb, vcpus)
+
+
 def compute_node_delete(context, compute_id):
     """Delete a computeNode from the database.
 
@@ -449,7 +476,10 @@ def fixed_ip_create(context, values):
 
 
 def fixed_ip_bulk_create(context, ips):
-    """Create a lot of fixed ips from the values dictionary."""
+    """Create a lot of fixed ips from an iterable of values dictionaries.
+
+    The ips are consumed and inserted in chunks, within one transaction.
+    """
     return IMPL.fixed_ip_bulk_create(context, ips)
 
 
@@ -511,6 +541,13 @@ def fixed_ips_by_virtual_interface(context, vif_id):
     return IMPL.fixed_ips_by_virtual_interface(context, vif_id)
 
 
+def fixed_ip_get_by_address_like(context, pattern):
+    """Get the fixed ips on a virtual interface whose address, or the
+    address of one of whose floating ips, matches a SQL LIKE pattern.
+    """
+    return IMPL.fixed_ip_get_by_address_like(context, pattern)
+
+
 def fixed_ip_update(context, address, values):
     """Create a fixed ip from the values dictionary."""
     return IMPL.fixed_ip_update(context, address, values)
@@ -570,6 +607,11 @@ def instance_create(context, values):
     return IMPL.instance_create(context, values)
 
 
+def instance_create_many(context, values_list):
+    """Create instances from a list of values dictionaries at once."""
+    return IMPL.instance_create_many(context, values_list)
+
+
 def instance_destroy(context, instance_uuid, constraint=None,
         update_cells=True):
     """Destroy the instance or raise if it does not exist."""
@@ -1654,6 +1696,16 @@ def aggregate_metadata_get_by_host(context, host, key=None):
     return IMPL.aggregate_metadata_get_by_host(context, host, key)
 
 
+def aggregate_metadata_get_all_by_host(context):
+    """Get the aggregate metadata of every host in an aggregate.
+
+    Returns a dictionary where each key is a hostname and each value is the
+    host's metadata, as returned by aggregate_metadata_get_by_host.
+    return value:  {machine: {key: set(value1, value2)}}
+    """
+    return IMPL.aggregate_metadata_get_all_by_host(context)
+
+
 def aggregate_metadata_get_by_metadata_key(context, aggregate_id, key):
     """Get metadata for an aggregate by metadata key."""
     return IMPL.aggregate_metadata_get_by_metadata_key(context, aggregate_id,
@@ -23,6 +23,7 @@ import collections
 import copy
 import datetime
 import functools
+import itertools
 import sys
 import time
 import uuid
@@ -42,6 +43,7 @@ from sqlalchemy.orm import joinedload_all
 from sqlalchemy.orm import noload
 from sqlalchemy.schema import Table
 from sqlalchemy.sql.expression import asc
+from sqlalchemy.sql.expression import cast
 from sqlalchemy.sql.expression import desc
 from sqlalchemy.sql.expression import select
 from sqlalchemy.sql import func
@@ -85,6 +87,8 @@ get_session = db_session.get_session
 
 _SHADOW_TABLE_PREFIX = 'shadow_'
 _DEFAULT_QUOTA_NAME = 'default'
+# Number of rows inserted by each statement of the bulk creates.
+_BULK_CREATE_CHUNK_SIZE = 1000
 
 
 def get_backend():
@@ -509,6 +513,17 @@ def compute_node_get_all(context):
             all()
 
 
+@require_admin_context
+def compute_node_get_all_changed_since(context, changed_since):
+    return model_query(context, models.ComputeNode, read_deleted="yes").\
+            options(joinedload('service')).\
+            options(joinedload('stats')).\
+            filter(or_(models.ComputeNode.created_at >= changed_since,
+                       models.ComputeNode.updated_at >= changed_since,
+                       models.ComputeNode.deleted_at >= changed_since)).\
+            all()
+
+
 @require_admin_context
 def compute_node_search_by_hypervisor(context, hypervisor_match):
     field = models.ComputeNode.hypervisor_hostname
@@ -598,6 +613,60 @@ def compute_node_update(context, compute_id, values, prune_stats=False):
     return compute_ref
 
 
+@require_admin_context
+def compute_node_reserve(context, compute_id, memory_mb, local_gb, vcpus,
+                         limits=None):
+    """Atomically consume resources on a ComputeNode if they still fit.
+
+    The check and the update happen in a single UPDATE statement, so
+    concurrent schedulers cannot both consume the last of a node's
+    resources.  The resources stay consumed until they are given back
+    with compute_node_release() or the resource tracker claims them for
+    the instance on the host.
+    """
+    limits = limits or {}
+    node = models.ComputeNode
+    query = model_query(context, node, read_deleted="no").\
+                filter_by(id=compute_id)
+    if 'memory_mb' in limits:
+        query = query.filter(node.memory_mb - node.free_ram_mb + memory_mb <=
+                             limits['memory_mb'])
+    if 'disk_gb' in limits:
+        free_disk_gb = func.coalesce(node.disk_available_least,
+                                     node.free_disk_gb)
+        query = query.filter(node.local_gb - free_disk_gb + local_gb <=
+                             limits['disk_gb'])
+    if 'vcpu' in limits:
+        query = query.filter(node.vcpus_used + vcpus <= limits['vcpu'])
+
+    values = {'free_ram_mb': node.free_ram_mb - memory_mb,
+              'memory_mb_used': node.memory_mb_used + memory_mb,
+              'free_disk_gb': node.free_disk_gb - local_gb,
+              'local_gb_used': node.local_gb_used + local_gb,
+              'disk_available_least': node.disk_available_least - local_gb,
+              'vcpus_used': node.vcpus_used + vcpus,
+              'updated_at': timeutils.utcnow()}
+    return query.update(values, synchronize_session=False) == 1
+
+
+@require_admin_context
+def compute_node_release(context, compute_id, memory_mb, local_gb, vcpus):
+    """Give back resources consumed on a ComputeNode by
+    compute_node_reserve().
+    """
+    node = models.ComputeNode
+    values = {'free_ram_mb': node.free_ram_mb + memory_mb,
+              'memory_mb_used': node.memory_mb_used - memory_mb,
+              'free_disk_gb': node.free_disk_gb + local_gb,
+              'local_gb_used': node.local_gb_used - local_gb,
+              'disk_available_least': node.disk_available_least + local_gb,
+              'vcpus_used': node.vcpus_used - vcpus,
+              'updated_at': timeutils.utcnow()}
+    model_query(context, node, read_deleted="no").\
+            filter_by(id=compute_id).\
+            update(values, synchronize_session=False)
+
+
 @require_admin_context
 def compute_node_delete(context, compute_id):
     """Delete a ComputeNode record."""
@@ -1091,19 +1160,35 @@ def fixed_ip_create(context, values):
 
 @require_context
 def fixed_ip_bulk_create(context, ips):
+    ips = iter(ips)
     session = get_session()
     with session.begin():
-        for ip in ips:
-            model = models.FixedIp()
-            model.update(ip)
+        while True:
+            chunk = list(itertools.islice(ips, _BULK_CREATE_CHUNK_SIZE))
+            if not chunk:
+                break
+            # The existing addresses are looked up first, as the error of
+            # a multi row insert doesn't tell which address is a duplicate.
+            addresses = set()
+            for ip in chunk:
+                if ip['address'] in addresses:
+                    raise exception.FixedIpExists(address=ip['address'])
+                addresses.add(ip['address'])
+            existing = model_query(context, models.FixedIp.address,
+                                   base_model=models.FixedIp,
+                                   session=session, read_deleted="no").\
+                            filter(models.FixedIp.address.in_(addresses)).\
+                            first()
+            if existing:
+                raise exception.FixedIpExists(address=existing[0])
             try:
-                # NOTE (vsergeyev): To get existing address we have to do each
-                #                   time session.flush().
-                #                   See related note at line 697.
-                session.add(model)
-                session.flush()
+                session.execute(models.FixedIp.__table__.insert(), chunk)
             except db_exc.DBDuplicateEntry:
-                raise exception.FixedIpExists(address=ip['address'])
+                # An address of the chunk was created concurrently, the
+                # error doesn't tell which one.
+                raise exception.FixedIpExists(
+                    address='%s-%s' % (chunk[0]['address'],
+                                       chunk[-1]['address']))
 
 
 @require_context
@@ -1303,6 +1388,50 @@ def fixed_ips_by_virtual_interface(context, vif_id):
     return result
 
 
+def _ip_address_like(column, pattern):
+    """Return a filter matching an address column against a LIKE pattern.
+
+    Patterns without wildcards are compared for equality, so that both can
+    use the address indexes.
+    """
+    if '%' not in pattern and '_' not in pattern:
+        return column == pattern
+    # postgresql stores addresses as INET, which has no LIKE operator,
+    # so they are compared in their text form.
+    if get_engine().name == 'postgresql':
+        column = cast(column, String)
+    return column.like(pattern)
+
+
+@require_context
+def fixed_ip_get_by_address_like(context, pattern):
+    session = get_session()
+    with session.begin():
+        fixed_ips = model_query(context, models.FixedIp, session=session,
+                                read_deleted="no").\
+                        options(joinedload('floating_ips')).\
+                        filter(models.FixedIp.virtual_interface_id != None).\
+                        filter(_ip_address_like(models.FixedIp.address,
+                                                pattern)).\
+                        all()
+        floating_fixed_ips = model_query(context, models.FixedIp,
+                                         session=session,
+                                         read_deleted="no").\
+                        options(joinedload('floating_ips')).\
+                        join(models.FloatingIp,
+                             models.FloatingIp.fixed_ip_id ==
+                             models.FixedIp.id).\
+                        filter(models.FloatingIp.deleted == 0).\
+                        filter(models.FixedIp.virtual_interface_id != None).\
+                        filter(_ip_address_like(models.FloatingIp.address,
+                                                pattern)).\
+                        all()
+
+    result = dict((fixed_ip['id'], fixed_ip)
+                  for fixed_ip in fixed_ips + floating_fixed_ips)
+    return [result[fixed_ip_id] for fixed_ip_id in sorted(result)]
+
+
 @require_context
 def fixed_ip_update(context, address, values):
     session = get_session()
@@ -1518,24 +1647,12 @@ def instance_create(context, values):
     security_groups = values.pop('security_groups', [])
     instance_ref.update(values)
 
-    def _get_sec_group_models(session, security_groups):
-        models = []
-        default_group = security_group_ensure_default(context)
-        if 'default' in security_groups:
-            models.append(default_group)
-            # Generate a new list, so we don't modify the original
-            security_groups = [x for x in security_groups if x != 'default']
-        if security_groups:
-            models.extend(_security_group_get_by_names(context,
-                    session, context.project_id, security_groups))
-        return models
-
     session = get_session()
     with session.begin():
         if 'hostname' in values:
             _validate_unique_server_name(context, session, values['hostname'])
-        instance_ref.security_groups = _get_sec_group_models(session,
-                security_groups)
+        instance_ref.security_groups = _instance_security_group_models(
+                context, session, security_groups)
         instance_ref.save(session=session)
 
     # create the instance uuid to ec2_id mapping entry for instance
@@ -1544,6 +1661,109 @@ def instance_create(context, values):
     return instance_ref
 
 
+def _instance_security_group_models(context, session, security_groups):
+    models = []
+    default_group = security_group_ensure_default(context)
+    if 'default' in security_groups:
+        models.append(default_group)
+        # Generate a new list, so we don't modify the original
+        security_groups = [x for x in security_groups if x != 'default']
+    if security_groups:
+        models.extend(_security_group_get_by_names(context,
+                session, context.project_id, security_groups))
+    return models
+
+
+@require_context
+def instance_create_many(context, values_list):
+    """Create several new Instance records in one transaction.
+
+    context - request context object
+    values_list - list of dicts containing column values, as for
+                  instance_create().
+
+    The rows of each table are inserted for all of the instances with a
+    single statement. Returns the new instances in the order of
+    values_list.
+    """
+    instance_columns = set(column.name
+                           for column in models.Instance.__table__.columns)
+    # NOTE: an executemany() insert takes its columns from the first row,
+    # so instance rows are grouped by the columns they set.
+    instance_rows = collections.defaultdict(list)
+    child_rows = collections.defaultdict(list)
+    security_group_ids = {}
+    hostnames = set()
+    uuids = []
+
+    session = get_session()
+    with session.begin():
+        for values in values_list:
+            values = values.copy()
+            _handle_objects_related_type_conversions(values)
+            if not values.get('uuid'):
+                values['uuid'] = str(uuid.uuid4())
+            instance_uuid = values['uuid']
+            uuids.append(instance_uuid)
+
+            for key, model in (('metadata', models.InstanceMetadata),
+                               ('system_metadata',
+                                models.InstanceSystemMetadata)):
+                metadata = values.pop(key, None) or {}
+                for k, v in metadata.iteritems():
+                    child_rows[model].append({'key': k, 'value': v,
+                                              'instance_uuid': instance_uuid})
+
+            info_cache = values.pop('info_cache', None) or {}
+            child_rows[models.InstanceInfoCache].append(
+                    {'instance_uuid': instance_uuid,
+                     'network_info': info_cache.get('network_info')})
+
+            security_groups = tuple(values.pop('security_groups', []))
+            if security_groups not in security_group_ids:
+                security_group_ids[security_groups] = [
+                        group['id'] for group in
+                        _instance_security_group_models(context, session,
+                                                        security_groups)]
+            for group_id in security_group_ids[security_groups]:
+                child_rows[models.SecurityGroupInstanceAssociation].append(
+                        {'security_group_id': group_id,
+                         'instance_uuid': instance_uuid})
+
+            if 'hostname' in values:
+                _validate_unique_server_name(context, session,
+                                             values['hostname'])
+                lowername = (values['hostname'] or '').lower()
+                if (CONF.osapi_compute_unique_server_name_scope and
+                        lowername in hostnames):
+                    raise exception.InstanceExists(name=lowername)
+                hostnames.add(lowername)
+
+            # create the instance uuid to ec2_id mapping entry for instance
+            child_rows[models.InstanceIdMapping].append(
+                    {'uuid': instance_uuid})
+
+            row = dict((k, v) for k, v in values.iteritems()
+                       if k in instance_columns)
+            instance_rows[tuple(sorted(row))].append(row)
+
+        for rows in instance_rows.values():
+            session.execute(models.Instance.__table__.insert(), rows)
+        for model in (models.InstanceMetadata, models.InstanceSystemMetadata,
+                      models.InstanceInfoCache,
+                      models.SecurityGroupInstanceAssociation,
+                      models.InstanceIdMapping):
+            if child_rows[model]:
+                session.execute(model.__table__.insert(), child_rows[model])
+
+        instance_refs = _build_instance_get(context, session=session).\
+                filter(models.Instance.uuid.in_(uuids)).\
+                all()
+
+    instance_refs = dict((ref['uuid'], ref) for ref in instance_refs)
+    return [instance_refs[ref_uuid] for ref_uuid in uuids]
+
+
 def _instance_data_get_for_user(context, project_id, user_id, session=None):
     result = model_query(context,
                          func.count(models.Instance.id),
@@ -4810,6 +5030,24 @@ def aggregate_metadata_get_by_host(context, host, key=None):
     return dict(metadata)
 
 
+@require_admin_context
+def aggregate_metadata_get_all_by_host(context):
+    query = model_query(context, models.Aggregate)
+    query = query.join("_hosts")
+    query = query.join("_metadata")
+    query = query.options(contains_eager("_hosts"))
+    query = query.options(contains_eager("_metadata"))
+    rows = query.all()
+
+    metadata = collections.defaultdict(lambda: collections.defaultdict(set))
+    for agg in rows:
+        for agghost in agg._hosts:
+            for kv in agg._metadata:
+                metadata[agghost.host][kv['key']].add(kv['value'])
+    return dict((host, dict(host_metadata))
+                for host, host_metadata in metadata.iteritems())
+
+
 @require_admin_context
 def aggregate_metadata_get_by_metadata_key(context, aggregate_id, key):
     query = model_query(context, models.Aggregate)
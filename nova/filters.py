@@ -17,6 +17,8 @@
 Filter support
 """
 
+import time
+
 from nova import loadables
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
@@ -65,21 +67,40 @@ class BaseFilterHandler(loadables.BaseLoader):
     """
 
     def get_filtered_objects(self, filter_classes, objs,
-            filter_properties, index=0):
-        list_objs = list(objs)
+            filter_properties, index=0, timings=None):
+        """Return the objects that pass all of the filters.
+
+        If a timings list is given, a dict with the filter's name, its
+        wall time in seconds and the number of objects it was given and
+        returned is appended to it for every filter that is run.
+        """
+        # NOTE: lists are not copied, so filters can keep data on the
+        # list they return for the next filters.
+        if not isinstance(objs, list):
+            objs = list(objs)
+        list_objs = objs
         LOG.debug(_("Starting with %d host(s)"), len(list_objs))
         for filter_cls in filter_classes:
             cls_name = filter_cls.__name__
             filter = filter_cls()
 
             if filter.run_filter_for_index(index):
+                if timings is not None:
+                    start = time.time()
                 objs = filter.filter_all(list_objs,
                                                filter_properties)
+                if objs is not None and not isinstance(objs, list):
+                    objs = list(objs)
+                if timings is not None:
+                    timings.append({'name': cls_name,
+                                    'seconds': time.time() - start,
+                                    'objects_in': len(list_objs),
+                                    'objects_out': len(objs or [])})
                 if objs is None:
                     LOG.debug(_("Filter %(cls_name)s says to stop filtering"),
                           {'cls_name': cls_name})
                     return
-                list_objs = list(objs)
+                list_objs = objs
                 LOG.debug(_("Filter %(cls_name)s returned "
                             "%(obj_len)d host(s)"),
                           {'cls_name': cls_name, 'obj_len': len(list_objs)})
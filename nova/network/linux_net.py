@@ -25,6 +25,7 @@ import netaddr
 import os
 import re
 
+from eventlet import greenthread
 from oslo.config import cfg
 
 from nova import db
@@ -122,6 +123,19 @@ linux_net_opts = [
                default='DROP',
                help=('The table that iptables to jump to when a packet is '
                      'to be dropped.')),
+    cfg.IntOpt('iptables_full_apply_interval',
+               default=0,
+               help='Seconds between full iptables-save/iptables-restore '
+                    'reconciliations of the rules. In between, only the '
+                    'changed chains are rewritten with iptables-restore '
+                    '--noflush. 0 always applies all the rules.'),
+    cfg.IntOpt('dnsmasq_hup_interval',
+               default=0,
+               help='Minimum seconds between the HUPs sent to a dnsmasq. '
+                    'Its files are only rewritten when they change and '
+                    'the changes made within the interval are reloaded '
+                    'with a single HUP at its end. 0 rewrites the files '
+                    'and sends a HUP on every update.'),
     ]
 
 CONF = cfg.CONF
@@ -185,6 +199,28 @@ class IptablesTable(object):
         self.remove_chains = set()
         self.dirty = True
 
+        # Changes since the last apply which can be applied on their own:
+        # the wrapped chains which need to be rewritten or removed.  Any
+        # change to the unwrapped chains, shared with the other binaries,
+        # needs all the rules to be reconciled.
+        self.dirty_chains = set()
+        self.removed_chains = set()
+        self.dirty_unwrapped = True
+
+    def _mark_dirty(self, chain, wrap):
+        self.dirty = True
+        if wrap:
+            self.dirty_chains.add(chain)
+        else:
+            self.dirty_unwrapped = True
+
+    def clear_dirty(self):
+        """Mark the table as applied."""
+        self.dirty = False
+        self.dirty_chains.clear()
+        self.removed_chains.clear()
+        self.dirty_unwrapped = False
+
     def add_chain(self, name, wrap=True):
         """Adds a named chain to the table.
 
@@ -199,9 +235,10 @@ class IptablesTable(object):
         """
         if wrap:
             self.chains.add(name)
+            self.removed_chains.discard(name)
         else:
             self.unwrapped_chains.add(name)
-        self.dirty = True
+        self._mark_dirty(name, wrap)
 
     def remove_chain(self, name, wrap=True):
         """Remove named chain.
@@ -222,6 +259,11 @@ class IptablesTable(object):
                      name)
             return
         self.dirty = True
+        if wrap:
+            self.dirty_chains.discard(name)
+            self.removed_chains.add(name)
+        else:
+            self.dirty_unwrapped = True
 
         # non-wrapped chains and rules need to be dealt with specially,
         # so we keep a list of them to be iterated over in apply()
@@ -240,6 +282,9 @@ class IptablesTable(object):
         if not wrap:
             self.remove_rules += filter(lambda r: jump_snippet in r.rule,
                                         self.rules)
+        for rule in self.rules:
+            if jump_snippet in rule.rule:
+                self._mark_dirty(rule.chain, rule.wrap)
         self.rules = filter(lambda r: jump_snippet not in r.rule, self.rules)
 
     def add_rule(self, chain, rule, wrap=True, top=False):
@@ -264,7 +309,7 @@ class IptablesTable(object):
             LOG.debug(_("Skipping duplicate iptables rule addition"))
         else:
             self.rules.append(IptablesRule(chain, rule, wrap, top))
-            self.dirty = True
+            self._mark_dirty(chain, wrap)
 
     def _wrap_target_chain(self, s):
         if s.startswith('$'):
@@ -283,7 +328,7 @@ class IptablesTable(object):
             self.rules.remove(IptablesRule(chain, rule, wrap, top))
             if not wrap:
                 self.remove_rules.append(IptablesRule(chain, rule, wrap, top))
-            self.dirty = True
+            self._mark_dirty(chain, wrap)
         except ValueError:
             LOG.warn(_('Tried to remove rule that was not there:'
                        ' %(chain)r %(rule)r %(wrap)r %(top)r'),
@@ -295,18 +340,21 @@ class IptablesTable(object):
         if isinstance(regex, basestring):
             regex = re.compile(regex)
         num_rules = len(self.rules)
-        self.rules = filter(lambda r: not regex.match(str(r)), self.rules)
-        removed = num_rules - len(self.rules)
-        if removed > 0:
-            self.dirty = True
-        return removed
+        rules = []
+        for rule in self.rules:
+            if regex.match(str(rule)):
+                self._mark_dirty(rule.chain, rule.wrap)
+            else:
+                rules.append(rule)
+        self.rules = rules
+        return num_rules - len(self.rules)
 
     def empty_chain(self, chain, wrap=True):
         """Remove all rules from a chain."""
         chained_rules = [rule for rule in self.rules
                               if rule.chain == chain and rule.wrap == wrap]
         if chained_rules:
-            self.dirty = True
+            self._mark_dirty(chain, wrap)
         for rule in chained_rules:
             self.rules.remove(rule)
 
@@ -346,6 +394,7 @@ class IptablesManager(object):
         self.ipv6 = {'filter': IptablesTable()}
 
         self.iptables_apply_deferred = False
+        self.last_full_apply = {}
 
         # Add a nova-filter-top chain. It's intended to be shared
         # among the various nova components. It sits at the very top
@@ -430,26 +479,102 @@ class IptablesManager(object):
         same component of Nova, and replace them with our current set of
         rules. This happens atomically, thanks to iptables-restore.
 
+        When iptables_full_apply_interval is set, changes limited to the
+        wrapped chains are applied in between the full applies by rewriting
+        only the changed chains.
+
         """
         s = [('iptables', self.ipv4)]
         if CONF.use_ipv6:
             s += [('ip6tables', self.ipv6)]
 
         for cmd, tables in s:
-            all_tables, _err = self.execute('%s-save' % (cmd,), '-c',
-                                                run_as_root=True,
-                                                attempts=5)
-            all_lines = all_tables.split('\n')
-            for table_name, table in tables.iteritems():
-                start, end = self._find_table(all_lines, table_name)
-                all_lines[start:end] = self._modify_rules(
-                        all_lines[start:end], table, table_name)
-                table.dirty = False
-            self.execute('%s-restore' % (cmd,), '-c', run_as_root=True,
-                         process_input='\n'.join(all_lines),
-                         attempts=5)
+            if self._can_apply_chains(cmd, tables):
+                try:
+                    self._apply_chains(cmd, tables)
+                    continue
+                except processutils.ProcessExecutionError:
+                    LOG.warn(_("Applying the changed %s chains failed, "
+                               "applying all the rules instead"), cmd)
+            self._apply_all(cmd, tables)
         LOG.debug(_("IPTablesManager.apply completed with success"))
 
+    def _can_apply_chains(self, cmd, tables):
+        """Whether the changes can be applied by rewriting the changed
+        wrapped chains only.
+        """
+        interval = CONF.iptables_full_apply_interval
+        if interval <= 0:
+            return False
+        last_full_apply = self.last_full_apply.get(cmd)
+        if (last_full_apply is None or
+                timeutils.utcnow_ts() - last_full_apply >= interval):
+            return False
+        for table in tables.itervalues():
+            if (table.dirty_unwrapped or table.remove_rules or
+                    table.remove_chains):
+                return False
+        return True
+
+    def _apply_all(self, cmd, tables):
+        all_tables, _err = self.execute('%s-save' % (cmd,), '-c',
+                                        run_as_root=True,
+                                        attempts=5)
+        all_lines = all_tables.split('\n')
+        for table_name, table in tables.iteritems():
+            start, end = self._find_table(all_lines, table_name)
+            all_lines[start:end] = self._modify_rules(
+                    all_lines[start:end], table, table_name)
+            table.clear_dirty()
+        self.execute('%s-restore' % (cmd,), '-c', run_as_root=True,
+                     process_input='\n'.join(all_lines),
+                     attempts=5)
+        self.last_full_apply[cmd] = timeutils.utcnow_ts()
+
+    def _apply_chains(self, cmd, tables):
+        lines = []
+        for table_name, table in tables.iteritems():
+            if table.dirty_chains or table.removed_chains:
+                lines += self._modify_chains(table, table_name)
+        if lines:
+            self.execute('%s-restore' % (cmd,), '-c', '--noflush',
+                         run_as_root=True,
+                         process_input='\n'.join(lines),
+                         attempts=5)
+        for table in tables.itervalues():
+            table.clear_dirty()
+
+    def _modify_chains(self, table, table_name):
+        """Return the iptables-restore --noflush input rewriting the changed
+        wrapped chains of a table.
+
+        Declaring an existing chain flushes it, so the changed chains are
+        declared and filled again, and the removed ones declared and deleted.
+        The rules which jumped to a removed chain were dropped from chains
+        which are rewritten in the same transaction.
+        """
+        chains = sorted(table.dirty_chains)
+        removed_chains = sorted(table.removed_chains)
+
+        top_rules = dict((chain, []) for chain in chains)
+        bottom_rules = dict((chain, []) for chain in chains)
+        for rule in table.rules:
+            if rule.wrap and rule.chain in top_rules:
+                if rule.top:
+                    top_rules[rule.chain].append(str(rule))
+                else:
+                    bottom_rules[rule.chain].append(str(rule))
+
+        lines = ['*%s' % (table_name,)]
+        lines += [':%s-%s - [0:0]' % (binary_name, name,)
+                  for name in chains + removed_chains]
+        for name in chains:
+            lines += top_rules[name] + bottom_rules[name]
+        lines += ['-X %s-%s' % (binary_name, name,)
+                  for name in removed_chains]
+        lines.append('COMMIT')
+        return lines
+
     def _find_table(self, lines, table_name):
         if len(lines) < 3:
             # length only <2 when fake iptables
@@ -476,27 +601,25 @@ class IptablesManager(object):
             current_lines = fake_table
 
         # Remove any trace of our rules
-        new_filter = filter(lambda line: binary_name not in line,
-                            current_lines)
+        new_filter = [line for line in current_lines
+                      if binary_name not in line]
 
         top_rules = []
         bottom_rules = []
 
         if CONF.iptables_top_regex:
             regex = re.compile(CONF.iptables_top_regex)
-            temp_filter = filter(lambda line: regex.search(line), new_filter)
-            for rule_str in temp_filter:
-                new_filter = filter(lambda s: s.strip() != rule_str.strip(),
-                                    new_filter)
-            top_rules = temp_filter
+            top_rules = [line for line in new_filter if regex.search(line)]
+            top_lines = set(line.strip() for line in top_rules)
+            new_filter = [line for line in new_filter
+                          if line.strip() not in top_lines]
 
         if CONF.iptables_bottom_regex:
             regex = re.compile(CONF.iptables_bottom_regex)
-            temp_filter = filter(lambda line: regex.search(line), new_filter)
-            for rule_str in temp_filter:
-                new_filter = filter(lambda s: s.strip() != rule_str.strip(),
-                    new_filter)
-            bottom_rules = temp_filter
+            bottom_rules = [line for line in new_filter if regex.search(line)]
+            bottom_lines = set(line.strip() for line in bottom_rules)
+            new_filter = [line for line in new_filter
+                          if line.strip() not in bottom_lines]
 
         seen_chains = False
         rules_index = 0
@@ -528,93 +651,90 @@ class IptablesManager(object):
                 # ignore [packet:byte] counts at beginning of line
                 if rule_str.startswith('['):
                     rule_str = rule_str.split(']', 1)[1]
-                dup_filter = filter(lambda s: rule_str.strip() in s.strip(),
-                                    new_filter)
+                rule_str = rule_str.strip()
+
+                # Lines naming binary_name were all dropped above, so a rule
+                # naming it has no duplicate left and we can skip the scan.
+                dup_filter = []
+                if binary_name not in rule_str:
+                    remaining = []
+                    for line in new_filter:
+                        if rule_str in line.strip():
+                            dup_filter.append(line)
+                        else:
+                            remaining.append(line)
+                    new_filter = remaining
 
-                new_filter = filter(lambda s:
-                                    rule_str.strip() not in s.strip(),
-                                    new_filter)
                 # if no duplicates, use original rule
                 if dup_filter:
                     # grab the last entry, if there is one
-                    dup = dup_filter[-1]
-                    rule_str = str(dup)
+                    rule_str = str(dup_filter[-1])
                 else:
                     rule_str = str(rule)
-                rule_str.strip()
 
-                our_rules += [rule_str]
+                our_rules.append(rule_str)
             else:
-                bot_rules += [rule_str]
+                bot_rules.append(rule_str)
 
         our_rules += bot_rules
 
-        new_filter[rules_index:rules_index] = our_rules
-
-        new_filter[rules_index:rules_index] = [':%s - [0:0]' % (name,)
-                                               for name in unwrapped_chains]
-        new_filter[rules_index:rules_index] = [':%s-%s - [0:0]' %
-                                               (binary_name, name,)
-                                               for name in chains]
+        new_filter[rules_index:rules_index] = (
+            [':%s-%s - [0:0]' % (binary_name, name,) for name in chains] +
+            [':%s - [0:0]' % (name,) for name in unwrapped_chains] +
+            our_rules)
 
         commit_index = new_filter.index('COMMIT')
         new_filter[commit_index:commit_index] = bottom_rules
-        seen_lines = set()
 
-        def _weed_out_duplicates(line):
+        # Index the rules to remove by their text, ignoring the
+        # [packet:byte] counts at the beginning of rules, so each line is
+        # checked against all of them at once.
+        remove_rule_counts = {}
+        for rule in remove_rules:
+            rule_str = str(rule).split(' ', 1)[1].strip()
+            remove_rule_counts[rule_str] = (
+                remove_rule_counts.get(rule_str, 0) + 1)
+
+        # We filter duplicates, letting the *last* occurrence take
+        # precendence.  We also filter out anything in the "remove"
+        # lists.
+        seen_lines = set()
+        kept_lines = []
+        for line in reversed(new_filter):
             # ignore [packet:byte] counts at beginning of lines
             if line.startswith('['):
-                line = line.split(']', 1)[1]
-            line = line.strip()
-            if line in seen_lines:
-                return False
+                rule_str = line.split(']', 1)[1].strip()
             else:
-                seen_lines.add(line)
-                return True
+                rule_str = line.strip()
+            if rule_str in seen_lines:
+                continue
+            seen_lines.add(rule_str)
 
-        def _weed_out_removes(line):
             # We need to find exact matches here
             if line.startswith(':'):
                 # it's a chain, for example, ":nova-billing - [0:0]"
                 # strip off everything except the chain name
-                line = line.split(':')[1]
-                line = line.split('- [')[0]
-                line = line.strip()
-                for chain in remove_chains:
-                    if chain == line:
-                        remove_chains.remove(chain)
-                        return False
+                chain = line.split(':')[1]
+                chain = chain.split('- [')[0]
+                chain = chain.strip()
+                if chain in remove_chains:
+                    remove_chains.remove(chain)
+                    continue
             elif line.startswith('['):
                 # it's a rule
-                # ignore [packet:byte] counts at beginning of lines
-                line = line.split(']', 1)[1]
-                line = line.strip()
-                for rule in remove_rules:
-                    # ignore [packet:byte] counts at beginning of rules
-                    rule_str = str(rule)
-                    rule_str = rule_str.split(' ', 1)[1]
-                    rule_str = rule_str.strip()
-                    if rule_str == line:
-                        remove_rules.remove(rule)
-                        return False
+                if remove_rule_counts.get(rule_str):
+                    remove_rule_counts[rule_str] -= 1
+                    continue
 
             # Leave it alone
-            return True
-
-        # We filter duplicates, letting the *last* occurrence take
-        # precendence.  We also filter out anything in the "remove"
-        # lists.
-        new_filter.reverse()
-        new_filter = filter(_weed_out_duplicates, new_filter)
-        new_filter = filter(_weed_out_removes, new_filter)
-        new_filter.reverse()
+            kept_lines.append(line)
+        kept_lines.reverse()
 
         # flush lists, just in case we didn't find something
         remove_chains.clear()
-        for rule in remove_rules:
-            remove_rules.remove(rule)
+        del remove_rules[:]
 
-        return new_filter
+        return kept_lines
 
 
 # NOTE(jkoelker) This is just a nice little stub point since mocking
@@ -873,16 +993,23 @@ def get_dhcp_leases(context, network_ref):
     return '\n'.join(hosts)
 
 
-def get_dhcp_hosts(context, network_ref):
-    """Get network's hosts config in dhcp-host format."""
-    hosts = []
+def _get_dhcp_fixed_ips(context, network_ref):
+    """Return the fixed ips of a network served by this host's dnsmasq."""
     host = None
     if network_ref['multi_host']:
         host = CONF.host
+    return db.network_get_associated_fixed_ips(context,
+                                               network_ref['id'],
+                                               host=host)
+
+
+def get_dhcp_hosts(context, network_ref, fixed_ips=None):
+    """Get network's hosts config in dhcp-host format."""
+    hosts = []
+    if fixed_ips is None:
+        fixed_ips = _get_dhcp_fixed_ips(context, network_ref)
     macs = set()
-    for data in db.network_get_associated_fixed_ips(context,
-                                                    network_ref['id'],
-                                                    host=host):
+    for data in fixed_ips:
         if data['vif_address'] not in macs:
             hosts.append(_host_dhcp(data))
             macs.add(data['vif_address'])
@@ -942,15 +1069,12 @@ def _remove_dhcp_mangle_rule(dev):
     iptables_manager.apply()
 
 
-def get_dhcp_opts(context, network_ref):
+def get_dhcp_opts(context, network_ref, fixed_ips=None):
     """Get network's hosts config in dhcp-opts format."""
     hosts = []
-    host = None
-    if network_ref['multi_host']:
-        host = CONF.host
-    data = db.network_get_associated_fixed_ips(context,
-                                               network_ref['id'],
-                                               host=host)
+    data = fixed_ips
+    if data is None:
+        data = _get_dhcp_fixed_ips(context, network_ref)
 
     if data:
         instance_set = set([datum['instance_uuid'] for datum in data])
@@ -977,14 +1101,97 @@ def release_dhcp(dev, address, mac_address):
 
 def update_dhcp(context, dev, network_ref):
     conffile = _dhcp_file(dev, 'conf')
-    write_to_file(conffile, get_dhcp_hosts(context, network_ref))
-    restart_dhcp(context, dev, network_ref)
+    if not CONF.dnsmasq_hup_interval:
+        write_to_file(conffile, get_dhcp_hosts(context, network_ref))
+        restart_dhcp(context, dev, network_ref)
+        return
+
+    fixed_ips = _get_dhcp_fixed_ips(context, network_ref)
+    changed = _write_dnsmasq_file(
+        conffile, get_dhcp_hosts(context, network_ref, fixed_ips))
+    if CONF.use_single_default_gateway:
+        optsfile = _dhcp_file(dev, 'opts')
+        # The gateway options only depend on the fixed ips and their
+        # vifs, which also make up the hosts file.
+        if changed or optsfile not in _dnsmasq_files:
+            changed |= _write_dnsmasq_file(
+                optsfile, get_dhcp_opts(context, network_ref, fixed_ips))
+    restart_dhcp(context, dev, network_ref, changed=changed)
 
 
 def update_dns(context, dev, network_ref):
     hostsfile = _dhcp_file(dev, 'hosts')
-    write_to_file(hostsfile, get_dns_hosts(context, network_ref))
-    restart_dhcp(context, dev, network_ref)
+    if not CONF.dnsmasq_hup_interval:
+        write_to_file(hostsfile, get_dns_hosts(context, network_ref))
+        restart_dhcp(context, dev, network_ref)
+        return
+
+    changed = _write_dnsmasq_file(hostsfile,
+                                  get_dns_hosts(context, network_ref))
+    restart_dhcp(context, dev, network_ref, changed=changed)
+
+
+# Contents of the files last written for the dnsmasq servers of this
+# host, and the time of the last HUP and the pending HUP of each server,
+# used when dnsmasq_hup_interval is set.
+_dnsmasq_files = {}
+_dnsmasq_last_hup = {}
+_dnsmasq_pending_hup = {}
+
+
+def _write_dnsmasq_file(path, data):
+    """Atomically replace a dnsmasq file if its contents changed.
+
+    Returns whether the file was written.
+    """
+    if _dnsmasq_files.get(path) == data and os.path.exists(path):
+        return False
+    tmp_path = '%s.tmp' % path
+    write_to_file(tmp_path, data)
+    # Make sure dnsmasq can actually read it (it setuid()s to "nobody")
+    os.chmod(tmp_path, 0o644)
+    os.rename(tmp_path, path)
+    _dnsmasq_files[path] = data
+    return True
+
+
+def _hup_dnsmasq(dev, pid):
+    """Make a dnsmasq reload its files, at most once per interval.
+
+    A HUP requested within dnsmasq_hup_interval of the previous one is
+    deferred to the end of the interval, and further requests made in
+    the meantime are served by that same HUP.
+    """
+    if dev in _dnsmasq_pending_hup:
+        return
+    delay = (_dnsmasq_last_hup.get(dev, 0) + CONF.dnsmasq_hup_interval -
+             timeutils.utcnow_ts())
+    if delay > 0:
+        LOG.debug(_('Deferring dnsmasq HUP for %(dev)s by %(delay)ss'),
+                  {'dev': dev, 'delay': delay})
+        _dnsmasq_pending_hup[dev] = greenthread.spawn_after(
+            delay, _deferred_hup_dnsmasq, dev)
+        return
+    _execute('kill', '-HUP', pid, run_as_root=True)
+    _dnsmasq_last_hup[dev] = timeutils.utcnow_ts()
+
+
+@utils.synchronized('dnsmasq_start')
+def _deferred_hup_dnsmasq(dev):
+    _dnsmasq_pending_hup.pop(dev, None)
+    pid = _dnsmasq_pid_for(dev)
+    if not pid:
+        return
+    conffile = _dhcp_file(dev, 'conf')
+    out, _err = _execute('cat', '/proc/%d/cmdline' % pid,
+                         check_exit_code=False)
+    if conffile.split('/')[-1] not in out:
+        LOG.debug(_('Pid %d is stale, skip hupping dnsmasq'), pid)
+        return
+    try:
+        _hup_dnsmasq(dev, pid)
+    except Exception as exc:  # pylint: disable=W0703
+        LOG.error(_('Hupping dnsmasq threw %s'), exc)
 
 
 def update_dhcp_hostfile_with_text(dev, hosts_text):
@@ -993,6 +1200,9 @@ def update_dhcp_hostfile_with_text(dev, hosts_text):
 
 
 def kill_dhcp(dev):
+    pending_hup = _dnsmasq_pending_hup.pop(dev, None)
+    if pending_hup:
+        pending_hup.cancel()
     pid = _dnsmasq_pid_for(dev)
     if pid:
         # Check that the process exists and looks like a dnsmasq process
@@ -1011,11 +1221,13 @@ def kill_dhcp(dev):
 #           configuration options (like dchp-range, vlan, ...)
 #           aren't reloaded.
 @utils.synchronized('dnsmasq_start')
-def restart_dhcp(context, dev, network_ref):
+def restart_dhcp(context, dev, network_ref, changed=True):
     """(Re)starts a dnsmasq server for a given network.
 
     If a dnsmasq instance is already running then send a HUP
     signal causing it to reload, otherwise spawn a new instance.
+    When dnsmasq_hup_interval is set, a running instance is only
+    sent a HUP if its files changed.
 
     """
     conffile = _dhcp_file(dev, 'conf')
@@ -1024,8 +1236,12 @@ def restart_dhcp(context, dev, network_ref):
         # NOTE(vish): this will have serious performance implications if we
         #             are not in multi_host mode.
         optsfile = _dhcp_file(dev, 'opts')
-        write_to_file(optsfile, get_dhcp_opts(context, network_ref))
-        os.chmod(optsfile, 0o644)
+        if not CONF.dnsmasq_hup_interval:
+            write_to_file(optsfile, get_dhcp_opts(context, network_ref))
+            os.chmod(optsfile, 0o644)
+        elif optsfile not in _dnsmasq_files:
+            changed |= _write_dnsmasq_file(
+                optsfile, get_dhcp_opts(context, network_ref))
 
     if network_ref['multi_host']:
         _add_dhcp_mangle_rule(dev)
@@ -1043,7 +1259,10 @@ def restart_dhcp(context, dev, network_ref):
         # of the file itself
         if conffile.split('/')[-1] in out:
             try:
-                _execute('kill', '-HUP', pid, run_as_root=True)
+                if not CONF.dnsmasq_hup_interval:
+                    _execute('kill', '-HUP', pid, run_as_root=True)
+                elif changed:
+                    _hup_dnsmasq(dev, pid)
                 _add_dnsmasq_accept_rules(dev)
                 return
             except Exception as exc:  # pylint: disable=W0703
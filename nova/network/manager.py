@@ -159,6 +159,14 @@ network_opts = [
     cfg.StrOpt('l3_lib',
                default='nova.network.l3.LinuxNetL3',
                help="Indicates underlying L3 management library"),
+    cfg.IntOpt('fixed_ip_create_batch_size',
+               default=0,
+               help='Number of fixed ips created in each transaction when '
+                    'a network is created. 0 creates all the fixed ips of '
+                    'the network in a single transaction. If a batch '
+                    'fails, the fixed ips created by the earlier batches '
+                    'are kept and the network is left partially '
+                    'populated.'),
     ]
 
 CONF = cfg.CONF
@@ -168,6 +176,38 @@ CONF.import_opt('my_ip', 'nova.netconf')
 CONF.import_opt('network_topic', 'nova.network.rpcapi')
 
 
+def _ip_filter_to_like(ip_filter):
+    """Return a SQL LIKE pattern for an address regular expression.
+
+    The pattern selects at least the addresses the expression matches
+    from their start, or None is returned when the expression is more
+    than a sequence of address characters, optionally anchored and
+    followed by '.*' or '$'.
+    """
+    if ip_filter.startswith('^'):
+        ip_filter = ip_filter[1:]
+    like = []
+    i = 0
+    while i < len(ip_filter):
+        char = ip_filter[i]
+        if ip_filter[i:] in ('$', '.*', '.*$'):
+            break
+        if ip_filter[i:i + 2] == '\\.':
+            like.append('.')
+            i += 2
+            continue
+        if char == '.':
+            like.append('_')
+        elif char.isalnum() or char == ':':
+            like.append(char)
+        else:
+            return None
+        i += 1
+    if ip_filter[i:] != '$':
+        like.append('%')
+    return ''.join(like)
+
+
 class RPCAllocateFixedIP(object):
     """Mixin class originally for FlatDCHP and VLAN network managers.
 
@@ -389,52 +429,94 @@ class NetworkManager(manager.Manager):
         ip_filter = re.compile(str(filters.get('ip')))
         ipv6_filter = re.compile(str(filters.get('ip6')))
 
-        # NOTE(jkoelker) Should probably figure out a better way to do
-        #                this. But for now it "works", this could suck on
-        #                large installs.
+        # Exact and prefix searches of the fixed and floating addresses
+        # are done by the database, the other expressions need a scan of
+        # all the virtual interfaces, as does any ipv6 search since those
+        # addresses are derived from the interface and network.
+        like_patterns = []
+        if fixed_ip_filter is not None:
+            like_patterns.append(fixed_ip_filter)
+        scan_ips = False
+        if filters.get('ip') is not None:
+            like_pattern = _ip_filter_to_like(str(filters['ip']))
+            if like_pattern is None:
+                scan_ips = True
+            else:
+                like_patterns.append(like_pattern)
+        scan_ipv6 = filters.get('ip6') is not None
 
-        vifs = self.db.virtual_interface_get_all(context)
         results = []
 
+        if scan_ips or scan_ipv6:
+            # NOTE(jkoelker) Should probably figure out a better way to do
+            #                this. But for now it "works", this could suck on
+            #                large installs.
+            vifs = self.db.virtual_interface_get_all(context)
+        else:
+            vifs = []
+
         for vif in vifs:
             if vif['instance_uuid'] is None:
                 continue
 
-            network = self._get_network_by_id(context, vif['network_id'])
-            fixed_ipv6 = None
-            if network['cidr_v6'] is not None:
-                fixed_ipv6 = ipv6.to_global(network['cidr_v6'],
-                                            vif['address'],
-                                            context.project_id)
+            if scan_ipv6:
+                network = self._get_network_by_id(context, vif['network_id'])
+                fixed_ipv6 = None
+                if network['cidr_v6'] is not None:
+                    fixed_ipv6 = ipv6.to_global(network['cidr_v6'],
+                                                vif['address'],
+                                                context.project_id)
 
-            if fixed_ipv6 and ipv6_filter.match(fixed_ipv6):
-                results.append({'instance_uuid': vif['instance_uuid'],
-                                'ip': fixed_ipv6})
+                if fixed_ipv6 and ipv6_filter.match(fixed_ipv6):
+                    results.append({'instance_uuid': vif['instance_uuid'],
+                                    'ip': fixed_ipv6})
 
+            if not scan_ips:
+                continue
             vif_id = vif['id']
             fixed_ips = self.db.fixed_ips_by_virtual_interface(context,
                                                                vif_id)
             for fixed_ip in fixed_ips:
-                if not fixed_ip or not fixed_ip['address']:
+                results.extend(self._filter_fixed_ip(vif['instance_uuid'],
+                                                     fixed_ip,
+                                                     fixed_ip_filter,
+                                                     ip_filter))
+
+        if not scan_ips:
+            fixed_ips = {}
+            for like_pattern in like_patterns:
+                for fixed_ip in self.db.fixed_ip_get_by_address_like(
+                        context, like_pattern):
+                    fixed_ips[fixed_ip['id']] = fixed_ip
+            for fixed_ip_id in sorted(fixed_ips):
+                fixed_ip = fixed_ips[fixed_ip_id]
+                if fixed_ip['instance_uuid'] is None:
                     continue
-                if fixed_ip['address'] == fixed_ip_filter:
-                    results.append({'instance_uuid': vif['instance_uuid'],
-                                    'ip': fixed_ip['address']})
-                    continue
-                if ip_filter.match(fixed_ip['address']):
-                    results.append({'instance_uuid': vif['instance_uuid'],
-                                    'ip': fixed_ip['address']})
-                    continue
-                for floating_ip in fixed_ip.get('floating_ips', []):
-                    if not floating_ip or not floating_ip['address']:
-                        continue
-                    if ip_filter.match(floating_ip['address']):
-                        results.append({'instance_uuid': vif['instance_uuid'],
-                                        'ip': floating_ip['address']})
-                        continue
+                results.extend(self._filter_fixed_ip(fixed_ip['instance_uuid'],
+                                                     fixed_ip,
+                                                     fixed_ip_filter,
+                                                     ip_filter))
 
         return results
 
+    def _filter_fixed_ip(self, instance_uuid, fixed_ip, fixed_ip_filter,
+                         ip_filter):
+        """Return the matches of a fixed ip or its floating ips."""
+        if not fixed_ip or not fixed_ip['address']:
+            return []
+        if (fixed_ip['address'] == fixed_ip_filter or
+                ip_filter.match(fixed_ip['address'])):
+            return [{'instance_uuid': instance_uuid,
+                     'ip': fixed_ip['address']}]
+        results = []
+        for floating_ip in fixed_ip.get('floating_ips', []):
+            if not floating_ip or not floating_ip['address']:
+                continue
+            if ip_filter.match(floating_ip['address']):
+                results.append({'instance_uuid': instance_uuid,
+                                'ip': floating_ip['address']})
+        return results
+
     def _get_networks_for_instance(self, context, instance_id, project_id,
                                    requested_networks=None):
         """Determine & return which networks an instance should connect to."""
@@ -1225,18 +1307,33 @@ class NetworkManager(manager.Manager):
         if not fixed_cidr:
             fixed_cidr = netaddr.IPNetwork(network['cidr'])
         num_ips = len(fixed_cidr)
-        ips = []
-        for index in range(num_ips):
-            address = str(fixed_cidr[index])
-            if index < bottom_reserved or num_ips - index <= top_reserved:
-                reserved = True
-            else:
-                reserved = False
 
-            ips.append({'network_id': network_id,
-                        'address': address,
-                        'reserved': reserved})
-        self.db.fixed_ip_bulk_create(context, ips)
+        def fixed_ips():
+            for index, address in enumerate(fixed_cidr):
+                if index < bottom_reserved or num_ips - index <= top_reserved:
+                    reserved = True
+                else:
+                    reserved = False
+
+                yield {'network_id': network_id,
+                       'address': str(address),
+                       'reserved': reserved}
+
+        batch_size = CONF.fixed_ip_create_batch_size
+        if batch_size <= 0:
+            self.db.fixed_ip_bulk_create(context, fixed_ips())
+            return
+
+        ips = fixed_ips()
+        created = 0
+        while created < num_ips:
+            self.db.fixed_ip_bulk_create(context,
+                                         itertools.islice(ips, batch_size))
+            created = min(created + batch_size, num_ips)
+            LOG.info(_('Created %(created)d of %(total)d fixed ips for '
+                       'network %(network)s'),
+                     {'created': created, 'total': num_ips,
+                      'network': network['cidr']})
 
     def _allocate_fixed_ips(self, context, instance_id, host, networks,
                             **kwargs):
@@ -249,11 +249,15 @@ def bandwidth_usage(instance_ref, audit_start,
     # is here to avoid circular imports.
     from nova.objects import instance as instance_obj
     if isinstance(instance_ref, instance_obj.Instance):
-        nw_info = instance_ref.info_cache.network_info
+        nw_info = instance_ref.info_cache.network_info_primitive()
     else:
         nw_info = _get_nwinfo_old_skool()
 
     macs = [vif['address'] for vif in nw_info]
+    if not macs:
+        # Usage is only reported for the VIFs of the instance, so there is
+        # nothing to look up for instances which are still being built.
+        return {}
     uuids = [instance_ref["uuid"]]
 
     bw_usages = db.bw_usage_get_by_uuids(admin_context, uuids, audit_start)
@@ -52,6 +52,9 @@ def make_class_properties(cls):
         for field, typefn in supercls.fields.items():
             if field not in cls.fields:
                 cls.fields[field] = typefn
+    # Changes are tracked in an integer bitmap, with one bit per field
+    cls._obj_field_bits = dict((name, 1 << i) for i, name in
+                               enumerate(sorted(cls.fields)))
     for name, typefn in cls.fields.iteritems():
 
         def getter(self, name=name):
@@ -60,8 +63,9 @@ def make_class_properties(cls):
                 self.obj_load_attr(name)
             return getattr(self, attrname)
 
-        def setter(self, value, name=name, typefn=typefn):
-            self._changed_fields.add(name)
+        def setter(self, value, name=name, typefn=typefn,
+                   bit=cls._obj_field_bits[name]):
+            self._changed_bits |= bit
             try:
                 return setattr(self, get_attrname(name), typefn(value))
             except Exception:
@@ -80,6 +84,25 @@ class NovaObjectMetaclass(type):
     # remoted. If this is not None, use it to remote things over RPC.
     indirection_api = None
 
+    def __new__(mcs, name, bases, dict_):
+        # Field values are kept in __slots__ rather than in an instance
+        # __dict__, so add a slot for each field which no base class has
+        # one for yet. Any slots the class declares itself are kept.
+        fields = set(dict_.get('fields', {}))
+        slotted = set()
+        for base in bases:
+            for cls in getattr(base, '__mro__', (base,)):
+                fields.update(getattr(cls, 'fields', {}))
+                slotted.update(cls.__dict__.get('__slots__', ()))
+        slots = list(dict_.get('__slots__', ()))
+        for field in sorted(fields):
+            attrname = get_attrname(field)
+            if attrname not in slotted and attrname not in slots:
+                slots.append(attrname)
+        dict_['__slots__'] = tuple(slots)
+        return super(NovaObjectMetaclass, mcs).__new__(mcs, name, bases,
+                                                       dict_)
+
     def __init__(cls, names, bases, dict_):
         if not hasattr(cls, '_obj_classes'):
             # This will be set in the 'NovaObject' class.
@@ -136,7 +159,8 @@ def remotable(fn):
             for key, value in updates.iteritems():
                 if key in self.fields:
                     self[key] = self._attr_from_primitive(key, value)
-            self._changed_fields = set(updates.get('obj_what_changed', []))
+            self._changed_bits = self._obj_bits_for(
+                updates.get('obj_what_changed', []))
             return result
         else:
             return fn(self, ctxt, *args, **kwargs)
@@ -178,6 +202,14 @@ class NovaObject(object):
     """
     __metaclass__ = NovaObjectMetaclass
 
+    # Storage which is not for a field. The __dict__ is only allocated
+    # when something which has no slot is set on the object, so it is
+    # kept for compatibility with code setting other attributes.
+    __slots__ = ('__dict__', '__weakref__', '_changed_bits', '_context')
+
+    # Mapping of field name to its bit in _changed_bits
+    _obj_field_bits = {}
+
     # Version of this object (see rules above check_object_version())
     version = '1.0'
 
@@ -197,8 +229,15 @@ class NovaObject(object):
         }
     obj_extra_fields = []
 
+    # Remotable methods which only need the fields in obj_delta_fields
+    # and the changed fields of the object. When the indirection service
+    # supports it, these are remoted with obj_to_delta_primitive() so
+    # that the unchanged fields do not go over the wire.
+    obj_delta_methods = []
+    obj_delta_fields = []
+
     def __init__(self):
-        self._changed_fields = set()
+        self._changed_bits = 0
         self._context = None
 
     @classmethod
@@ -248,6 +287,14 @@ class NovaObject(object):
             return getattr(self, handler)(value)
         return value
 
+    def _obj_field_from_primitive(self, name, value):
+        """Set field name from its primitive value.
+
+        Subclasses can override this to defer the deserialization of
+        expensive fields until they are used.
+        """
+        setattr(self, name, self._attr_from_primitive(name, value))
+
     @classmethod
     def obj_from_primitive(cls, primitive, context=None):
         """Simple base-case hydration.
@@ -268,10 +315,9 @@ class NovaObject(object):
         self._context = context
         for name in self.fields:
             if name in objdata:
-                setattr(self, name,
-                        self._attr_from_primitive(name, objdata[name]))
+                self._obj_field_from_primitive(name, objdata[name])
         changes = primitive.get('nova_object.changes', [])
-        self._changed_fields = set([x for x in changes if x in self.fields])
+        self._changed_bits = self._obj_bits_for(changes)
         return self
 
     _attr_created_at_to_primitive = obj_utils.dt_serializer('created_at')
@@ -291,13 +337,9 @@ class NovaObject(object):
         else:
             return getattr(self, attribute)
 
-    def obj_to_primitive(self):
-        """Simple base-case dehydration.
-
-        This calls self._attr_to_primitive() for each item in fields.
-        """
+    def _obj_to_primitive(self, names):
         primitive = dict()
-        for name in self.fields:
+        for name in names:
             if self.obj_attr_is_set(name):
                 primitive[name] = self._attr_to_primitive(name)
         obj = {'nova_object.name': self.obj_name(),
@@ -308,6 +350,28 @@ class NovaObject(object):
             obj['nova_object.changes'] = list(self.obj_what_changed())
         return obj
 
+    def obj_to_primitive(self):
+        """Simple base-case dehydration.
+
+        This calls self._attr_to_primitive() for each item in fields.
+        """
+        return self._obj_to_primitive(self.fields)
+
+    def obj_to_delta_primitive(self):
+        """Dehydration of only the fields needed by a delta method.
+
+        This is like obj_to_primitive(), but only includes the fields in
+        obj_delta_fields, the changed fields and the fields holding
+        objects which have changes of their own. The result hydrates with
+        obj_from_primitive() into an object with only those fields set.
+        """
+        names = set(self.obj_delta_fields) | self.obj_what_changed()
+        for name in self.fields:
+            if (self.obj_attr_is_set(name) and
+                    obj_has_changes(getattr(self, name))):
+                names.add(name)
+        return self._obj_to_primitive(names)
+
     def obj_load_attr(self, attrname):
         """Load an additional attribute from the real object.
 
@@ -325,9 +389,23 @@ class NovaObject(object):
         """
         raise NotImplementedError('Cannot save anything in the base class')
 
+    def _obj_bits_for(self, fields):
+        """Return the bits in _changed_bits for the named fields.
+
+        Names which are not fields of this object are ignored.
+        """
+        bits = 0
+        for name in fields:
+            bits |= self._obj_field_bits.get(name, 0)
+        return bits
+
     def obj_what_changed(self):
         """Returns a set of fields that have been modified."""
-        return self._changed_fields
+        changed_bits = self._changed_bits
+        if not changed_bits:
+            return set()
+        return set(name for name, bit in self._obj_field_bits.iteritems()
+                   if changed_bits & bit)
 
     def obj_reset_changes(self, fields=None):
         """Reset the list of fields that have been changed.
@@ -335,9 +413,9 @@ class NovaObject(object):
         Note that this is NOT "revert to previous values"
         """
         if fields:
-            self._changed_fields -= set(fields)
+            self._changed_bits &= ~self._obj_bits_for(fields)
         else:
-            self._changed_fields.clear()
+            self._changed_bits = 0
 
     def obj_attr_is_set(self, attrname):
         """Test object to see if attrname is present.
@@ -510,6 +588,20 @@ class NovaObjectSerializer(nova.openstack.common.rpc.serializer.Serializer):
         return entity
 
 
+def obj_has_changes(obj):
+    """Return True if obj is an object, or a list of objects, with changes.
+
+    Anything which is not a NovaObject has no changes of its own.
+    """
+    if not isinstance(obj, NovaObject):
+        return False
+    if obj.obj_what_changed():
+        return True
+    if isinstance(obj, ObjectListBase) and obj.obj_attr_is_set('objects'):
+        return any(obj_has_changes(x) for x in obj)
+    return False
+
+
 def obj_to_primitive(obj):
     """Recursively turn an object into a python primitive.
 
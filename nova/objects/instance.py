@@ -52,6 +52,8 @@ class Instance(base.NovaObject):
     # Version 1.5: Added cleaned
     VERSION = '1.5'
 
+    __slots__ = ('_orig_metadata', '_orig_system_metadata')
+
     fields = {
         'id': int,
 
@@ -140,6 +142,11 @@ class Instance(base.NovaObject):
 
     obj_extra_fields = ['name']
 
+    # save() only writes the changed fields, and the changed nested
+    # objects, of the instance identified by uuid
+    obj_delta_methods = ['save']
+    obj_delta_fields = ['id', 'uuid', 'cell_name']
+
     def __init__(self, *args, **kwargs):
         super(Instance, self).__init__(*args, **kwargs)
         self.obj_reset_changes()
@@ -290,6 +297,12 @@ class Instance(base.NovaObject):
 
     @base.remotable
     def create(self, context):
+        updates, expected_attrs = self._get_create_updates()
+        db_inst = db.instance_create(context, updates)
+        Instance._from_db_object(context, self, db_inst, expected_attrs)
+
+    def _get_create_updates(self):
+        """Return the database values and expected_attrs for create()."""
         if self.obj_attr_is_set('id'):
             raise exception.ObjectActionError(action='create',
                                               reason='already created')
@@ -305,8 +318,7 @@ class Instance(base.NovaObject):
             updates['info_cache'] = {
                 'network_info': updates['info_cache'].network_info.json()
                 }
-        db_inst = db.instance_create(context, updates)
-        Instance._from_db_object(context, self, db_inst, expected_attrs)
+        return updates, expected_attrs
 
     @base.remotable
     def destroy(self, context):
@@ -503,6 +515,35 @@ def expected_cols(expected_attrs):
 
 
 class InstanceList(base.ObjectListBase, base.NovaObject):
+    # Version 1.0: Initial version
+    # Version 1.1: Added create_bulk()
+    VERSION = '1.1'
+
+    @base.remotable_classmethod
+    def create_bulk(cls, context, instances):
+        """Create new instances in a single database transaction.
+
+        :param instances: A list of Instance objects which have not been
+                          created yet.
+        :returns: An InstanceList of the created instances, in order.
+        """
+        updates_list = []
+        expected_attrs_list = []
+        for instance in instances:
+            updates, expected_attrs = instance._get_create_updates()
+            updates_list.append(updates)
+            expected_attrs_list.append(expected_attrs)
+        db_inst_list = db.instance_create_many(context, updates_list)
+
+        inst_list = cls()
+        inst_list.objects = []
+        for instance, db_inst, expected_attrs in zip(instances, db_inst_list,
+                                                     expected_attrs_list):
+            inst_list.objects.append(Instance._from_db_object(
+                    context, instance, db_inst, expected_attrs))
+        inst_list.obj_reset_changes()
+        return inst_list
+
     @base.remotable_classmethod
     def get_by_filters(cls, context, filters,
                        sort_key='created_at', sort_dir='desc', limit=None,
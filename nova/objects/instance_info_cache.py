@@ -19,6 +19,7 @@ from nova import exception
 from nova.objects import base
 from nova.objects import utils
 from nova.openstack.common.gettextutils import _
+from nova.openstack.common import jsonutils
 from nova.openstack.common import log as logging
 
 LOG = logging.getLogger(__name__)
@@ -31,20 +32,84 @@ class InstanceInfoCache(base.NovaObject):
     # Version 1.2: Added new() and update_cells kwarg to save().
     # Version 1.3: Added delete()
 
+    # The JSON of network_info from the database or over RPC. The network
+    # model is only built from it when network_info is used, and a value
+    # set on network_info takes precedence over it.
+    __slots__ = ('_network_info_json',)
+
     fields = {
         'instance_uuid': str,
         'network_info': utils.network_model_or_none,
         }
 
+    def _network_info_is_json(self):
+        return (hasattr(self, '_network_info_json') and
+                not hasattr(self, base.get_attrname('network_info')))
+
     def _attr_network_info_to_primitive(self):
+        if self._network_info_is_json():
+            return self._network_info_json
         if self.network_info is None:
             return None
         return self.network_info.json()
 
+    def _set_network_info(self, network_info):
+        """Set network_info, deferring the hydration of JSON."""
+        if isinstance(network_info, basestring):
+            self._network_info_json = network_info
+            if hasattr(self, base.get_attrname('network_info')):
+                delattr(self, base.get_attrname('network_info'))
+        else:
+            self.network_info = network_info
+
+    def _obj_field_from_primitive(self, name, value):
+        if name == 'network_info':
+            self._set_network_info(value)
+        else:
+            super(InstanceInfoCache, self)._obj_field_from_primitive(name,
+                                                                     value)
+
+    def obj_load_attr(self, attrname):
+        if attrname == 'network_info' and self._network_info_is_json():
+            changes = self.obj_what_changed()
+            self.network_info = self._network_info_json
+            del self._network_info_json
+            if 'network_info' not in changes:
+                self.obj_reset_changes(['network_info'])
+            return
+        super(InstanceInfoCache, self).obj_load_attr(attrname)
+
+    def obj_attr_is_set(self, attrname):
+        if attrname == 'network_info' and self._network_info_is_json():
+            return True
+        return super(InstanceInfoCache, self).obj_attr_is_set(attrname)
+
+    def network_info_primitive(self):
+        """Return the network info as a list of VIF dicts.
+
+        Unlike network_info, this does not build the network model when
+        the info cache still holds the JSON. The dicts have the keys of
+        the network model, but not its methods.
+        """
+        if self._network_info_is_json():
+            return jsonutils.loads(self._network_info_json) or []
+        return self.network_info or []
+
+    def fixed_ip_addresses(self):
+        """Return the addresses of the fixed IPs of all the VIFs."""
+        return [ip['address']
+                for vif in self.network_info_primitive() if vif['network']
+                for subnet in vif['network']['subnets']
+                for ip in subnet['ips']]
+
+    def mac_addresses(self):
+        """Return the MAC addresses of all the VIFs."""
+        return [vif['address'] for vif in self.network_info_primitive()]
+
     @staticmethod
     def _from_db_object(context, info_cache, db_obj):
         info_cache.instance_uuid = db_obj['instance_uuid']
-        info_cache.network_info = db_obj['network_info']
+        info_cache._set_network_info(db_obj['network_info'])
         info_cache.obj_reset_changes()
         info_cache._context = context
         return info_cache
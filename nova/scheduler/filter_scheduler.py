@@ -19,6 +19,7 @@ You can customize this scheduler by specifying your own Host Filters and
 Weighing Functions.
 """
 
+import heapq
 import random
 
 from oslo.config import cfg
@@ -48,7 +49,31 @@ filter_scheduler_opts = [
                     'chosen from. A value of 1 chooses the '
                     'first host returned by the weighing functions. '
                     'This value must be at least 1. Any value less than 1 '
-                    'will be ignored, and 1 will be used instead')
+                    'will be ignored, and 1 will be used instead'),
+    cfg.BoolOpt('scheduler_batch_placement',
+                default=False,
+                help='When scheduling several instances in one request, '
+                     'filter and weigh all hosts only once and afterwards '
+                     'only re-check the host each instance was placed on. '
+                     'This requires every per-instance filter and every '
+                     'weigher to depend only on the host being checked. '
+                     'Requests using a scheduler group hint are always '
+                     'placed one instance at a time.'),
+    cfg.BoolOpt('scheduler_claim_resources',
+                default=False,
+                help='Provisionally claim the resources of each chosen host '
+                     'in the database before casting to compute, so that '
+                     'several scheduler workers or services never place '
+                     'instances on the same remaining capacity.  A host '
+                     'whose claim fails is skipped in favour of the next '
+                     'best host.'),
+    cfg.FloatOpt('scheduler_timing_sample_rate',
+                 default=0.0,
+                 help='Fraction of the scheduling requests for which the '
+                      'time taken and hosts eliminated by each filter and '
+                      'weigher are recorded and sent in a '
+                      'scheduler.select.timings notification.  0 disables '
+                      'the instrumentation and 1 records every request.'),
 ]
 
 CONF.register_opts(filter_scheduler_opts)
@@ -97,6 +122,7 @@ class FilterScheduler(driver.Scheduler):
         for num, instance_uuid in enumerate(instance_uuids):
             request_spec['instance_properties']['launch_index'] = num
 
+            weighed_host = None
             try:
                 try:
                     weighed_host = weighed_hosts.pop(0)
@@ -115,6 +141,9 @@ class FilterScheduler(driver.Scheduler):
                                          is_first_time,
                                          instance_uuid=instance_uuid)
             except Exception as ex:
+                if weighed_host is not None:
+                    self._release_resources(context, weighed_host.obj,
+                            request_spec['instance_properties'])
                 # NOTE(vish): we don't reraise the exception here to make sure
                 #             that all instances in the request get set to
                 #             error properly
@@ -146,6 +175,9 @@ class FilterScheduler(driver.Scheduler):
 
         # Couldn't fulfill the request_spec
         if len(selected_hosts) < num_instances:
+            for weighed_host in selected_hosts:
+                self._release_resources(context, weighed_host.obj,
+                                        request_spec['instance_properties'])
             raise exception.NoValidHost(reason='')
 
         dests = [dict(host=host.obj.host, nodename=host.obj.nodename,
@@ -181,10 +213,16 @@ class FilterScheduler(driver.Scheduler):
         except exception.InstanceNotFound:
             LOG.warning(_("Instance disappeared during scheduling"),
                         context=context, instance_uuid=instance_uuid)
+            self._release_resources(context, weighed_host.obj,
+                                    request_spec['instance_properties'])
 
         else:
             scheduler_utils.populate_filter_properties(filter_properties,
                     weighed_host.obj)
+            # Tells the compute host to give the claim back if the build
+            # fails before its resource tracker accounts for the instance.
+            filter_properties['scheduler_claim'] = self._claims_resources(
+                    weighed_host.obj)
 
             self.compute_rpcapi.run_instance(context,
                     instance=updated_instance,
@@ -322,38 +360,217 @@ class FilterScheduler(driver.Scheduler):
             num_instances = len(instance_uuids)
         else:
             num_instances = request_spec.get('num_instances', 1)
-        for num in xrange(num_instances):
-            # Filter local hosts based on requirements ...
-            hosts = self.host_manager.get_filtered_hosts(hosts,
-                    filter_properties, index=num)
-            if not hosts:
-                # Can't get any more locally.
-                break
 
-            LOG.debug(_("Filtered %(hosts)s"), {'hosts': hosts})
+        sample_rate = CONF.scheduler_timing_sample_rate
+        if sample_rate > 0 and random.random() < sample_rate:
+            filter_timings, weigher_timings = [], []
+        else:
+            filter_timings = weigher_timings = None
 
-            weighed_hosts = self.host_manager.get_weighed_hosts(hosts,
-                    filter_properties)
+        if (CONF.scheduler_batch_placement and num_instances > 1
+                and not update_group_hosts):
+            selected_hosts = self._schedule_batch(elevated, hosts,
+                    filter_properties, instance_properties, num_instances,
+                    filter_timings, weigher_timings)
+        else:
+            for num in xrange(num_instances):
+                # Filter local hosts based on requirements ...
+                hosts = self.host_manager.get_filtered_hosts(hosts,
+                        filter_properties, index=num, timings=filter_timings)
+                if not hosts:
+                    # Can't get any more locally.
+                    break
+
+                LOG.debug(_("Filtered %(hosts)s"), {'hosts': hosts})
+
+                weighed_hosts = self.host_manager.get_weighed_hosts(hosts,
+                        filter_properties, timings=weigher_timings)
+
+                LOG.debug(_("Weighed %(hosts)s"), {'hosts': weighed_hosts})
+
+                chosen_host = self._choose_host(elevated, weighed_hosts,
+                                                instance_properties)
+                if not chosen_host:
+                    break
+                selected_hosts.append(chosen_host)
+
+                # Now consume the resources so the filter/weights
+                # will change for the next instance.
+                chosen_host.obj.consume_from_instance(instance_properties)
+                if update_group_hosts is True:
+                    filter_properties['group_hosts'].append(
+                            chosen_host.obj.host)
+
+        if filter_timings is not None:
+            self._notify_timings(context, request_spec, num_instances,
+                                 selected_hosts, filter_timings,
+                                 weigher_timings)
+        return selected_hosts
 
-            LOG.debug(_("Weighed %(hosts)s"), {'hosts': weighed_hosts})
+    def _notify_timings(self, context, request_spec, num_instances,
+                        selected_hosts, filter_timings, weigher_timings):
+        """Send the filter and weigher timings of a request.
 
-            scheduler_host_subset_size = CONF.scheduler_host_subset_size
-            if scheduler_host_subset_size > len(weighed_hosts):
-                scheduler_host_subset_size = len(weighed_hosts)
-            if scheduler_host_subset_size < 1:
-                scheduler_host_subset_size = 1
+        They are also added to the host manager's summary and, when not
+        every instance could be placed, logged to show which filters
+        eliminated the hosts.
+        """
+        self.host_manager.record_timings(filter_timings)
+        self.host_manager.record_timings(weigher_timings)
+        if len(selected_hosts) < num_instances:
+            LOG.info(_("Placed %(selected)d of %(num_instances)d instances "
+                       "with filters: %(filters)s"),
+                     {'selected': len(selected_hosts),
+                      'num_instances': num_instances,
+                      'filters': ', '.join(
+                          '%(name)s %(objects_in)d -> %(objects_out)d' %
+                          timing for timing in filter_timings)})
+        payload = dict(instance_uuids=request_spec.get('instance_uuids'),
+                       num_instances=num_instances,
+                       num_selected=len(selected_hosts),
+                       filters=filter_timings,
+                       weighers=weigher_timings)
+        notifier.notify(context, notifier.publisher_id("scheduler"),
+                        'scheduler.select.timings', notifier.INFO, payload)
 
-            chosen_host = random.choice(
-                weighed_hosts[0:scheduler_host_subset_size])
+    def _schedule_batch(self, context, hosts, filter_properties,
+                        instance_properties, num_instances,
+                        filter_timings=None, weigher_timings=None):
+        """Choose hosts for several identical instances at once.
+
+        The hosts are filtered and weighed a single time and kept in a
+        heap ordered by weight.  Consuming an instance only changes the
+        state of the chosen host, so only that host is filtered and
+        weighed again before the next instance is placed.
+        """
+        hosts = self.host_manager.get_filtered_hosts(hosts,
+                filter_properties, index=0, timings=filter_timings)
+        if not hosts:
+            return []
+
+        LOG.debug(_("Filtered %(hosts)s"), {'hosts': hosts})
+
+        weighed_hosts = self.host_manager.get_weighed_hosts(hosts,
+                filter_properties, timings=weigher_timings)
+
+        LOG.debug(_("Weighed %(hosts)s"), {'hosts': weighed_hosts})
+
+        # Hosts of equal weight are chosen in their original order, as
+        # the stable sort of the weight handler does.
+        positions = dict((host_state, position)
+                         for position, host_state in enumerate(hosts))
+        heap = [(-weighed_host.weight, positions[weighed_host.obj],
+                 weighed_host) for weighed_host in weighed_hosts]
+        heapq.heapify(heap)
+
+        selected_hosts = []
+        while heap and len(selected_hosts) < num_instances:
+            scheduler_host_subset_size = self._get_host_subset_size(
+                    len(heap))
+            best_hosts = [heapq.heappop(heap)
+                          for i in xrange(scheduler_host_subset_size)]
+            chosen = random.choice(best_hosts)
+            for entry in best_hosts:
+                if entry is not chosen:
+                    heapq.heappush(heap, entry)
+
+            chosen_host = chosen[2]
+            host_state = chosen_host.obj
+            if not self._claim_resources(context, host_state,
+                                         instance_properties):
+                # Leave the host out of the rest of this request.
+                continue
             selected_hosts.append(chosen_host)
 
-            # Now consume the resources so the filter/weights
-            # will change for the next instance.
-            chosen_host.obj.consume_from_instance(instance_properties)
-            if update_group_hosts is True:
-                filter_properties['group_hosts'].append(chosen_host.obj.host)
+            # Now consume the resources and check whether the host can
+            # still take the next instance, and with which weight.
+            host_state.consume_from_instance(instance_properties)
+            if self.host_manager.get_filtered_hosts([host_state],
+                    filter_properties, index=len(selected_hosts),
+                    timings=filter_timings):
+                weighed_host = self.host_manager.get_weighed_hosts(
+                        [host_state], filter_properties,
+                        timings=weigher_timings)[0]
+                heapq.heappush(heap, (-weighed_host.weight, chosen[1],
+                                      weighed_host))
         return selected_hosts
 
+    def _choose_host(self, context, weighed_hosts, instance_properties):
+        """Choose one of the best weighed hosts and claim its resources.
+
+        Hosts whose claim fails are removed from weighed_hosts and the
+        choice is made again.  Returns None if no host could be claimed.
+        """
+        while weighed_hosts:
+            scheduler_host_subset_size = self._get_host_subset_size(
+                    len(weighed_hosts))
+            chosen_host = random.choice(
+                weighed_hosts[0:scheduler_host_subset_size])
+            if self._claim_resources(context, chosen_host.obj,
+                                     instance_properties):
+                return chosen_host
+            weighed_hosts.remove(chosen_host)
+        return None
+
+    def _claims_resources(self, host_state):
+        return (CONF.scheduler_claim_resources and
+                host_state.compute_node_id is not None)
+
+    def _claim_resources(self, context, host_state, instance_properties):
+        """Provisionally claim an instance's resources on a host.
+
+        The claim is recorded against the host's compute node in the
+        database, where other schedulers see it.  It must be given back
+        with _release_resources() if the instance is not sent to the host,
+        and the compute host gives it back if the build fails before its
+        resource tracker claims the resources itself.  Returns False if
+        another scheduler consumed the resources first, in which case the
+        host state is reloaded from the database.
+        """
+        if not self._claims_resources(host_state):
+            return True
+
+        local_gb = (instance_properties['root_gb'] +
+                    instance_properties['ephemeral_gb'])
+        if db.compute_node_reserve(context, host_state.compute_node_id,
+                                   instance_properties['memory_mb'],
+                                   local_gb, instance_properties['vcpus'],
+                                   host_state.limits):
+            return True
+
+        LOG.debug(_("Resources on %(host_state)s were claimed by another "
+                    "scheduler"), {'host_state': host_state})
+        try:
+            compute = db.compute_node_get(context,
+                                          host_state.compute_node_id)
+        except exception.ComputeHostNotFound:
+            return False
+        host_state.updated = None
+        host_state.update_from_compute_node(compute)
+        return False
+
+    def _release_resources(self, context, host_state, instance_properties):
+        """Give back a claim made by _claim_resources()."""
+        if not self._claims_resources(host_state):
+            return
+
+        LOG.debug(_("Releasing the resources claimed on %(host_state)s"),
+                  {'host_state': host_state})
+        local_gb = (instance_properties['root_gb'] +
+                    instance_properties['ephemeral_gb'])
+        db.compute_node_release(context.elevated(),
+                                host_state.compute_node_id,
+                                instance_properties['memory_mb'], local_gb,
+                                instance_properties['vcpus'])
+
+    def _get_host_subset_size(self, num_hosts):
+        scheduler_host_subset_size = CONF.scheduler_host_subset_size
+        if scheduler_host_subset_size > num_hosts:
+            scheduler_host_subset_size = num_hosts
+        if scheduler_host_subset_size < 1:
+            scheduler_host_subset_size = 1
+        return scheduler_host_subset_size
+
     def _get_compute_info(self, context, dest):
         """Get compute node's information
 
@@ -17,11 +17,29 @@
 Scheduler host filters
 """
 
+from nova import db
 from nova import filters
+from nova.scheduler import host_table
 
 
 class BaseHostFilter(filters.BaseFilter):
     """Base class for host filters."""
+
+    # Set to True in a subclass which implements filter_table()
+    supports_host_table = False
+
+    def filter_all(self, filter_obj_list, filter_properties):
+        """Return the hosts that pass the filter.
+
+        Filters supporting host tables check all the hosts at once when
+        NumPy is available, the others check one host at a time.
+        """
+        if self.supports_host_table and host_table.available():
+            table = host_table.get_table(filter_obj_list)
+            return table.select(self.filter_table(table, filter_properties))
+        return super(BaseHostFilter, self).filter_all(filter_obj_list,
+                                                      filter_properties)
+
     def _filter_one(self, obj, filter_properties):
         """Return True if the object passes the filter, otherwise False."""
         return self.host_passes(obj, filter_properties)
@@ -32,6 +50,31 @@ class BaseHostFilter(filters.BaseFilter):
         """
         raise NotImplementedError()
 
+    def filter_table(self, table, filter_properties):
+        """Return a boolean array of the hosts of a HostTable which pass
+        the filter.  Override this in a subclass setting
+        supports_host_table, with the same result as host_passes().
+        """
+        raise NotImplementedError()
+
+
+def aggregate_metadata_get_by_host(host_state, filter_properties, key=None):
+    """Return the metadata of the aggregates a host is in.
+
+    The metadata the HostManager loaded for all hosts at once is used when
+    the host state has it, otherwise it is read from the database.
+    """
+    metadata = getattr(host_state, 'aggregate_metadata', None)
+    if metadata is None:
+        context = filter_properties['context'].elevated()
+        return db.aggregate_metadata_get_by_host(context, host_state.host,
+                                                 key=key)
+    if key is None:
+        return metadata
+    if key in metadata:
+        return {key: metadata[key]}
+    return {}
+
 
 class HostFilterHandler(filters.BaseFilterHandler):
     def __init__(self):
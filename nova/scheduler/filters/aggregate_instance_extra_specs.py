@@ -14,7 +14,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from nova import db
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
 from nova.scheduler import filters
@@ -42,8 +41,8 @@ class AggregateInstanceExtraSpecsFilter(filters.BaseHostFilter):
         if 'extra_specs' not in instance_type:
             return True
 
-        context = filter_properties['context'].elevated()
-        metadata = db.aggregate_metadata_get_by_host(context, host_state.host)
+        metadata = filters.aggregate_metadata_get_by_host(host_state,
+                                                          filter_properties)
 
         for key, req in instance_type['extra_specs'].iteritems():
             # Either not scope format, or aggregate_instance_extra_specs scope
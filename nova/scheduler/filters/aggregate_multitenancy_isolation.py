@@ -13,7 +13,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from nova import db
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
 from nova.scheduler import filters
@@ -39,9 +38,8 @@ class AggregateMultiTenancyIsolation(filters.BaseHostFilter):
         props = spec.get('instance_properties', {})
         tenant_id = props.get('project_id')
 
-        context = filter_properties['context'].elevated()
-        metadata = db.aggregate_metadata_get_by_host(context, host_state.host,
-                                                     key="filter_tenant_id")
+        metadata = filters.aggregate_metadata_get_by_host(host_state,
+                filter_properties, key="filter_tenant_id")
 
         if metadata != {}:
             if tenant_id not in metadata["filter_tenant_id"]:
@@ -15,7 +15,6 @@
 
 from oslo.config import cfg
 
-from nova import db
 from nova.scheduler import filters
 
 CONF = cfg.CONF
@@ -39,9 +38,9 @@ class AvailabilityZoneFilter(filters.BaseHostFilter):
         availability_zone = props.get('availability_zone')
 
         if availability_zone:
-            context = filter_properties['context'].elevated()
-            metadata = db.aggregate_metadata_get_by_host(
-                         context, host_state.host, key='availability_zone')
+            metadata = filters.aggregate_metadata_get_by_host(
+                         host_state, filter_properties,
+                         key='availability_zone')
             if 'availability_zone' in metadata:
                 return availability_zone in metadata['availability_zone']
             else:
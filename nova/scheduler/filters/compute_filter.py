@@ -34,6 +34,8 @@ class ComputeFilter(filters.BaseHostFilter):
     # Host state does not change within a request
     run_filter_once_per_request = True
 
+    supports_host_table = True
+
     def host_passes(self, host_state, filter_properties):
         """Returns True for only active compute nodes."""
         capabilities = host_state.capabilities
@@ -49,3 +51,19 @@ class ComputeFilter(filters.BaseHostFilter):
                     {'host_state': host_state})
             return False
         return True
+
+    def filter_table(self, table, filter_properties):
+        disabled = table.column('service_disabled',
+                lambda host_state: bool(host_state.service['disabled']))
+        enabled = table.column('capabilities_enabled',
+                lambda host_state: bool(host_state.capabilities.get(
+                    "enabled", True)))
+        passes = (disabled == 0) & (enabled != 0)
+
+        # The servicegroup driver is pluggable, so liveness is checked one
+        # host at a time, and only for the hosts which are enabled.
+        for i in passes.nonzero()[0]:
+            service = table.host_states[i].service
+            if not self.servicegroup_api.service_is_up(service):
+                passes[i] = False
+        return passes
@@ -17,7 +17,6 @@
 
 from oslo.config import cfg
 
-from nova import db
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
 from nova.scheduler import filters
@@ -67,9 +66,29 @@ class BaseCoreFilter(filters.BaseHostFilter):
 class CoreFilter(BaseCoreFilter):
     """CoreFilter filters based on CPU core utilization."""
 
+    supports_host_table = True
+
     def _get_cpu_allocation_ratio(self, host_state, filter_properties):
         return CONF.cpu_allocation_ratio
 
+    def filter_table(self, table, filter_properties):
+        instance_type = filter_properties.get('instance_type')
+        if not instance_type:
+            return table.all()
+
+        host_vcpus_total = table.column('vcpus_total')
+        # Fail safe, the CPU collection is assumed broken on those hosts
+        unknown = host_vcpus_total == 0
+        if unknown.any():
+            LOG.warning(_("VCPUs not set; assuming CPU collection broken"))
+
+        vcpus_total = host_vcpus_total * CONF.cpu_allocation_ratio
+        table.set_limit('vcpu', vcpus_total, ~unknown & (vcpus_total > 0))
+
+        passes = (vcpus_total - table.column('vcpus_used') >=
+                  instance_type['vcpus'])
+        return passes | unknown
+
 
 class AggregateCoreFilter(BaseCoreFilter):
     """AggregateCoreFilter with per-aggregate CPU subscription flag.
@@ -78,12 +97,8 @@ class AggregateCoreFilter(BaseCoreFilter):
     """
 
     def _get_cpu_allocation_ratio(self, host_state, filter_properties):
-        context = filter_properties['context'].elevated()
-        # TODO(uni): DB query in filter is a performance hit, especially for
-        # system with lots of hosts. Will need a general solution here to fix
-        # all filters with aggregate DB call things.
-        metadata = db.aggregate_metadata_get_by_host(
-                     context, host_state.host, key='cpu_allocation_ratio')
+        metadata = filters.aggregate_metadata_get_by_host(
+                     host_state, filter_properties, key='cpu_allocation_ratio')
         aggregate_vals = metadata.get('cpu_allocation_ratio', set())
         num_values = len(aggregate_vals)
 
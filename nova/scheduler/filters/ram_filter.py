@@ -16,7 +16,6 @@
 
 from oslo.config import cfg
 
-from nova import db
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
 from nova.scheduler import filters
@@ -68,9 +67,24 @@ class BaseRamFilter(filters.BaseHostFilter):
 class RamFilter(BaseRamFilter):
     """Ram Filter with over subscription flag."""
 
+    supports_host_table = True
+
     def _get_ram_allocation_ratio(self, host_state, filter_properties):
         return CONF.ram_allocation_ratio
 
+    def filter_table(self, table, filter_properties):
+        instance_type = filter_properties.get('instance_type')
+        requested_ram = instance_type['memory_mb']
+        total_usable_ram_mb = table.column('total_usable_ram_mb')
+
+        memory_mb_limit = total_usable_ram_mb * CONF.ram_allocation_ratio
+        used_ram_mb = total_usable_ram_mb - table.column('free_ram_mb')
+        usable_ram = memory_mb_limit - used_ram_mb
+        passes = usable_ram >= requested_ram
+
+        table.set_limit('memory_mb', memory_mb_limit, passes)
+        return passes
+
 
 class AggregateRamFilter(BaseRamFilter):
     """AggregateRamFilter with per-aggregate ram subscription flag.
@@ -79,12 +93,8 @@ class AggregateRamFilter(BaseRamFilter):
     """
 
     def _get_ram_allocation_ratio(self, host_state, filter_properties):
-        context = filter_properties['context'].elevated()
-        # TODO(uni): DB query in filter is a performance hit, especially for
-        # system with lots of hosts. Will need a general solution here to fix
-        # all filters with aggregate DB call things.
-        metadata = db.aggregate_metadata_get_by_host(
-                     context, host_state.host, key='ram_allocation_ratio')
+        metadata = filters.aggregate_metadata_get_by_host(
+                     host_state, filter_properties, key='ram_allocation_ratio')
         aggregate_vals = metadata.get('ram_allocation_ratio', set())
         num_values = len(aggregate_vals)
 
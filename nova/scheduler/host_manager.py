@@ -17,6 +17,7 @@
 Manage hosts in the current zone.
 """
 
+import time
 import UserDict
 
 from oslo.config import cfg
@@ -30,6 +31,7 @@ from nova.openstack.common import jsonutils
 from nova.openstack.common import log as logging
 from nova.openstack.common import timeutils
 from nova.scheduler import filters
+from nova.scheduler import host_table
 from nova.scheduler import weights
 
 host_manager_opts = [
@@ -53,6 +55,28 @@ host_manager_opts = [
     cfg.ListOpt('scheduler_weight_classes',
                 default=['nova.scheduler.weights.all_weighers'],
                 help='Which weight class names to use for weighing hosts'),
+    cfg.BoolOpt('scheduler_use_host_state_cache',
+                default=False,
+                help='Keep host states between scheduling requests and only '
+                     'refresh the compute nodes that changed since the '
+                     'previous request, instead of reloading every compute '
+                     'node from the database each time.'),
+    cfg.IntOpt('scheduler_host_state_cache_max_age',
+               default=60,
+               help='Maximum number of seconds the cached host states may go '
+                    'without a full refresh from the database when '
+                    'scheduler_use_host_state_cache is enabled'),
+    cfg.BoolOpt('scheduler_use_aggregate_metadata_cache',
+                default=False,
+                help='Load the aggregate metadata of all hosts with a single '
+                     'query and let the aggregate filters look it up in '
+                     'memory, instead of querying the database for every '
+                     'host they check.'),
+    cfg.IntOpt('scheduler_aggregate_metadata_cache_max_age',
+               default=10,
+               help='Maximum number of seconds the aggregate metadata is '
+                    'kept before it is loaded again when '
+                    'scheduler_use_aggregate_metadata_cache is enabled'),
     ]
 
 CONF = cfg.CONF
@@ -122,6 +146,7 @@ class HostState(object):
         self.num_io_ops = 0
 
         # Other information
+        self.compute_node_id = None
         self.host_ip = None
         self.hypervisor_type = None
         self.hypervisor_version = None
@@ -132,6 +157,9 @@ class HostState(object):
         # Resource oversubscription values for the compute host:
         self.limits = {}
 
+        # Metadata of the host's aggregates, if the HostManager loaded it:
+        self.aggregate_metadata = None
+
         self.updated = None
 
     def update_capabilities(self, capabilities=None, service=None):
@@ -166,6 +194,7 @@ class HostState(object):
         self.vcpus_total = compute['vcpus']
         self.vcpus_used = compute['vcpus_used']
         self.updated = compute['updated_at']
+        self.compute_node_id = compute.get('id')
 
         # All virt drivers report host_ip
         self.host_ip = compute['host_ip']
@@ -281,6 +310,19 @@ class HostManager(object):
         self.weight_handler = weights.HostWeightHandler()
         self.weight_classes = self.weight_handler.get_matching_classes(
                 CONF.scheduler_weight_classes)
+        # Bookkeeping for the incremental host state cache
+        self._last_refresh = None
+        self._last_full_refresh = None
+        self.cache_stats = dict(full_refreshes=0, incremental_refreshes=0,
+                                host_state_refreshes=0, host_state_hits=0,
+                                last_refresh_seconds=0.0,
+                                total_refresh_seconds=0.0)
+        # Filter and weigher timings of the instrumented requests since
+        # the last summary, keyed by filter or weigher name
+        self.timing_stats = {}
+        # Aggregate metadata of all hosts, keyed by host name
+        self.aggregate_metadata = None
+        self._aggregate_metadata_loaded = None
 
     def _choose_host_filters(self, filter_cls_names):
         """Since the caller may specify which filters to use we need
@@ -309,8 +351,12 @@ class HostManager(object):
         return good_filters
 
     def get_filtered_hosts(self, hosts, filter_properties,
-            filter_class_names=None, index=0):
-        """Filter hosts and return only ones passing all filters."""
+            filter_class_names=None, index=0, timings=None):
+        """Filter hosts and return only ones passing all filters.
+
+        The time taken and hosts eliminated by each filter are appended
+        to timings if it is given.
+        """
 
         def _strip_ignore_hosts(host_map, hosts_to_ignore):
             ignored_hosts = []
@@ -379,13 +425,45 @@ class HostManager(object):
                     return name_to_cls_map.values()
             hosts = name_to_cls_map.itervalues()
 
+        if host_table.available():
+            # The filters of this pass share the columns of one table.
+            # It is built for every pass as the hosts change when an
+            # instance is placed on them.
+            hosts = host_table.HostTable(hosts).host_list()
+
         return self.filter_handler.get_filtered_objects(filter_classes,
-                hosts, filter_properties, index)
+                hosts, filter_properties, index, timings=timings)
 
-    def get_weighed_hosts(self, hosts, weight_properties):
-        """Weigh the hosts."""
+    def get_weighed_hosts(self, hosts, weight_properties, timings=None):
+        """Weigh the hosts.
+
+        The time taken by each weigher is appended to timings if it is
+        given.
+        """
         return self.weight_handler.get_weighed_objects(self.weight_classes,
-                hosts, weight_properties)
+                hosts, weight_properties, timings=timings)
+
+    def record_timings(self, timings):
+        """Add filter or weigher timings to the timing_stats summary."""
+        for timing in timings:
+            stats = self.timing_stats.setdefault(timing['name'],
+                    dict(calls=0, seconds=0.0, hosts=0, eliminated=0))
+            stats['calls'] += 1
+            stats['seconds'] += timing['seconds']
+            if 'objects_out' in timing:
+                stats['hosts'] += timing['objects_in']
+                stats['eliminated'] += (timing['objects_in'] -
+                                        timing['objects_out'])
+            else:
+                stats['hosts'] += timing['objects']
+
+    def log_timing_stats(self):
+        """Log and reset the timing_stats summary."""
+        for name, stats in sorted(self.timing_stats.iteritems()):
+            LOG.info(_("%(name)s: %(calls)d calls taking %(seconds).3f "
+                       "seconds over %(hosts)d hosts, %(eliminated)d hosts "
+                       "eliminated"), dict(stats, name=name))
+        self.timing_stats = {}
 
     def update_service_capabilities(self, service_name, host, capabilities):
         """Update the per-service capabilities based on this notification."""
@@ -410,37 +488,146 @@ class HostManager(object):
         the HostManager knows about. Also, each of the consumable resources
         in HostState are pre-populated and adjusted based on data in the db.
         """
+        start = time.time()
+        if self._host_state_cache_is_fresh():
+            updated = self._refresh_changed_host_states(context)
+            self.cache_stats['incremental_refreshes'] += 1
+            self.cache_stats['host_state_hits'] += (len(self.host_state_map) -
+                                                    updated)
+        else:
+            updated = self._refresh_all_host_states(context)
+            self.cache_stats['full_refreshes'] += 1
+        self.cache_stats['host_state_refreshes'] += updated
+        self.cache_stats['last_refresh_seconds'] = time.time() - start
+        self.cache_stats['total_refresh_seconds'] += (
+                self.cache_stats['last_refresh_seconds'])
+        LOG.debug(_("Refreshed %(updated)d of %(total)d host states in "
+                    "%(elapsed).3f seconds"),
+                  {'updated': updated, 'total': len(self.host_state_map),
+                   'elapsed': self.cache_stats['last_refresh_seconds']})
+        if CONF.scheduler_use_aggregate_metadata_cache:
+            self._update_aggregate_metadata(context)
+        return self.host_state_map.itervalues()
 
+    def _update_aggregate_metadata(self, context):
+        """Give every host state the metadata of its aggregates.
+
+        The metadata of all hosts is loaded with a single query, and
+        only again once it is older than
+        scheduler_aggregate_metadata_cache_max_age.
+        """
+        if (self._aggregate_metadata_loaded is None or
+                timeutils.is_older_than(self._aggregate_metadata_loaded,
+                        CONF.scheduler_aggregate_metadata_cache_max_age)):
+            self.aggregate_metadata = db.aggregate_metadata_get_all_by_host(
+                    context)
+            self._aggregate_metadata_loaded = timeutils.utcnow()
+        for host_state in self.host_state_map.itervalues():
+            host_state.aggregate_metadata = self.aggregate_metadata.get(
+                    host_state.host, {})
+
+    def _host_state_cache_is_fresh(self):
+        if not CONF.scheduler_use_host_state_cache:
+            return False
+        if self._last_full_refresh is None:
+            return False
+        return not timeutils.is_older_than(
+                self._last_full_refresh,
+                CONF.scheduler_host_state_cache_max_age)
+
+    def _update_host_state(self, compute):
+        """Update (or create) the HostState for a compute node record.
+
+        Returns the (host, node) key of the HostState, or None if the
+        compute node has no service.
+        """
+        service = compute['service']
+        if not service:
+            LOG.warn(_("No service for compute ID %s") % compute['id'])
+            return None
+        host = service['host']
+        node = compute.get('hypervisor_hostname')
+        state_key = (host, node)
+        capabilities = self.service_states.get(state_key, None)
+        host_state = self.host_state_map.get(state_key)
+        if host_state:
+            host_state.update_capabilities(capabilities,
+                                           dict(service.iteritems()))
+        else:
+            host_state = self.host_state_cls(host, node,
+                    capabilities=capabilities,
+                    service=dict(service.iteritems()))
+            self.host_state_map[state_key] = host_state
+        host_state.update_from_compute_node(compute)
+        return state_key
+
+    def _remove_host_state(self, state_key):
+        host, node = state_key
+        LOG.info(_("Removing dead compute node %(host)s:%(node)s "
+                   "from scheduler") % {'host': host, 'node': node})
+        del self.host_state_map[state_key]
+
+    def _refresh_all_host_states(self, context):
+        """Rebuild the host states from every compute node in the db.
+
+        Returns the number of host states updated.
+        """
+        self._last_refresh = timeutils.utcnow()
         # Get resource usage across the available compute nodes:
         compute_nodes = db.compute_node_get_all(context)
         seen_nodes = set()
         for compute in compute_nodes:
-            service = compute['service']
-            if not service:
-                LOG.warn(_("No service for compute ID %s") % compute['id'])
-                continue
-            host = service['host']
-            node = compute.get('hypervisor_hostname')
-            state_key = (host, node)
-            capabilities = self.service_states.get(state_key, None)
-            host_state = self.host_state_map.get(state_key)
-            if host_state:
-                host_state.update_capabilities(capabilities,
-                                               dict(service.iteritems()))
-            else:
-                host_state = self.host_state_cls(host, node,
-                        capabilities=capabilities,
-                        service=dict(service.iteritems()))
-                self.host_state_map[state_key] = host_state
-            host_state.update_from_compute_node(compute)
-            seen_nodes.add(state_key)
+            state_key = self._update_host_state(compute)
+            if state_key:
+                seen_nodes.add(state_key)
 
         # remove compute nodes from host_state_map if they are not active
         dead_nodes = set(self.host_state_map.keys()) - seen_nodes
         for state_key in dead_nodes:
-            host, node = state_key
-            LOG.info(_("Removing dead compute node %(host)s:%(node)s "
-                       "from scheduler") % {'host': host, 'node': node})
-            del self.host_state_map[state_key]
+            self._remove_host_state(state_key)
 
-        return self.host_state_map.itervalues()
+        self._last_full_refresh = self._last_refresh
+        return len(seen_nodes)
+
+    def _refresh_changed_host_states(self, context):
+        """Update only the host states whose compute node changed since
+        the previous refresh.
+
+        The service records are always reloaded, since they are cheap to
+        fetch and the compute filters rely on them being current.
+
+        Returns the number of host states updated from compute nodes.
+        """
+        changed_since = self._last_refresh
+        self._last_refresh = timeutils.utcnow()
+
+        services = dict((service['id'], service)
+                        for service in db.service_get_all(context))
+        for state_key, host_state in self.host_state_map.items():
+            service = services.get(host_state.service.get('id'))
+            if service is None:
+                self._remove_host_state(state_key)
+                continue
+            host_state.update_capabilities(
+                    self.service_states.get(state_key, None),
+                    dict(service.iteritems()))
+
+        compute_nodes = db.compute_node_get_all_changed_since(context,
+                                                              changed_since)
+        live_nodes = []
+        for compute in compute_nodes:
+            if not compute['deleted']:
+                live_nodes.append(compute)
+                continue
+            service = compute['service']
+            if not service:
+                continue
+            state_key = (service['host'], compute.get('hypervisor_hostname'))
+            if state_key in self.host_state_map:
+                self._remove_host_state(state_key)
+
+        updated = 0
+        for compute in live_nodes:
+            if self._update_host_state(compute):
+                updated += 1
+        return updated
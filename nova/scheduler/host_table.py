@@ -0,0 +1,117 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright (c) 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Columnar view of host states, for filters and weighers which evaluate all
+hosts of a request at once.  It needs NumPy; without it, filters and
+weighers evaluate one host at a time.
+"""
+
+import operator
+
+try:
+    import numpy
+except ImportError:
+    # NumPy is optional, filters and weighers fall back to one host at a
+    # time without it.
+    numpy = None
+
+
+def available():
+    """Return True if host tables can be used."""
+    return numpy is not None
+
+
+def get_table(host_states):
+    """Return a HostTable of a list of host states.
+
+    The table a HostList keeps is reused, so the columns already built for
+    its hosts are not read again from the host states.
+    """
+    table = getattr(host_states, 'host_table', None)
+    if table is None or len(table) != len(host_states):
+        table = HostTable(host_states)
+    return table
+
+
+class HostList(list):
+    """A list of host states which keeps the HostTable of its hosts."""
+
+    def __init__(self, host_states, host_table):
+        super(HostList, self).__init__(host_states)
+        self.host_table = host_table
+
+
+class HostTable(object):
+    """The attributes of a list of host states, as NumPy arrays.
+
+    A column is built the first time it is used, so only the attributes the
+    filters and weighers need are read from the host states.
+    """
+
+    def __init__(self, host_states):
+        self.host_states = list(host_states)
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.host_states)
+
+    def column(self, name, get_value=None):
+        """Return the values of a host state attribute as a float array.
+
+        If get_value is given, it is called with each host state to get
+        the values of the column instead.  None values are read as 0.
+        """
+        column = self._columns.get(name)
+        if column is None:
+            if get_value is None:
+                get_value = operator.attrgetter(name)
+            column = numpy.array([get_value(host_state) or 0
+                                  for host_state in self.host_states],
+                                 dtype=float)
+            self._columns[name] = column
+        return column
+
+    def host_list(self):
+        """Return a HostList of the host states of the table."""
+        return HostList(self.host_states, self)
+
+    def all(self):
+        """Return an array selecting all of the host states."""
+        return numpy.ones(len(self.host_states), dtype=bool)
+
+    def select(self, mask):
+        """Return a HostList of the host states selected by a boolean array.
+
+        Its table keeps the columns already built, for the selected hosts.
+        """
+        indices = numpy.flatnonzero(mask)
+        host_states = self.host_states
+        table = HostTable([host_states[i] for i in indices])
+        for name, column in self._columns.iteritems():
+            table._columns[name] = column[indices]
+        return table.host_list()
+
+    def set_limit(self, key, values, mask):
+        """Set a limit of the host states selected by a boolean array.
+
+        The limit of the host state at a given index is values[index].
+        """
+        values = values.tolist()
+        host_states = self.host_states
+        for i in numpy.flatnonzero(mask):
+            host_states[i].limits[key] = values[i]
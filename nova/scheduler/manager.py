@@ -44,12 +44,25 @@ from nova.scheduler import utils as scheduler_utils
 
 LOG = logging.getLogger(__name__)
 
-scheduler_driver_opt = cfg.StrOpt('scheduler_driver',
-        default='nova.scheduler.filter_scheduler.FilterScheduler',
-        help='Default driver to use for the scheduler')
+scheduler_driver_opts = [
+    cfg.StrOpt('scheduler_driver',
+               default='nova.scheduler.filter_scheduler.FilterScheduler',
+               help='Default driver to use for the scheduler'),
+    cfg.IntOpt('scheduler_workers',
+               help='Number of worker processes for the scheduler service. '
+                    'Each worker keeps its own view of the hosts, so '
+                    'scheduler_claim_resources should be enabled when using '
+                    'more than one.'),
+    cfg.IntOpt('scheduler_timing_log_interval',
+               default=-1,
+               help='Number of seconds between logging a summary of the '
+                    'filter and weigher timings recorded according to '
+                    'scheduler_timing_sample_rate.  A negative value '
+                    'disables the summary.'),
+]
 
 CONF = cfg.CONF
-CONF.register_opt(scheduler_driver_opt)
+CONF.register_opts(scheduler_driver_opts)
 
 QUOTAS = quota.QUOTAS
 
@@ -273,6 +286,10 @@ class SchedulerManager(manager.Manager):
     def _expire_reservations(self, context):
         QUOTAS.expire(context)
 
+    @periodic_task.periodic_task(spacing=CONF.scheduler_timing_log_interval)
+    def _log_timing_stats(self, context):
+        self.driver.host_manager.log_timing_stats()
+
     # NOTE(russellb) This method can be removed in 3.0 of this API.  It is
     # deprecated in favor of the method in the base API.
     def get_backdoor_port(self, context):
@@ -19,6 +19,7 @@ Scheduler host weights
 
 from oslo.config import cfg
 
+from nova.scheduler import host_table
 from nova import weights
 
 CONF = cfg.CONF
@@ -37,7 +38,33 @@ class WeighedHost(weights.WeighedObject):
 
 class BaseHostWeigher(weights.BaseWeigher):
     """Base class for host weights."""
-    pass
+
+    # Set to True in a subclass which implements _weigh_table()
+    supports_host_table = False
+
+    def weigh_objects(self, weighed_obj_list, weight_properties):
+        """Weigh all the hosts at once if the weigher supports host tables
+        and NumPy is available, otherwise one host at a time.
+        """
+        if not self.supports_host_table or not host_table.available():
+            return super(BaseHostWeigher, self).weigh_objects(
+                    weighed_obj_list, weight_properties)
+
+        table = getattr(weighed_obj_list, 'host_table', None)
+        if table is None or len(table) != len(weighed_obj_list):
+            table = host_table.HostTable([weighed_obj.obj
+                                          for weighed_obj in weighed_obj_list])
+        weights = (self._weight_multiplier() *
+                   self._weigh_table(table, weight_properties))
+        for weighed_obj, weight in zip(weighed_obj_list, weights.tolist()):
+            weighed_obj.weight += weight
+
+    def _weigh_table(self, table, weight_properties):
+        """Return an array of the weights of the hosts of a HostTable.
+        Override this in a subclass setting supports_host_table, with the
+        same weights as _weigh_object().
+        """
+        raise NotImplementedError()
 
 
 class HostWeightHandler(weights.BaseWeightHandler):
@@ -46,6 +73,17 @@ class HostWeightHandler(weights.BaseWeightHandler):
     def __init__(self):
         super(HostWeightHandler, self).__init__(BaseHostWeigher)
 
+    def _make_weighed_objects(self, obj_list):
+        """Keep the HostTable of a HostList on the list of WeighedHosts,
+        so the weighers reuse the columns the filters built.
+        """
+        weighed_hosts = super(HostWeightHandler,
+                              self)._make_weighed_objects(obj_list)
+        table = getattr(obj_list, 'host_table', None)
+        if table is None:
+            return weighed_hosts
+        return host_table.HostList(weighed_hosts, table)
+
 
 def all_weighers():
     """Return a list of weight plugin classes found in this directory."""
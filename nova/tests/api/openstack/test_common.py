@@ -27,6 +27,10 @@ import xml.dom.minidom as minidom
 from nova.api.openstack import common
 from nova.api.openstack import xmlutil
 from nova import exception
+from nova.network import model as network_model
+from nova.objects import instance as instance_obj
+from nova.objects import instance_info_cache
+from nova.openstack.common import jsonutils
 from nova import test
 from nova.tests import utils
 
@@ -324,6 +328,37 @@ class MiscFunctionsTest(test.TestCase):
         self.assertRaises(webob.exc.HTTPBadRequest,
                 common.check_img_metadata_properties_quota, ctxt, metadata3)
 
+    def test_get_networks_for_instance_without_model(self):
+        nw_info_json = jsonutils.dumps(
+            [{'address': 'aa:aa:aa:aa:aa:aa',
+              'network': {'label': 'public',
+                          'subnets': [{'cidr': '10.0.0.0/24',
+                                       'ips': [{'address': '10.0.0.2',
+                                                'floating_ips': [
+                                                    {'address': '1.2.3.4',
+                                                     'type': 'floating'}]}]},
+                                      {'cidr': 'b33f::/64',
+                                       'ips': [{'address': 'b33f::2'}]}]}}])
+        inst = instance_obj.Instance()
+        inst.info_cache = (
+            instance_info_cache.InstanceInfoCache._from_db_object(
+                None, instance_info_cache.InstanceInfoCache(),
+                {'instance_uuid': 'fake-uuid',
+                 'network_info': nw_info_json}))
+
+        networks = common.get_networks_for_instance(None, inst)
+        self.assertFalse(hasattr(inst.info_cache, '_network_info'))
+        expected = common.get_networks_for_instance_from_nw_info(
+            network_model.NetworkInfo.hydrate(nw_info_json))
+        self.assertEqual(['public'], networks.keys())
+        for kind in ('ips', 'floating_ips'):
+            self.assertEqual([dict(ip) for ip in expected['public'][kind]],
+                             [dict(ip) for ip in networks['public'][kind]])
+        self.assertEqual([(4, 'fixed', 'aa:aa:aa:aa:aa:aa'),
+                          (6, 'fixed', 'aa:aa:aa:aa:aa:aa')],
+                         [(ip['version'], ip['type'], ip['mac_address'])
+                          for ip in networks['public']['ips']])
+
 
 class MetadataXMLDeserializationTest(test.TestCase):
 
@@ -0,0 +1,137 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Benchmark building InstanceList objects from database rows.
+
+The rows look like what instance_get_all_by_filters returns with the
+default expected attributes joined: metadata, system metadata, the info
+cache and security groups.  The time to build the list is the best of the
+runs.  The memory is the size of everything reachable from the list which
+is not shared with the rows, divided by the number of instances.
+
+Run with:
+
+    python -m nova.tests.bench.instance_list --instances 1000,10000
+"""
+
+import gc
+import sys
+import time
+import types
+
+from oslo.config import cfg
+
+from nova import context
+from nova.objects import instance as instance_obj
+from nova.tests import fake_instance
+
+bench_opts = [
+    cfg.ListOpt('instances', default=['1000', '10000'],
+                help='Instance counts to benchmark'),
+    cfg.IntOpt('metadata_items', default=5,
+               help='Number of metadata items on each instance'),
+    cfg.IntOpt('system_metadata_items', default=20,
+               help='Number of system metadata items on each instance'),
+]
+
+CONF = cfg.CONF
+CONF.register_cli_opts(bench_opts, group='bench')
+CONF.import_opt('repeat', 'nova.tests.bench.utils', group='bench')
+
+EXPECTED_ATTRS = ['metadata', 'system_metadata', 'info_cache',
+                  'security_groups']
+
+
+def build_rows(num_instances):
+    """Return num_instances database rows with their joined tables."""
+    rows = []
+    for i in xrange(num_instances):
+        row = fake_instance.fake_db_instance(
+            id=i + 1, display_name='server-%d' % i,
+            vm_state='active', power_state=1, memory_mb=2048, vcpus=1,
+            root_gb=20, security_groups=['default'])
+        row['metadata'] = [
+            {'key': 'key-%d' % j, 'value': 'value-%d' % j}
+            for j in xrange(CONF.bench.metadata_items)]
+        row['system_metadata'] = [
+            {'key': 'instance_type_%d' % j, 'value': str(j)}
+            for j in xrange(CONF.bench.system_metadata_items)]
+        row['info_cache'] = {'instance_uuid': row['uuid'],
+                             'network_info': '[]'}
+        rows.append(row)
+    return rows
+
+
+def build_list(ctxt, rows):
+    return instance_obj._make_instance_list(ctxt,
+                                            instance_obj.InstanceList(),
+                                            rows, list(EXPECTED_ATTRS))
+
+
+def reachable_size(root, exclude):
+    """Return the size of the objects reachable from root.
+
+    Objects reachable from exclude, and classes, modules and functions,
+    are not counted.
+    """
+    skip = (type, types.ClassType, types.ModuleType, types.FunctionType)
+    seen = set()
+    pending = [exclude]
+    while pending:
+        obj = pending.pop()
+        if id(obj) not in seen and not isinstance(obj, skip):
+            seen.add(id(obj))
+            pending.extend(gc.get_referents(obj))
+
+    size = 0
+    pending = [root]
+    while pending:
+        obj = pending.pop()
+        if id(obj) not in seen and not isinstance(obj, skip):
+            seen.add(id(obj))
+            size += sys.getsizeof(obj)
+            pending.extend(gc.get_referents(obj))
+    return size
+
+
+def run(num_instances):
+    """Return the best build time and the bytes used per instance."""
+    ctxt = context.get_admin_context()
+    rows = build_rows(num_instances)
+
+    best = None
+    for _i in xrange(CONF.bench.repeat):
+        start = time.time()
+        inst_list = build_list(ctxt, rows)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    size = reachable_size(inst_list, [rows, ctxt])
+    return best, size // num_instances
+
+
+def main():
+    CONF(sys.argv[1:], project='nova')
+    print ('%10s %10s %10s' % ('instances', 'seconds', 'bytes/inst'))
+    for num_instances in CONF.bench.instances:
+        seconds, size = run(int(num_instances))
+        print ('%10s %10.3f %10d' % (num_instances, seconds, size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Benchmark IptablesManager._modify_rules on large filter tables.
+
+The table holds security group style rules spread over one wrapped chain
+per instance, and the current lines are what iptables-save would report
+after the previous apply of the same rules, with non-zero counters and a
+share of rules not managed by this nova binary.
+
+Run with:
+
+    python -m nova.tests.bench.iptables_rules --rules 10000,50000
+"""
+
+import sys
+import time
+
+from oslo.config import cfg
+
+from nova.network import linux_net
+
+bench_opts = [
+    cfg.ListOpt('rules', default=['10000', '50000'],
+                help='Rule counts to benchmark'),
+    cfg.IntOpt('rules_per_chain', default=20,
+               help='Number of rules in each instance chain'),
+    cfg.FloatOpt('foreign_ratio', default=0.1,
+                 help='Ratio of rules from other binaries to our rules'),
+]
+
+CONF = cfg.CONF
+CONF.register_cli_opts(bench_opts, group='bench')
+CONF.import_opt('repeat', 'nova.tests.bench.utils', group='bench')
+
+
+def build_table(num_rules, rules_per_chain):
+    """Return an IptablesTable holding num_rules instance rules.
+
+    The rules are appended directly, as add_rule() checks each addition
+    against all the rules already in the table.
+    """
+    table = linux_net.IptablesTable()
+    table.add_chain('nova-filter-top', wrap=False)
+    table.add_rule('FORWARD', '-j nova-filter-top', wrap=False, top=True)
+    table.add_chain('local')
+    table.add_chain('sg-fallback')
+    for i in xrange(num_rules):
+        chain = 'inst-%d' % (i // rules_per_chain)
+        if i % rules_per_chain == 0:
+            table.add_chain(chain)
+            table.rules.append(linux_net.IptablesRule(
+                'local', '-d 10.%d.%d.%d -j $%s' % (
+                    i >> 16 & 255, i >> 8 & 255, i & 255, chain)))
+        rule = '-s 10.%d.%d.%d -p tcp --dport %d -j ACCEPT' % (
+            i >> 16 & 255, i >> 8 & 255, i & 255, 1024 + i % 1000)
+        table.rules.append(linux_net.IptablesRule(chain, rule))
+    return table
+
+
+def saved_lines(table, num_foreign):
+    """Return the filter table as iptables-save would list it."""
+    lines = ['# Generated by iptables-save', '*filter',
+             ':INPUT ACCEPT [0:0]', ':FORWARD ACCEPT [0:0]',
+             ':OUTPUT ACCEPT [0:0]']
+    wrapped = '%s-%%s' % linux_net.binary_name
+    lines += [':%s - [0:0]' % (wrapped % chain) for chain in table.chains]
+    lines += [':%s - [0:0]' % chain for chain in table.unwrapped_chains]
+    lines += [':nova-other-%d - [0:0]' % i for i in xrange(num_foreign)]
+    for i, rule in enumerate(table.rules):
+        lines.append(str(rule).replace('[0:0]', '[%d:%d]' % (i, i * 64), 1))
+    lines += ['[0:0] -A nova-other-%d -j ACCEPT' % i
+              for i in xrange(num_foreign)]
+    lines += ['COMMIT', '# Completed']
+    return lines
+
+
+def run(num_rules):
+    """Return the best time of the runs of _modify_rules for num_rules."""
+    manager = linux_net.IptablesManager(execute=lambda *a, **kw: ('', ''))
+    table = build_table(num_rules, CONF.bench.rules_per_chain)
+    current_lines = saved_lines(table,
+                                int(num_rules * CONF.bench.foreign_ratio))
+
+    best = None
+    for _i in xrange(CONF.bench.repeat):
+        start = time.time()
+        manager._modify_rules(list(current_lines), table, 'filter')
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, len(current_lines)
+
+
+def main():
+    CONF(sys.argv[1:], project='nova')
+    print ('%10s %10s %10s' % ('rules', 'lines', 'seconds'))
+    for num_rules in CONF.bench.rules:
+        seconds, num_lines = run(int(num_rules))
+        print ('%10s %10d %10.3f' % (num_rules, num_lines, seconds))
+
+
+if __name__ == '__main__':
+    main()
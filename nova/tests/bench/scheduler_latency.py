@@ -0,0 +1,364 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Benchmark FilterScheduler.select_destinations against a synthetic cloud.
+
+A sqlite database is filled with compute nodes of mixed sizes and load,
+with the stats a resource tracker would report, plus availability zone and
+host aggregates with metadata.  A reproducible mix of boots and deletes is
+then replayed through the real HostManager, filters and weighers.  Each
+boot is accounted on its compute node the way the resource tracker would,
+so the host states change between requests as they do in a real cloud.
+
+The latency of every request and of every filter and weigher call is
+reported as p50/p95/p99 in milliseconds.
+
+Run with:
+
+    python -m nova.tests.bench.scheduler_latency --hosts 10000 \\
+        --operations 1000 --delete-ratio 0.3
+"""
+
+import collections
+import os
+import random
+import sys
+import tempfile
+import time
+
+from oslo.config import cfg
+
+from nova import context
+from nova import db
+from nova import exception
+from nova.openstack.common.db.sqlalchemy import session as db_session
+from nova.scheduler import filter_scheduler
+from nova.tests.bench import utils
+
+bench_opts = [
+    cfg.IntOpt('operations', default=1000,
+               help='Number of boot and delete operations to replay'),
+    cfg.FloatOpt('delete_ratio', default=0.3,
+                 help='Fraction of the operations that delete an instance '
+                      'booted earlier'),
+    cfg.IntOpt('max_instances_per_boot', default=1,
+               help='Maximum number of instances in one boot request'),
+    cfg.IntOpt('availability_zones', default=4,
+               help='Number of availability zones to spread hosts over'),
+    cfg.FloatOpt('ssd_ratio', default=0.2,
+                 help='Fraction of the hosts in the "ssd" aggregate'),
+    cfg.IntOpt('seed', default=42,
+               help='Seed for the cloud layout and the operations'),
+    cfg.BoolOpt('host_state_cache', default=True,
+                help='Enable scheduler_use_host_state_cache'),
+]
+
+CONF = cfg.CONF
+CONF.register_cli_opts(bench_opts, group='bench')
+CONF.import_opt('hosts', 'nova.tests.bench.utils', group='bench')
+CONF.import_opt('filters', 'nova.tests.bench.utils', group='bench')
+CONF.import_opt('scheduler_use_host_state_cache',
+                'nova.scheduler.host_manager')
+CONF.import_opt('service_down_time', 'nova.service')
+
+DEFAULT_FILTERS = ['RetryFilter',
+                   'AvailabilityZoneFilter',
+                   'RamFilter',
+                   'CoreFilter',
+                   'DiskFilter',
+                   'ComputeFilter',
+                   'AggregateInstanceExtraSpecsFilter',
+                   'NumInstancesFilter',
+                   'IoOpsFilter']
+
+# (memory_mb, vcpus, local_gb) of the synthetic compute nodes
+HOST_SIZES = [(32768, 8, 500), (65536, 16, 1000),
+              (131072, 24, 2000), (262144, 32, 4000)]
+
+FLAVORS = [
+    {'name': 'm1.tiny', 'memory_mb': 512, 'vcpus': 1, 'root_gb': 1},
+    {'name': 'm1.small', 'memory_mb': 2048, 'vcpus': 1, 'root_gb': 20},
+    {'name': 'm1.medium', 'memory_mb': 4096, 'vcpus': 2, 'root_gb': 40},
+    {'name': 'm1.large', 'memory_mb': 8192, 'vcpus': 4, 'root_gb': 80},
+    {'name': 'm1.xlarge', 'memory_mb': 16384, 'vcpus': 8, 'root_gb': 160},
+]
+
+PROJECTS = ['project%d' % i for i in xrange(20)]
+
+
+class TimedCalls(object):
+    """Collect wall times of calls, keyed by name."""
+
+    def __init__(self):
+        self.times = collections.defaultdict(list)
+
+    def record(self, name, seconds):
+        self.times[name].append(seconds)
+
+    def timed_filter(self, filter_cls):
+        """Return a subclass of a filter class which records its time."""
+        timings = self
+
+        class TimedFilter(filter_cls):
+            def filter_all(self, filter_obj_list, filter_properties):
+                start = time.time()
+                objs = super(TimedFilter, self).filter_all(filter_obj_list,
+                                                           filter_properties)
+                # Filters may return a generator, so consume it here.
+                if objs is not None:
+                    objs = list(objs)
+                timings.record(filter_cls.__name__, time.time() - start)
+                return objs
+
+        TimedFilter.__name__ = filter_cls.__name__
+        return TimedFilter
+
+    def timed_weigher(self, weigher_cls):
+        """Return a subclass of a weigher class which records its time."""
+        timings = self
+
+        class TimedWeigher(weigher_cls):
+            def weigh_objects(self, weighed_obj_list, weight_properties):
+                start = time.time()
+                super(TimedWeigher, self).weigh_objects(weighed_obj_list,
+                                                        weight_properties)
+                timings.record(weigher_cls.__name__, time.time() - start)
+
+        TimedWeigher.__name__ = weigher_cls.__name__
+        return TimedWeigher
+
+
+class SyntheticCloud(object):
+    """Compute nodes in the database and the instances placed on them.
+
+    Usage of each node is tracked here and written back to its compute
+    node record after every change, as the resource tracker does.
+    """
+
+    def __init__(self, ctxt, rand):
+        self.ctxt = ctxt
+        self.rand = rand
+        self.nodes = {}
+        self.instances = []
+
+    def create(self, num_hosts):
+        for i in xrange(num_hosts):
+            self._create_node('host%05d' % i, 'node%05d' % i)
+        self._create_aggregates()
+
+    def _create_node(self, host, nodename):
+        memory_mb, vcpus, local_gb = self.rand.choice(HOST_SIZES)
+        service = db.service_create(self.ctxt, {'host': host,
+                                                'binary': 'nova-compute',
+                                                'topic': 'compute',
+                                                'report_count': 0})
+        node = {'host': host,
+                'memory_mb': memory_mb, 'vcpus': vcpus, 'local_gb': local_gb,
+                'memory_mb_used': 512, 'vcpus_used': 0, 'local_gb_used': 0,
+                'num_instances': 0, 'projects': collections.defaultdict(int),
+                'io_workload': 0}
+        # Start with the node partly used by pre-existing instances.
+        for i in xrange(self.rand.randint(0, vcpus // 2)):
+            self._add_instance(node, self.rand.choice(FLAVORS[:3]),
+                               self.rand.choice(PROJECTS), io=False)
+
+        values = self._node_values(node)
+        values.update(service_id=service['id'], memory_mb=memory_mb,
+                      vcpus=vcpus, local_gb=local_gb,
+                      hypervisor_type='fake', hypervisor_version=1,
+                      hypervisor_hostname=nodename, cpu_info='?',
+                      host_ip='127.0.0.1', current_workload=0,
+                      running_vms=node['num_instances'],
+                      supported_instances='[["x86_64", "kvm", "hvm"]]')
+        node['id'] = db.compute_node_create(self.ctxt, values)['id']
+        self.nodes[(host, nodename)] = node
+
+    def _create_aggregates(self):
+        hosts = sorted(node['host'] for node in self.nodes.itervalues())
+        num_zones = max(1, CONF.bench.availability_zones)
+        for zone in xrange(num_zones):
+            aggregate = db.aggregate_create(self.ctxt,
+                    {'name': 'az%d' % zone},
+                    metadata={'availability_zone': 'az%d' % zone})
+            for host in hosts[zone::num_zones]:
+                db.aggregate_host_add(self.ctxt, aggregate['id'], host)
+
+        aggregate = db.aggregate_create(self.ctxt, {'name': 'ssd'},
+                                        metadata={'ssd': 'true'})
+        for host in self.rand.sample(hosts,
+                                     int(len(hosts) * CONF.bench.ssd_ratio)):
+            db.aggregate_host_add(self.ctxt, aggregate['id'], host)
+
+    def _node_values(self, node):
+        stats = {'num_instances': node['num_instances'],
+                 'num_vm_active': node['num_instances'],
+                 'num_task_None': node['num_instances'],
+                 'num_os_type_linux': node['num_instances'],
+                 'io_workload': node['io_workload']}
+        for project_id, count in node['projects'].iteritems():
+            stats['num_proj_%s' % project_id] = count
+        free_disk_gb = node['local_gb'] - node['local_gb_used']
+        return {'memory_mb_used': node['memory_mb_used'],
+                'free_ram_mb': node['memory_mb'] - node['memory_mb_used'],
+                'vcpus_used': node['vcpus_used'],
+                'local_gb_used': node['local_gb_used'],
+                'free_disk_gb': free_disk_gb,
+                'disk_available_least': free_disk_gb,
+                'stats': stats}
+
+    def _update_node(self, node):
+        db.compute_node_update(self.ctxt, node['id'], self._node_values(node))
+
+    def _add_instance(self, node, flavor, project_id, io=True):
+        node['memory_mb_used'] += flavor['memory_mb']
+        node['vcpus_used'] += flavor['vcpus']
+        node['local_gb_used'] += flavor['root_gb']
+        node['num_instances'] += 1
+        node['projects'][project_id] += 1
+        if io:
+            node['io_workload'] += 1
+        self.instances.append((node, flavor, project_id))
+
+    def boot(self, dests, flavor, project_id):
+        for dest in dests:
+            node = self.nodes[(dest['host'], dest['nodename'])]
+            self._add_instance(node, flavor, project_id)
+            self._update_node(node)
+
+    def delete_random(self):
+        index = self.rand.randrange(len(self.instances))
+        node, flavor, project_id = self.instances[index]
+        self.instances[index] = self.instances[-1]
+        self.instances.pop()
+        node['memory_mb_used'] -= flavor['memory_mb']
+        node['vcpus_used'] -= flavor['vcpus']
+        node['local_gb_used'] -= flavor['root_gb']
+        node['num_instances'] -= 1
+        node['projects'][project_id] -= 1
+        node['io_workload'] = max(0, node['io_workload'] - 1)
+        self._update_node(node)
+
+
+def _request_spec(rand, num_instances):
+    flavor = rand.choice(FLAVORS)
+    instance_type = dict(flavor, ephemeral_gb=0, extra_specs={})
+    if rand.random() < CONF.bench.ssd_ratio:
+        instance_type['extra_specs'] = {
+                'aggregate_instance_extra_specs:ssd': 'true'}
+    instance_properties = {'memory_mb': flavor['memory_mb'],
+                           'vcpus': flavor['vcpus'],
+                           'root_gb': flavor['root_gb'],
+                           'ephemeral_gb': 0,
+                           'project_id': rand.choice(PROJECTS),
+                           'os_type': 'linux'}
+    if rand.random() < 0.5:
+        instance_properties['availability_zone'] = (
+                'az%d' % rand.randrange(max(1, CONF.bench.availability_zones)))
+    return {'num_instances': num_instances, 'instance_type': instance_type,
+            'instance_properties': instance_properties, 'image': {}}
+
+
+def _instrument(scheduler, timings):
+    host_manager = scheduler.host_manager
+    host_manager.filter_classes = [timings.timed_filter(cls)
+                                   for cls in host_manager.filter_classes]
+    host_manager.weight_classes = [timings.timed_weigher(cls)
+                                   for cls in host_manager.weight_classes]
+
+
+def replay(ctxt, cloud, rand, timings):
+    """Replay the boot/delete mix and return the outcome counts."""
+    scheduler = filter_scheduler.FilterScheduler()
+    _instrument(scheduler, timings)
+    # Load the initial host states outside of the measurements.
+    scheduler.host_manager.get_all_host_states(ctxt)
+
+    counts = collections.defaultdict(int)
+    for i in xrange(CONF.bench.operations):
+        if cloud.instances and rand.random() < CONF.bench.delete_ratio:
+            cloud.delete_random()
+            counts['deleted'] += 1
+            continue
+
+        num_instances = rand.randint(1,
+                                     max(1, CONF.bench.max_instances_per_boot))
+        request_spec = _request_spec(rand, num_instances)
+        start = time.time()
+        try:
+            dests = scheduler.select_destinations(ctxt, request_spec, {})
+        except exception.NoValidHost:
+            timings.record('request', time.time() - start)
+            counts['no_valid_host'] += 1
+            continue
+        timings.record('request', time.time() - start)
+        counts['booted'] += num_instances
+        cloud.boot(dests, request_spec['instance_type'],
+                   request_spec['instance_properties']['project_id'])
+    return counts
+
+
+def report(timings, counts):
+    print ('booted %(booted)d, deleted %(deleted)d, '
+           'no valid host %(no_valid_host)d' %
+           {'booted': counts['booted'], 'deleted': counts['deleted'],
+            'no_valid_host': counts['no_valid_host']})
+    print ('%-36s %7s %9s %9s %9s' %
+           ('name', 'calls', 'p50 ms', 'p95 ms', 'p99 ms'))
+    names = sorted(timings.times, key=lambda name: (name == 'request', name))
+    for name in names:
+        times = timings.times[name]
+        print ('%-36s %7d %9.3f %9.3f %9.3f' %
+               (name, len(times),
+                utils.percentile(times, 50) * 1000,
+                utils.percentile(times, 95) * 1000,
+                utils.percentile(times, 99) * 1000))
+
+
+def main():
+    CONF.set_default('hosts', 10000, group='bench')
+    CONF.set_default('filters', DEFAULT_FILTERS, group='bench')
+    CONF(sys.argv[1:], project='nova', default_config_files=[])
+    CONF.set_override('scheduler_use_host_state_cache',
+                      CONF.bench.host_state_cache)
+    CONF.set_override('scheduler_default_filters', CONF.bench.filters)
+    # The synthetic services never report in.
+    CONF.set_override('service_down_time', 3600)
+
+    fd, path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(fd)
+    try:
+        utils.create_database(path)
+        ctxt = context.get_admin_context()
+        rand = random.Random(CONF.bench.seed)
+        cloud = SyntheticCloud(ctxt, rand)
+        start = time.time()
+        cloud.create(CONF.bench.hosts)
+        print ('created %d compute nodes in %.1f seconds' %
+               (CONF.bench.hosts, time.time() - start))
+
+        timings = TimedCalls()
+        counts = replay(ctxt, cloud, rand, timings)
+        report(timings, counts)
+    finally:
+        db_session.cleanup()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
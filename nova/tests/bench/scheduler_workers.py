@@ -0,0 +1,187 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Benchmark scheduling decisions per second with several scheduler workers.
+
+Each worker is a separate process with its own FilterScheduler, and so its
+own view of the hosts, placing instances against a shared sqlite database
+of compute nodes as reported by the fake virt driver.  Resource claims are
+enabled so that concurrent placements are reconciled in the database.
+
+Run with:
+
+    python -m nova.tests.bench.scheduler_workers --hosts 1000 \\
+        --requests 2000 --workers 1,2,4
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from oslo.config import cfg
+
+from nova import context
+from nova import db
+from nova import exception
+from nova.openstack.common.db.sqlalchemy import session as db_session
+from nova.scheduler import filter_scheduler
+from nova.tests.bench import utils
+from nova.virt import fake
+
+bench_opts = [
+    cfg.IntOpt('requests', default=2000,
+               help='Number of single instance requests to schedule'),
+    cfg.ListOpt('workers', default=['1', '2', '4'],
+                help='Worker counts to benchmark'),
+    cfg.IntOpt('memory_mb', default=512,
+               help='Memory of each scheduled instance'),
+    cfg.BoolOpt('claims', default=True,
+                help='Enable scheduler_claim_resources'),
+]
+
+CONF = cfg.CONF
+CONF.register_cli_opts(bench_opts, group='bench')
+CONF.import_opt('hosts', 'nova.tests.bench.utils', group='bench')
+CONF.import_opt('filters', 'nova.tests.bench.utils', group='bench')
+CONF.import_opt('scheduler_claim_resources', 'nova.scheduler.filter_scheduler')
+CONF.import_opt('scheduler_use_host_state_cache',
+                'nova.scheduler.host_manager')
+CONF.import_opt('ram_allocation_ratio', 'nova.scheduler.filters.ram_filter')
+CONF.import_opt('service_down_time', 'nova.service')
+
+
+def create_compute_nodes(ctxt, num_hosts):
+    """Create a service and compute node for each fake driver node."""
+    nodenames = ['node%05d' % i for i in xrange(num_hosts)]
+    fake.set_nodes(nodenames)
+    driver = fake.FakeDriver(None)
+    for i, nodename in enumerate(nodenames):
+        service = db.service_create(ctxt, {'host': 'host%05d' % i,
+                                           'binary': 'nova-compute',
+                                           'topic': 'compute',
+                                           'report_count': 0})
+        values = driver.get_available_resource(nodename)
+        values.update(service_id=service['id'],
+                      free_ram_mb=(values['memory_mb'] -
+                                   values['memory_mb_used']),
+                      free_disk_gb=(values['local_gb'] -
+                                    values['local_gb_used']),
+                      current_workload=0, running_vms=0, host_ip='127.0.0.1',
+                      stats={})
+        db.compute_node_create(ctxt, values)
+
+
+def _request_spec():
+    instance_type = {'memory_mb': CONF.bench.memory_mb, 'root_gb': 0,
+                     'ephemeral_gb': 0, 'vcpus': 1, 'extra_specs': {}}
+    instance_properties = dict(instance_type, project_id='bench',
+                               os_type='linux')
+    return {'num_instances': 1, 'instance_type': instance_type,
+            'instance_properties': instance_properties, 'image': {}}
+
+
+def _worker(start_event, num_requests, results):
+    # Do not share the parent's database connections.
+    db_session.cleanup()
+    ctxt = context.get_admin_context()
+    scheduler = filter_scheduler.FilterScheduler()
+    # Load the initial host states before the clock starts.
+    scheduler.host_manager.get_all_host_states(ctxt)
+    start_event.wait()
+
+    placed = failed = 0
+    for i in xrange(num_requests):
+        try:
+            scheduler.select_destinations(ctxt, _request_spec(), {})
+            placed += 1
+        except exception.NoValidHost:
+            failed += 1
+    results.put((placed, failed))
+
+
+def _over_committed_nodes(ctxt):
+    limit = CONF.ram_allocation_ratio
+    return len([node for node in db.compute_node_get_all(ctxt)
+                if node['memory_mb_used'] > node['memory_mb'] * limit])
+
+
+def run(num_workers):
+    fd, path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(fd)
+    try:
+        utils.create_database(path)
+        ctxt = context.get_admin_context()
+        create_compute_nodes(ctxt, CONF.bench.hosts)
+        db_session.cleanup()
+
+        start_event = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        per_worker = CONF.bench.requests // num_workers
+        workers = [multiprocessing.Process(target=_worker,
+                                           args=(start_event, per_worker,
+                                                 results))
+                   for i in xrange(num_workers)]
+        for worker in workers:
+            worker.start()
+        # Give the workers time to load their host states.
+        time.sleep(1)
+        start = time.time()
+        start_event.set()
+        counts = [results.get() for worker in workers]
+        elapsed = time.time() - start
+        for worker in workers:
+            worker.join()
+
+        placed = sum(count[0] for count in counts)
+        failed = sum(count[1] for count in counts)
+        return {'workers': num_workers,
+                'placed': placed,
+                'failed': failed,
+                'seconds': elapsed,
+                'decisions_per_second': (placed + failed) / elapsed,
+                'over_committed_nodes': _over_committed_nodes(ctxt)}
+    finally:
+        db_session.cleanup()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def main():
+    CONF(sys.argv[1:], project='nova', default_config_files=[])
+    CONF.set_override('scheduler_claim_resources', CONF.bench.claims)
+    CONF.set_override('scheduler_use_host_state_cache', True)
+    CONF.set_override('scheduler_default_filters', CONF.bench.filters)
+    # The fake services never report in.
+    CONF.set_override('service_down_time', 3600)
+
+    print ('%(workers)7s %(placed)7s %(failed)7s %(seconds)8s '
+           '%(decisions_per_second)10s %(over_committed_nodes)14s' %
+           {'workers': 'workers', 'placed': 'placed', 'failed': 'failed',
+            'seconds': 'seconds', 'decisions_per_second': 'decisions/s',
+            'over_committed_nodes': 'overcommitted'})
+    for num_workers in CONF.bench.workers:
+        result = run(int(num_workers))
+        print ('%(workers)7d %(placed)7d %(failed)7d %(seconds)8.2f '
+               '%(decisions_per_second)10.1f %(over_committed_nodes)14d' %
+               result)
+
+
+if __name__ == '__main__':
+    main()
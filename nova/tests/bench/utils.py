@@ -0,0 +1,56 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Helpers and options shared by the benchmarks."""
+
+import math
+
+from oslo.config import cfg
+
+from nova.db import migration
+from nova.openstack.common.db.sqlalchemy import session as db_session
+
+# Options used by several benchmarks, which set their own defaults.
+bench_opts = [
+    cfg.IntOpt('hosts', default=1000,
+               help='Number of compute nodes'),
+    cfg.ListOpt('filters', default=['RetryFilter', 'RamFilter',
+                                    'ComputeFilter'],
+                help='Scheduler filters to use'),
+    cfg.IntOpt('repeat', default=3,
+               help='Number of runs for each case, the best is shown'),
+]
+
+CONF = cfg.CONF
+CONF.register_cli_opts(bench_opts, group='bench')
+
+
+def create_database(path):
+    """Point the DB API at a new sqlite database and create the schema."""
+    CONF.set_override('connection', 'sqlite:///%s' % path, group='database')
+    CONF.set_override('sqlite_synchronous', False)
+    db_session.cleanup()
+    migration.db_sync()
+
+
+def percentile(values, percent):
+    """Return the given percentile of a list of values (nearest rank)."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = int(math.ceil(percent / 100.0 * len(values)))
+    return values[max(rank, 1) - 1]
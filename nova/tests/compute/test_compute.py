@@ -515,6 +515,33 @@ class ComputeVolumeTestCase(BaseTestCase):
                         self.compute._last_vol_usage_poll)
         self.mox.UnsetStubs()
 
+    def test_poll_bandwidth_usage_batches_conductor_calls(self):
+        ctxt = context.get_admin_context()
+        counters = [{'uuid': 'fake-uuid1', 'mac_address': 'fake-mac1',
+                     'bw_in': 10, 'bw_out': 20},
+                    {'uuid': 'fake-uuid2', 'mac_address': 'fake-mac2',
+                     'bw_in': 30, 'bw_out': 40}]
+        self.stubs.Set(self.compute.driver, 'get_all_bw_counters',
+                       lambda instances: counters)
+        batch_sizes = []
+        run_batch = self.compute.conductor_api._run_batch
+
+        def fake_run_batch(context, operations):
+            batch_sizes.append(len(operations))
+            return run_batch(context, operations)
+
+        self.stubs.Set(self.compute.conductor_api, '_run_batch',
+                       fake_run_batch)
+        self.flags(bandwidth_poll_interval=1)
+        self.compute._last_bw_usage_poll = 0
+        self.compute._poll_bandwidth_usage(ctxt)
+
+        self.assertEqual([2, 2, 2], batch_sizes)
+        start_time = utils.last_completed_audit_period()[1]
+        usage = db.bw_usage_get(ctxt, 'fake-uuid2', start_time, 'fake-mac2')
+        self.assertEqual(30, usage['last_ctr_in'])
+        self.assertEqual(40, usage['last_ctr_out'])
+
     def test_detach_volume_usage(self):
         # Test that detach volume update the volume usage cache table correctly
         instance = self._create_fake_instance()
@@ -904,6 +931,43 @@ class ComputeTestCase(BaseTestCase):
                 self.compute.run_instance, self.context, instance=instance,
                 filter_properties=filter_properties)
 
+    def test_create_instance_fail_releases_scheduler_claim(self):
+        # The resources claimed by the scheduler are given back when the
+        # resource tracker can not claim them.
+        self.flags(reserved_host_disk_mb=0, reserved_host_memory_mb=0)
+        self.rt.update_available_resource(self.context.elevated())
+        resources = self.compute.driver.get_available_resource(NODENAME)
+        params = {"memory_mb": resources['memory_mb'] * 2}
+        instance = self._create_fake_instance(params)
+        filter_properties = {'limits': {'memory_mb': resources['memory_mb']},
+                             'scheduler_claim': True}
+
+        self.mox.StubOutWithMock(self.rt, 'release_scheduler_claim')
+        self.rt.release_scheduler_claim(mox.IgnoreArg(),
+                mox.ContainsKeyValue('uuid', instance['uuid']))
+        self.mox.ReplayAll()
+
+        self.assertRaises(exception.ComputeResourcesUnavailable,
+                self.compute.run_instance, self.context, instance=instance,
+                filter_properties=filter_properties)
+
+    def test_create_instance_keeps_claim_after_tracker_claim(self):
+        # Once the resource tracker claimed the resources, the scheduler's
+        # claim has been replaced and must not be given back.
+        def fake_spawn(*args, **kwargs):
+            raise test.TestingException()
+
+        self.stubs.Set(self.compute.driver, 'spawn', fake_spawn)
+        instance = self._create_fake_instance()
+        filter_properties = {'scheduler_claim': True}
+
+        self.mox.StubOutWithMock(self.rt, 'release_scheduler_claim')
+        self.mox.ReplayAll()
+
+        self.assertRaises(test.TestingException,
+                self.compute.run_instance, self.context, instance=instance,
+                filter_properties=filter_properties)
+
     def test_create_instance_with_oversubscribed_cpu(self):
         # Test passing of oversubscribed cpu policy from the scheduler.
 
@@ -5167,16 +5231,49 @@ class ComputeTestCase(BaseTestCase):
         ctxt = self.context.elevated()
         self._create_fake_instance({'host': self.compute.host})
         self._create_fake_instance({'host': self.compute.host})
+        self.mox.StubOutWithMock(self.compute.driver,
+                                 'list_instance_power_states')
         self.mox.StubOutWithMock(self.compute.driver, 'get_info')
         self.mox.StubOutWithMock(self.compute, '_sync_instance_power_state')
+        self.compute.driver.list_instance_power_states().AndRaise(
+            NotImplementedError())
         self.compute.driver.get_info(mox.IgnoreArg()).AndReturn(
             {'state': power_state.RUNNING})
         self.compute._sync_instance_power_state(ctxt, mox.IgnoreArg(),
-                                                power_state.RUNNING)
+                                                power_state.RUNNING,
+                                                refresh=True)
         self.compute.driver.get_info(mox.IgnoreArg()).AndReturn(
             {'state': power_state.SHUTDOWN})
         self.compute._sync_instance_power_state(ctxt, mox.IgnoreArg(),
-                                                power_state.SHUTDOWN)
+                                                power_state.SHUTDOWN,
+                                                refresh=True)
+        self.mox.ReplayAll()
+        self.compute._sync_power_states(ctxt)
+
+    def test_sync_power_states_bulk(self):
+        ctxt = self.context.elevated()
+        running = self._create_fake_instance(
+            {'host': self.compute.host, 'power_state': power_state.RUNNING})
+        stopped = self._create_fake_instance(
+            {'host': self.compute.host, 'power_state': power_state.RUNNING})
+        missing = self._create_fake_instance(
+            {'host': self.compute.host, 'power_state': power_state.RUNNING})
+        self.mox.StubOutWithMock(self.compute.driver,
+                                 'list_instance_power_states')
+        self.mox.StubOutWithMock(self.compute.driver, 'get_info')
+        self.mox.StubOutWithMock(self.compute, '_sync_instance_power_state')
+        self.compute.driver.list_instance_power_states().AndReturn(
+            {running['uuid']: power_state.RUNNING,
+             stopped['uuid']: power_state.SHUTDOWN})
+        self.compute._sync_instance_power_state(
+            ctxt, mox.ContainsKeyValue('uuid', running['uuid']),
+            power_state.RUNNING, refresh=False).InAnyOrder()
+        self.compute._sync_instance_power_state(
+            ctxt, mox.ContainsKeyValue('uuid', stopped['uuid']),
+            power_state.SHUTDOWN, refresh=True).InAnyOrder()
+        self.compute._sync_instance_power_state(
+            ctxt, mox.ContainsKeyValue('uuid', missing['uuid']),
+            power_state.NOSTATE, refresh=True).InAnyOrder()
         self.mox.ReplayAll()
         self.compute._sync_power_states(ctxt)
 
@@ -6970,6 +7067,21 @@ class ComputeAPITestCase(BaseTestCase):
 
         db.instance_destroy(self.context, refs[0]['uuid'])
 
+    def test_create_multiple_instances_in_bulk(self):
+        # Instances of a multi-instance boot are not created one by one
+        self.mox.StubOutWithMock(self.compute_api,
+                                 'create_db_entry_for_new_instance')
+        self.mox.ReplayAll()
+        (refs, resv_id) = self.compute_api.create(self.context,
+                flavors.get_default_flavor(), None,
+                min_count=3, max_count=3)
+        self.assertEqual([0, 1, 2],
+                         [instance['launch_index'] for instance in refs])
+        for instance in refs:
+            self.assertEqual(resv_id, instance['reservation_id'])
+            self.assertEqual(instance['uuid'], db.instance_get_by_uuid(
+                    self.context, instance['uuid'])['uuid'])
+
     def test_multi_instance_display_name_template(self):
         self.flags(multi_instance_display_name_template='%(name)s')
         (refs, resv_id) = self.compute_api.create(self.context,
@@ -469,6 +469,99 @@ class TrackerTestCase(BaseTrackerTestCase):
         self.assertEqual(0, self.tracker.compute_node['current_workload'])
 
 
+class DifferentialUpdateTestCase(BaseTrackerTestCase):
+
+    def setUp(self):
+        self.updates = []
+        super(DifferentialUpdateTestCase, self).setUp()
+
+    def _fake_compute_node_update(self, ctx, compute_node_id, values,
+            prune_stats=False):
+        self.updates.append((dict(values), prune_stats))
+        values = dict(values)
+
+        stats = {}
+        if not prune_stats:
+            stats = dict((stat['key'], stat['value'])
+                         for stat in self.compute['stats'])
+        for key, value in values.pop('stats', {}).iteritems():
+            stats[key] = unicode(value)
+
+        self.compute.update(values)
+        self.compute['stats'] = [{'key': key, 'value': value}
+                                 for key, value in stats.iteritems()]
+        return self.compute
+
+    def test_initial_audit_prunes_stats(self):
+        self.assertEqual(1, len(self.updates))
+        values, prune_stats = self.updates[0]
+        self.assertTrue(prune_stats)
+        self.assertEqual({}, values['stats'])
+        self.assertEqual(FAKE_VIRT_MEMORY_MB, values['memory_mb'])
+        self.assertFalse('id' in values)
+
+    def test_unchanged_update_skipped(self):
+        self.updates = []
+        self.tracker._update(self.context, self.tracker.compute_node)
+        self.assertEqual([], self.updates)
+
+    def test_unchanged_audit_skips_update(self):
+        self.updates = []
+        self.tracker.update_available_resource(self.context)
+        self.assertEqual([], self.updates)
+
+    def test_audit_after_scheduler_claim_release(self):
+        self.stubs.Set(db, 'compute_node_release', lambda *args: None)
+        instance = self._fake_instance(memory_mb=3, root_gb=1,
+                                       ephemeral_gb=1)
+        self.tracker.release_scheduler_claim(self.context, instance)
+
+        # The release may have given back resources whose claim was
+        # already replaced, so the audit writes the usage again:
+        self.updates = []
+        self.tracker.update_available_resource(self.context)
+        self.assertEqual(1, len(self.updates))
+        values, prune_stats = self.updates[0]
+        self.assertEqual(0, values['memory_mb_used'])
+        self.assertEqual(FAKE_VIRT_MEMORY_MB, values['free_ram_mb'])
+        self.assertEqual(0, values['local_gb_used'])
+        self.assertEqual(0, values['vcpus_used'])
+        self.assertFalse('memory_mb' in values)
+
+    def test_claim_sends_changed_fields(self):
+        self.updates = []
+        instance = self._fake_instance(memory_mb=3, root_gb=1,
+                                       ephemeral_gb=1)
+        self.tracker.instance_claim(self.context, instance, self.limits)
+
+        self.assertEqual(1, len(self.updates))
+        values, prune_stats = self.updates[0]
+        self.assertFalse(prune_stats)
+        self.assertEqual(3 + FAKE_VIRT_MEMORY_OVERHEAD,
+                         values['memory_mb_used'])
+        self.assertEqual(2, values['local_gb_used'])
+        for key in ('id', 'memory_mb', 'local_gb', 'vcpus', 'cpu_info'):
+            self.assertFalse(key in values)
+        self.assertEqual(1, values['stats']['num_instances'])
+
+    def test_audit_prunes_removed_stats(self):
+        instance = self._fake_instance(memory_mb=3, root_gb=1,
+                                       ephemeral_gb=1)
+        self.tracker.instance_claim(self.context, instance, self.limits)
+
+        # the instance went away before the audit saw it:
+        del self._instances[instance['uuid']]
+        self.updates = []
+        self.tracker.update_available_resource(self.context)
+
+        self.assertEqual(1, len(self.updates))
+        values, prune_stats = self.updates[0]
+        self.assertTrue(prune_stats)
+        self.assertEqual({}, values['stats'])
+        self.assertEqual(0, values['memory_mb_used'])
+        self.assertEqual([], self.compute['stats'])
+
+
 class InstanceClaimTestCase(BaseTrackerTestCase):
 
     def test_update_usage_only_for_tracked(self):
@@ -494,6 +587,23 @@ class InstanceClaimTestCase(BaseTrackerTestCase):
         self._assert(2, 'local_gb_used')
         self._assert(1, 'current_workload')
 
+    def test_release_scheduler_claim(self):
+        released = []
+
+        def _fake_compute_node_release(ctxt, compute_id, memory_mb,
+                                       local_gb, vcpus):
+            released.append((compute_id, memory_mb, local_gb, vcpus))
+
+        self.stubs.Set(db, 'compute_node_release',
+                       _fake_compute_node_release)
+        instance = self._fake_instance(memory_mb=3, root_gb=1, ephemeral_gb=1)
+        self.tracker.release_scheduler_claim(self.context, instance)
+        self.assertEqual([(self.tracker.compute_node['id'], 3, 2, 1)],
+                         released)
+        # The tracker's own accounting is not affected.
+        self._assert(0, 'memory_mb_used')
+        self._assert(0, 'local_gb_used')
+
     def test_claim_and_audit(self):
         claim_mem = 3
         claim_disk = 2
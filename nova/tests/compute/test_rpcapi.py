@@ -283,6 +283,10 @@ class ComputeRpcAPITestCase(test.TestCase):
                 instance=self.fake_instance, device='device', volume_id='id',
                 version='2.3')
 
+    def test_prefetch_images(self):
+        self._test_compute_api('prefetch_images', 'cast',
+                host='host', image_ids=['fake_image'], version='2.37')
+
     def refresh_provider_fw_rules(self):
         self._test_compute_api('refresh_provider_fw_rules', 'cast',
                 host='host')
@@ -434,6 +434,13 @@ class _BaseTestCase(object):
         result = self.conductor.compute_node_delete(self.context, node)
         self.assertEqual(result, None)
 
+    def test_compute_node_release(self):
+        node = {'id': 'fake-id'}
+        self.mox.StubOutWithMock(db, 'compute_node_release')
+        db.compute_node_release(self.context, node['id'], 512, 10, 1)
+        self.mox.ReplayAll()
+        self.conductor.compute_node_release(self.context, node, 512, 10, 1)
+
     def test_instance_fault_create(self):
         self.mox.StubOutWithMock(db, 'instance_fault_create')
         db.instance_fault_create(self.context, 'fake-values').AndReturn(
@@ -822,6 +829,39 @@ class ConductorTestCase(_BaseTestCase, test.TestCase):
         self.conductor.compute_confirm_resize(self.context, inst_obj,
                                               'migration')
 
+    def test_batch(self):
+        self.mox.StubOutWithMock(db, 'action_event_start')
+        self.mox.StubOutWithMock(db, 'instance_fault_create')
+        db.action_event_start(self.context, {}).AndReturn('fake-event')
+        db.instance_fault_create(self.context, 'fake-values').AndReturn(
+            'fake-fault')
+        self.mox.ReplayAll()
+        result = self.conductor.batch(self.context,
+                [('action_event_start', {'values': {}}),
+                 ('instance_fault_create', {'values': 'fake-values'})])
+        self.assertEqual([{'result': 'fake-event'}, {'result': 'fake-fault'}],
+                         result)
+
+    def test_batch_stops_at_failure(self):
+        self.mox.StubOutWithMock(db, 'action_event_start')
+        db.action_event_start(self.context, {}).AndRaise(
+            exc.InstanceActionNotFound(request_id='fake-req',
+                                       instance_uuid='fake-uuid'))
+        self.mox.ReplayAll()
+        result = self.conductor.batch(self.context,
+                [('action_event_start', {'values': {}}),
+                 ('action_event_finish', {'values': {}})])
+        self.assertEqual(1, len(result))
+        self.assertTrue('InstanceActionNotFound' in result[0]['failure'])
+
+    def test_batch_unexpected_method(self):
+        self.mox.StubOutWithMock(db, 'action_event_start')
+        self.mox.ReplayAll()
+        self.assertRaises(rpc_common.ClientException, self.conductor.batch,
+                          self.context,
+                          [('action_event_start', {'values': {}}),
+                           ('instance_destroy', {'instance': {}})])
+
 
 class ConductorRPCAPITestCase(_BaseTestCase, test.TestCase):
     """Conductor RPC API Tests."""
@@ -1141,6 +1181,43 @@ class ConductorAPITestCase(_BaseTestCase, test.TestCase):
         self.conductor.security_groups_trigger_handler(self.context,
                                                        'event', 'arg')
 
+    def test_batched(self):
+        self.mox.StubOutWithMock(db, 'action_event_start')
+        self.mox.StubOutWithMock(db, 'instance_fault_create')
+        db.action_event_start(self.context, {}).AndReturn('fake-event')
+        db.instance_fault_create(self.context, 'fake-values').AndReturn(
+            'fake-fault')
+        self.mox.ReplayAll()
+        batch = self.conductor.batched(self.context)
+        batch.action_event_start({})
+        batch.instance_fault_create('fake-values')
+        self.assertEqual(2, len(batch))
+        self.assertEqual(['fake-event', 'fake-fault'], batch.commit())
+        self.assertEqual(0, len(batch))
+
+    def test_batched_failure(self):
+        self.mox.StubOutWithMock(db, 'action_event_start')
+        db.action_event_start(self.context, {}).AndRaise(
+            exc.InstanceActionNotFound(request_id='fake-req',
+                                       instance_uuid='fake-uuid'))
+        self.mox.ReplayAll()
+        batch = self.conductor.batched(self.context)
+        batch.action_event_start({})
+        batch.action_event_finish({})
+        self.assertRaises(exc.InstanceActionNotFound, batch.commit)
+
+    def test_batched_old_conductor(self):
+        self.flags(conductor='1.55', group='upgrade_levels')
+        old_conductor = conductor_api.API()
+        self.mox.StubOutWithMock(old_conductor._manager, 'batch')
+        self.mox.StubOutWithMock(old_conductor._manager, 'action_event_start')
+        old_conductor._manager.action_event_start(self.context,
+                                                  values={}).AndReturn('fake')
+        self.mox.ReplayAll()
+        batch = old_conductor.batched(self.context)
+        batch.action_event_start({})
+        self.assertEqual(['fake'], batch.commit())
+
 
 class ConductorLocalAPITestCase(ConductorAPITestCase):
     """Conductor LocalAPI Tests."""
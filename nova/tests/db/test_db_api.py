@@ -410,6 +410,37 @@ class AggregateDBApiTestCase(test.TestCase):
         }, r1)
         self.assertFalse('fake_key1' in r1)
 
+    def test_aggregate_metadata_get_all_by_host(self):
+        ctxt = context.get_admin_context()
+        values2 = {'name': 'fake_aggregate12'}
+        values3 = {'name': 'fake_aggregate23'}
+        a2_hosts = ['foo1.openstack.org', 'foo2.openstack.org']
+        a2_metadata = {'good': 'value12', 'bad': 'badvalue12'}
+        a3_hosts = ['foo2.openstack.org', 'foo3.openstack.org']
+        a3_metadata = {'good': 'value23'}
+        _create_aggregate_with_hosts(context=ctxt)
+        _create_aggregate_with_hosts(context=ctxt, values=values2,
+                hosts=a2_hosts, metadata=a2_metadata)
+        a3 = _create_aggregate_with_hosts(context=ctxt, values=values3,
+                hosts=a3_hosts, metadata=a3_metadata)
+        _create_aggregate_with_hosts(context=ctxt,
+                values={'name': 'no_metadata'}, metadata=None,
+                hosts=['bar.openstack.org'])
+        db.aggregate_host_delete(ctxt, a3['id'], 'foo3.openstack.org')
+        r1 = db.aggregate_metadata_get_all_by_host(ctxt)
+        self.assertEqual({
+            'foo.openstack.org': {'fake_key1': set(['fake_value1']),
+                                  'fake_key2': set(['fake_value2']),
+                                  'availability_zone':
+                                      set(['fake_avail_zone'])},
+            'foo1.openstack.org': {'good': set(['value12']),
+                                   'bad': set(['badvalue12'])},
+            'foo2.openstack.org': {'good': set(['value12', 'value23']),
+                                   'bad': set(['badvalue12'])},
+        }, r1)
+        r2 = db.aggregate_metadata_get_by_host(ctxt, 'foo2.openstack.org')
+        self.assertEqual(r2, r1['foo2.openstack.org'])
+
     def test_aggregate_get_by_host_not_found(self):
         ctxt = context.get_admin_context()
         _create_aggregate_with_hosts(context=ctxt)
@@ -1273,6 +1304,47 @@ class InstanceTestCase(test.TestCase, ModelsObjectComparatorMixin):
         instance = self.create_instance_with_args()
         self.assertTrue(uuidutils.is_uuid_like(instance['uuid']))
 
+    def test_instance_create_many(self):
+        values_list = []
+        for i in range(3):
+            values = self.sample_data.copy()
+            values['hostname'] = 'host-%d' % i
+            values['metadata'] = {'index': str(i)}
+            values['security_groups'] = ['default']
+            values_list.append(values)
+        values_list[1]['uuid'] = 'fake-uuid'
+
+        instances = db.instance_create_many(self.ctxt, values_list)
+        self.assertEqual(['host-0', 'host-1', 'host-2'],
+                         [instance['hostname'] for instance in instances])
+        self.assertEqual('fake-uuid', instances[1]['uuid'])
+        self.assertTrue(uuidutils.is_uuid_like(instances[0]['uuid']))
+        for i, instance in enumerate(instances):
+            self.assertEqual({'index': str(i)},
+                             utils.metadata_to_dict(instance['metadata']))
+            self.assertEqual(self.sample_data['system_metadata'],
+                    utils.metadata_to_dict(instance['system_metadata']))
+            self.assertEqual(['default'], [group['name'] for group in
+                                           instance['security_groups']])
+            self.assertEqual(instance['uuid'],
+                             instance['info_cache']['instance_uuid'])
+            ec2_id = db.get_ec2_instance_id_by_uuid(self.ctxt,
+                                                    instance['uuid'])
+            self.assertEqual(instance['uuid'],
+                             db.get_instance_uuid_by_ec2_id(self.ctxt,
+                                                            ec2_id))
+            self._assertEqualObjects(instance,
+                    db.instance_get_by_uuid(self.ctxt, instance['uuid']),
+                    ignored_keys=['metadata', 'system_metadata',
+                                  'info_cache', 'security_groups'])
+
+    def test_instance_create_many_unique_hostnames(self):
+        self.flags(osapi_compute_unique_server_name_scope='global')
+        values_list = [self.sample_data.copy(), self.sample_data.copy()]
+        self.assertRaises(exception.InstanceExists,
+                          db.instance_create_many, self.ctxt, values_list)
+        self.assertEqual([], db.instance_get_all(self.ctxt))
+
     def test_instance_create_with_object_values(self):
         values = {
             'access_ip_v4': netaddr.IPAddress('1.2.3.4'),
@@ -2926,6 +2998,34 @@ class FixedIPTestCase(BaseInstanceTypeTestCase):
                           db.fixed_ip_get_by_instance,
                           self.ctxt, instance_uuid)
 
+    def test_fixed_ip_get_by_address_like(self):
+        instance_uuid = self._create_instance()
+        vif = db.virtual_interface_create(
+            self.ctxt, dict(instance_uuid=instance_uuid))
+        for address in ('192.168.1.5', '192.168.1.50', '192.168.2.5'):
+            db.fixed_ip_create(self.ctxt, dict(
+                virtual_interface_id=vif.id, instance_uuid=instance_uuid,
+                address=address))
+        # Not on a virtual interface
+        db.fixed_ip_create(self.ctxt, dict(address='192.168.1.6'))
+        fixed_ip = db.fixed_ip_get_by_address(self.ctxt, '192.168.2.5')
+        db.floating_ip_create(self.ctxt, dict(address='10.0.0.1',
+                                              fixed_ip_id=fixed_ip['id']))
+
+        def get_addresses(pattern):
+            return [ip['address']
+                    for ip in db.fixed_ip_get_by_address_like(self.ctxt,
+                                                              pattern)]
+
+        self.assertEqual(['192.168.1.5'], get_addresses('192.168.1.5'))
+        self.assertEqual(['192.168.1.5', '192.168.1.50'],
+                         get_addresses('192.168.1.%'))
+        self.assertEqual(['192.168.2.5'], get_addresses('10_0_0_1'))
+        fixed_ips = db.fixed_ip_get_by_address_like(self.ctxt, '10.%')
+        floating_ips = fixed_ips[0]['floating_ips']
+        self.assertEqual(['10.0.0.1'], [ip['address'] for ip in floating_ips])
+        self.assertEqual([], get_addresses('192.168.1.6'))
+
     def test_fixed_ips_by_virtual_interface_fixed_ip_found(self):
         instance_uuid = self._create_instance()
 
@@ -3135,6 +3235,45 @@ class FixedIPTestCase(BaseInstanceTypeTestCase):
         for param, ip in zip(params, fixed_ip_data):
             self._assertEqualObjects(param, ip, ignored_keys)
 
+    def test_fixed_ip_bulk_create_chunks(self):
+        self.stubs.Set(sqlalchemy_api, '_BULK_CREATE_CHUNK_SIZE', 2)
+        network_id = db.network_create_safe(self.ctxt, {})['id']
+        addresses = ['192.168.1.%d' % i for i in range(5)]
+        db.fixed_ip_bulk_create(self.ctxt,
+                                ({'address': address, 'network_id': network_id}
+                                 for address in addresses))
+        fixed_ips = db.fixed_ip_get_all(self.ctxt)
+        self.assertEqual(addresses,
+                         sorted(fixed_ip['address'] for fixed_ip in fixed_ips))
+        self.assertEqual(0, fixed_ips[0]['deleted'])
+        self.assertTrue(fixed_ips[0]['created_at'])
+
+    def test_fixed_ip_bulk_create_existing_address_in_later_chunk(self):
+        self.stubs.Set(sqlalchemy_api, '_BULK_CREATE_CHUNK_SIZE', 2)
+        db.fixed_ip_create(self.ctxt, {'address': '192.168.1.3'})
+        params = [{'address': '192.168.1.%d' % i} for i in range(5)]
+        self.assertRaises(exception.FixedIpExists, db.fixed_ip_bulk_create,
+                          self.ctxt, params)
+        self.assertRaises(exception.FixedIpNotFoundForAddress,
+                          db.fixed_ip_get_by_address, self.ctxt, '192.168.1.0')
+
+    def test_fixed_ip_bulk_create_concurrently_created_address(self):
+        db.fixed_ip_create(self.ctxt, {'address': '192.168.1.1'})
+        model_query = sqlalchemy_api.model_query
+
+        def fake_model_query(*args, **kwargs):
+            # The address is created after it was looked up.
+            return model_query(*args, **kwargs).filter(
+                models.FixedIp.id == None)
+
+        self.stubs.Set(sqlalchemy_api, 'model_query', fake_model_query)
+        params = [{'address': '192.168.1.%d' % i} for i in range(3)]
+        self.assertRaises(exception.FixedIpExists, db.fixed_ip_bulk_create,
+                          self.ctxt, params)
+        self.stubs.UnsetAll()
+        self.assertRaises(exception.FixedIpNotFoundForAddress,
+                          db.fixed_ip_get_by_address, self.ctxt, '192.168.1.0')
+
     def test_fixed_ip_disassociate(self):
         address = '192.168.1.5'
         instance_uuid = self._create_instance()
@@ -5102,6 +5241,77 @@ class ComputeNodeTestCase(test.TestCase, ModelsObjectComparatorMixin):
         nodes = db.compute_node_get_all(self.ctxt)
         self.assertEqual(len(nodes), 0)
 
+    def test_compute_node_get_all_changed_since(self):
+        created_at = self.item['created_at']
+        nodes = db.compute_node_get_all_changed_since(self.ctxt, created_at)
+        self.assertEqual(1, len(nodes))
+        self.assertEqual(self.item['id'], nodes[0]['id'])
+        self.assertEqual('host1', nodes[0]['service']['host'])
+
+        later = created_at + datetime.timedelta(seconds=1)
+        timeutils.set_time_override(later)
+        self.addCleanup(timeutils.clear_time_override)
+        nodes = db.compute_node_get_all_changed_since(self.ctxt, later)
+        self.assertEqual(0, len(nodes))
+
+        db.compute_node_update(self.ctxt, self.item['id'], {'vcpus': 4})
+        nodes = db.compute_node_get_all_changed_since(self.ctxt, later)
+        self.assertEqual(1, len(nodes))
+        self.assertEqual(4, nodes[0]['vcpus'])
+
+    def test_compute_node_get_all_changed_since_deleted(self):
+        db.compute_node_delete(self.ctxt, self.item['id'])
+        nodes = db.compute_node_get_all_changed_since(self.ctxt,
+                                                      self.item['created_at'])
+        self.assertEqual(1, len(nodes))
+        self.assertTrue(nodes[0]['deleted'])
+
+    def test_compute_node_reserve(self):
+        limits = {'memory_mb': 1024, 'disk_gb': 2048, 'vcpu': 2}
+        self.assertTrue(db.compute_node_reserve(self.ctxt, self.item['id'],
+                                                512, 10, 1, limits))
+        node = db.compute_node_get(self.ctxt, self.item['id'])
+        self.assertEqual(512, node['free_ram_mb'])
+        self.assertEqual(512, node['memory_mb_used'])
+        self.assertEqual(2038, node['free_disk_gb'])
+        self.assertEqual(10, node['local_gb_used'])
+        self.assertEqual(90, node['disk_available_least'])
+        self.assertEqual(1, node['vcpus_used'])
+        self.assertNotEqual(self.item['updated_at'], node['updated_at'])
+
+    def test_compute_node_reserve_over_limit(self):
+        limits = {'memory_mb': 1024}
+        self.assertTrue(db.compute_node_reserve(self.ctxt, self.item['id'],
+                                                1024, 0, 0, limits))
+        self.assertFalse(db.compute_node_reserve(self.ctxt, self.item['id'],
+                                                 1, 0, 0, limits))
+        node = db.compute_node_get(self.ctxt, self.item['id'])
+        self.assertEqual(0, node['free_ram_mb'])
+
+    def test_compute_node_reserve_disk_uses_available_least(self):
+        # disk_available_least is 100, so only 100GB can be used
+        limits = {'disk_gb': 2048}
+        self.assertFalse(db.compute_node_reserve(self.ctxt, self.item['id'],
+                                                 0, 101, 0, limits))
+        self.assertTrue(db.compute_node_reserve(self.ctxt, self.item['id'],
+                                                0, 100, 0, limits))
+
+    def test_compute_node_reserve_without_limits(self):
+        self.assertTrue(db.compute_node_reserve(self.ctxt, self.item['id'],
+                                                4096, 0, 8))
+        node = db.compute_node_get(self.ctxt, self.item['id'])
+        self.assertEqual(-3072, node['free_ram_mb'])
+        self.assertEqual(8, node['vcpus_used'])
+
+    def test_compute_node_release(self):
+        self.assertTrue(db.compute_node_reserve(self.ctxt, self.item['id'],
+                                                512, 10, 1))
+        db.compute_node_release(self.ctxt, self.item['id'], 512, 10, 1)
+        node = db.compute_node_get(self.ctxt, self.item['id'])
+        for key in ('free_ram_mb', 'memory_mb_used', 'free_disk_gb',
+                    'local_gb_used', 'disk_available_least', 'vcpus_used'):
+            self.assertEqual(self.item[key], node[key])
+
     def test_compute_node_search_by_hypervisor(self):
         nodes_created = []
         new_service = copy.copy(self.service_dict)
@@ -15,6 +15,8 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import re
+
 from oslo.config import cfg
 
 from nova.compute import api as compute_api
@@ -110,13 +112,19 @@ class FakeNetworkManager(network_manager.NetworkManager):
 
         fixed_ips = [dict(id=100,
                           address='172.16.0.1',
-                          virtual_interface_id=0),
+                          virtual_interface_id=0,
+                          instance_uuid=('00000000-0000-0000-0000-'
+                                         '000000000010')),
                      dict(id=200,
                           address='172.16.0.2',
-                          virtual_interface_id=1),
+                          virtual_interface_id=1,
+                          instance_uuid=('00000000-0000-0000-0000-'
+                                         '000000000020')),
                      dict(id=210,
                           address='173.16.0.2',
-                          virtual_interface_id=2)]
+                          virtual_interface_id=2,
+                          instance_uuid=('00000000-0000-0000-0000-'
+                                         '000000000030'))]
 
         def fixed_ip_get_by_instance(self, context, instance_uuid):
             return [dict(address='10.0.0.0'), dict(address='10.0.0.1'),
@@ -152,6 +160,19 @@ class FakeNetworkManager(network_manager.NetworkManager):
             return [ip for ip in self.fixed_ips
                     if ip['virtual_interface_id'] == vif_id]
 
+        def fixed_ip_get_by_address_like(self, context, pattern):
+            regex = re.compile('%s$' % re.escape(pattern).replace(
+                '\\%', '.*').replace('\\_', '.'))
+            results = []
+            for fixed_ip in self.fixed_ips:
+                floating_ips = [ip for ip in self.floating_ips
+                                if ip['fixed_ip_id'] == fixed_ip['id']]
+                addresses = [fixed_ip['address']] + [ip['address']
+                                                     for ip in floating_ips]
+                if any(regex.match(address) for address in addresses):
+                    results.append(dict(fixed_ip, floating_ips=floating_ips))
+            return results
+
         def fixed_ip_disassociate(self, context, address):
             return True
 
@@ -16,8 +16,10 @@
 # under the License.
 
 import calendar
+import contextlib
 import os
 
+from eventlet import greenthread
 import mox
 from oslo.config import cfg
 
@@ -27,6 +29,7 @@ from nova.network import driver
 from nova.network import linux_net
 from nova.openstack.common import fileutils
 from nova.openstack.common import jsonutils
+from nova.openstack.common import lockutils
 from nova.openstack.common import log as logging
 from nova.openstack.common import timeutils
 from nova import test
@@ -310,6 +313,97 @@ class LinuxNetworkTestCase(test.TestCase):
 
         self.driver.update_dhcp(self.context, "eth0", networks[0])
 
+    def _setup_dnsmasq_hup(self):
+        self.flags(dnsmasq_hup_interval=60, use_single_default_gateway=True)
+        self.stubs.Set(linux_net, '_dnsmasq_files', {})
+        self.stubs.Set(linux_net, '_dnsmasq_last_hup', {})
+        self.stubs.Set(linux_net, '_dnsmasq_pending_hup', {})
+        self.stubs.Set(fileutils, 'ensure_tree', lambda *a, **kw: None)
+        self.stubs.Set(os, 'chmod', lambda *a, **kw: None)
+        self.stubs.Set(os, 'rename', lambda *a, **kw: None)
+        self.stubs.Set(os.path, 'exists', lambda *a, **kw: True)
+        self.stubs.Set(linux_net, '_dnsmasq_pid_for', lambda *a, **kw: 123)
+        self.stubs.Set(linux_net, '_add_dnsmasq_accept_rules',
+                       lambda *a, **kw: None)
+        self.stubs.Set(linux_net, '_add_dhcp_mangle_rule',
+                       lambda *a, **kw: None)
+
+        self.written = []
+        self.executes = []
+
+        def fake_write_to_file(path, data, mode='w'):
+            self.written.append(path)
+
+        def fake_execute(*cmd, **kwargs):
+            self.executes.append(cmd)
+            if cmd[0] == 'cat':
+                return linux_net._dhcp_file('eth0', 'conf'), ''
+            return '', ''
+
+        self.stubs.Set(linux_net, 'write_to_file', fake_write_to_file)
+        self.stubs.Set(linux_net, '_execute', fake_execute)
+
+    def _hups(self):
+        return [cmd for cmd in self.executes if cmd[:2] == ('kill', '-HUP')]
+
+    def test_update_dhcp_unchanged_not_rewritten(self):
+        self._setup_dnsmasq_hup()
+
+        self.driver.update_dhcp(self.context, 'eth0', networks[0])
+        self.assertEqual(2, len(self.written))
+        self.assertEqual([('kill', '-HUP', 123)], self._hups())
+
+        self.driver.update_dhcp(self.context, 'eth0', networks[0])
+        self.assertEqual(2, len(self.written))
+        self.assertEqual(1, len(self._hups()))
+
+    def test_update_dhcp_hups_coalesced(self):
+        self._setup_dnsmasq_hup()
+        timeutils.set_time_override()
+        self.addCleanup(timeutils.clear_time_override)
+        spawned = []
+
+        def fake_spawn_after(seconds, func, *args):
+            spawned.append((seconds, func, args))
+            return 'thread'
+
+        self.stubs.Set(greenthread, 'spawn_after', fake_spawn_after)
+
+        self.driver.update_dhcp(self.context, 'eth0', networks[0])
+        self.assertEqual(1, len(self._hups()))
+
+        for network in (networks[1], networks[0]):
+            timeutils.advance_time_seconds(10)
+            self.driver.update_dhcp(self.context, 'eth0', network)
+        self.assertEqual(1, len(self._hups()))
+        self.assertEqual([(50, linux_net._deferred_hup_dnsmasq, ('eth0',))],
+                         spawned)
+
+        timeutils.advance_time_seconds(50)
+        spawned[0][1](*spawned[0][2])
+        self.assertEqual(2, len(self._hups()))
+        self.assertEqual({}, linux_net._dnsmasq_pending_hup)
+
+    def test_deferred_hup_holds_dnsmasq_start_lock(self):
+        self._setup_dnsmasq_hup()
+        held = []
+
+        @contextlib.contextmanager
+        def fake_lock(name, *args, **kwargs):
+            held.append(name)
+            yield
+            held.remove(name)
+
+        def fake_hup_dnsmasq(dev, pid):
+            hups.append(list(held))
+
+        hups = []
+        self.stubs.Set(lockutils, 'lock', fake_lock)
+        self.stubs.Set(linux_net, '_hup_dnsmasq', fake_hup_dnsmasq)
+        linux_net._deferred_hup_dnsmasq('eth0')
+        self.assertEqual([['dnsmasq_start']], hups)
+        self.assertEqual([], held)
+
     def test_get_dhcp_hosts_for_nw00(self):
         self.flags(use_single_default_gateway=True)
 
@@ -1536,6 +1536,37 @@ class CommonNetworkTestCase(test.TestCase):
                 None, None, None]
         self.assertTrue(manager.create_networks(*args))
 
+    def _test_create_fixed_ips(self, batch_size):
+        self.flags(fixed_ip_create_batch_size=batch_size)
+        manager = network_manager.NetworkManager()
+        batches = []
+
+        def fake_get_network_by_id(context, network_id):
+            return {'id': network_id, 'cidr': '192.168.0.0/29'}
+
+        def fake_fixed_ip_bulk_create(context, ips):
+            batches.append(list(ips))
+
+        self.stubs.Set(manager, '_get_network_by_id', fake_get_network_by_id)
+        self.stubs.Set(manager.db, 'fixed_ip_bulk_create',
+                       fake_fixed_ip_bulk_create)
+        manager._create_fixed_ips(None, 1)
+        return batches
+
+    def test_create_fixed_ips(self):
+        batches = self._test_create_fixed_ips(0)
+        self.assertEqual(1, len(batches))
+        self.assertEqual(['192.168.0.%d' % i for i in range(8)],
+                         [ip['address'] for ip in batches[0]])
+        self.assertEqual([True, True, False, False, False, False, False, True],
+                         [ip['reserved'] for ip in batches[0]])
+
+    def test_create_fixed_ips_batched(self):
+        batches = self._test_create_fixed_ips(3)
+        self.assertEqual([3, 3, 2], [len(batch) for batch in batches])
+        self.assertEqual(['192.168.0.%d' % i for i in range(8)],
+                         [ip['address'] for batch in batches for ip in batch])
+
     def test_get_instance_uuids_by_ip_regex(self):
         manager = fake_network.FakeNetworkManager()
         _vifs = manager.db.virtual_interface_get_all(None)
@@ -1660,6 +1691,49 @@ class CommonNetworkTestCase(test.TestCase):
         self.assertEqual(len(res), 1)
         self.assertEqual(res[0]['instance_uuid'], _vifs[2]['instance_uuid'])
 
+    def test_get_instance_uuids_by_ip_prefix_not_scanned(self):
+        manager = fake_network.FakeNetworkManager()
+        fake_context = context.RequestContext('user', 'project')
+        self.mox.StubOutWithMock(manager.db, 'virtual_interface_get_all')
+        self.mox.StubOutWithMock(manager.db, 'fixed_ips_by_virtual_interface')
+        self.mox.ReplayAll()
+
+        res = manager.get_instance_uuids_by_ip_filter(fake_context,
+                                                      {'ip': '^172\\.16\\.'})
+        self.assertEqual(['172.16.0.1', '172.16.0.2'],
+                         [r['ip'] for r in res])
+
+        # Floating ips are searched as well
+        res = manager.get_instance_uuids_by_ip_filter(fake_context,
+                                                      {'ip': '173.16.1.2$'})
+        instance_uuid = manager.db.vifs[2]['instance_uuid']
+        self.assertEqual([{'instance_uuid': instance_uuid,
+                           'ip': '173.16.1.2'}], res)
+
+    def test_get_instance_uuids_by_ip_regex_scanned(self):
+        manager = fake_network.FakeNetworkManager()
+        fake_context = context.RequestContext('user', 'project')
+        self.mox.StubOutWithMock(manager.db, 'fixed_ip_get_by_address_like')
+        self.mox.ReplayAll()
+
+        res = manager.get_instance_uuids_by_ip_filter(fake_context,
+                                                      {'ip': '17[23].16.0.2'})
+        self.assertEqual(['172.16.0.2', '173.16.0.2'],
+                         [r['ip'] for r in res])
+
+    def test_ip_filter_to_like(self):
+        self.assertEqual('10_0_0_1%',
+                         network_manager._ip_filter_to_like('10.0.0.1'))
+        self.assertEqual('10.0.0.1', network_manager._ip_filter_to_like(
+            '^10\\.0\\.0\\.1$'))
+        self.assertEqual('172_16%',
+                         network_manager._ip_filter_to_like('172.16.*'))
+        self.assertEqual('%', network_manager._ip_filter_to_like('.*'))
+        self.assertEqual(None,
+                         network_manager._ip_filter_to_like('1.*2'))
+        self.assertEqual(None,
+                         network_manager._ip_filter_to_like('10.0.0.[12]'))
+
     def test_get_network(self):
         manager = fake_network.FakeNetworkManager()
         fake_context = context.RequestContext('user', 'project')
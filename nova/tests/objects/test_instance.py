@@ -80,15 +80,18 @@ class _TestInstanceObject(object):
         inst.access_ip_v4 = '1.2.3.4'
         inst.access_ip_v6 = '::1'
         primitive = inst.obj_to_primitive()
+        # The changes are listed in no particular order
+        changes = primitive.pop('nova_object.changes')
+        self.assertEqual(set(['uuid', 'access_ip_v6', 'access_ip_v4']),
+                         set(changes))
+        self.assertEqual(3, len(changes))
         expected = {'nova_object.name': 'Instance',
                     'nova_object.namespace': 'nova',
                     'nova_object.version': '1.0',
                     'nova_object.data':
                         {'uuid': 'fake-uuid',
                          'access_ip_v4': '1.2.3.4',
-                         'access_ip_v6': '::1'},
-                    'nova_object.changes': ['uuid', 'access_ip_v6',
-                                            'access_ip_v4']}
+                         'access_ip_v6': '::1'}}
         self.assertEqual(primitive, expected)
         inst2 = instance.Instance.obj_from_primitive(primitive)
         self.assertTrue(isinstance(inst2.access_ip_v4, netaddr.IPAddress))
@@ -281,6 +284,27 @@ class _TestInstanceObject(object):
     def test_save_exp_task_state_api_cell_admin_reset(self):
         self._save_test_helper('api', {'admin_state_reset': True})
 
+    def test_delta_primitive(self):
+        ctxt = context.get_admin_context()
+        fake_inst = dict(self.fake_instance, metadata=[])
+        inst = instance.Instance._from_db_object(
+            ctxt, instance.Instance(), fake_inst,
+            expected_attrs=['metadata', 'info_cache'])
+        inst.vm_state = 'meow'
+        primitive = inst.obj_to_delta_primitive()
+        self.assertEqual(set(['id', 'uuid', 'cell_name', 'vm_state']),
+                         set(primitive['nova_object.data']))
+        self.assertEqual(['vm_state'], primitive['nova_object.changes'])
+        inst.metadata['foo'] = 'bar'
+        inst.info_cache.network_info = network_model.NetworkInfo()
+        primitive = inst.obj_to_delta_primitive()
+        self.assertEqual(set(['id', 'uuid', 'cell_name', 'vm_state',
+                              'metadata', 'info_cache']),
+                         set(primitive['nova_object.data']))
+        inst2 = instance.Instance.obj_from_primitive(primitive)
+        self.assertEqual({'foo': 'bar'}, inst2.metadata)
+        self.assertFalse(inst2.obj_attr_is_set('host'))
+
     def test_get_deleted(self):
         ctxt = context.get_admin_context()
         fake_inst = dict(self.fake_instance, id=123, deleted=123)
@@ -570,6 +594,37 @@ class _TestInstanceListObject(object):
             self.assertEqual(inst_list.objects[i].uuid, fakes[i]['uuid'])
         self.assertRemotes()
 
+    def test_create_bulk(self):
+        fakes = [self.fake_instance(1, updates={'uuid': 'fake-uuid-1',
+                                                'host': 'foo-host'}),
+                 self.fake_instance(2, updates={'uuid': 'fake-uuid-2',
+                                                'host': 'bar-host'})]
+        ctxt = context.get_admin_context()
+        self.mox.StubOutWithMock(db, 'instance_create_many')
+        db.instance_create_many(ctxt, [{'host': 'foo-host'},
+                                       {'host': 'bar-host'}]).AndReturn(fakes)
+        self.mox.ReplayAll()
+        inst1 = instance.Instance()
+        inst1.host = 'foo-host'
+        inst2 = instance.Instance()
+        inst2.host = 'bar-host'
+        inst_list = instance.InstanceList.create_bulk(ctxt, [inst1, inst2])
+
+        self.assertEqual(['fake-uuid-1', 'fake-uuid-2'],
+                         [inst.uuid for inst in inst_list])
+        self.assertEqual(['foo-host', 'bar-host'],
+                         [inst.host for inst in inst_list])
+        for inst in inst_list:
+            self.assertEqual(set(), inst.obj_what_changed())
+        self.assertRemotes()
+
+    def test_create_bulk_already_created(self):
+        ctxt = context.get_admin_context()
+        inst = instance.Instance()
+        inst.id = 1
+        self.assertRaises(exception.ObjectActionError,
+                          instance.InstanceList.create_bulk, ctxt, [inst])
+
     def test_get_all_by_filters_works_for_cleaned(self):
         fakes = [self.fake_instance(1),
                  self.fake_instance(2, updates={'deleted': 2,
@@ -36,6 +36,48 @@ class _TestInstanceInfoCacheObject(object):
         self.assertEqual(obj.network_info, nwinfo)
         self.assertRemotes()
 
+    def test_network_info_hydrated_on_use(self):
+        ctxt = context.get_admin_context()
+        nwinfo = network_model.NetworkInfo.hydrate(
+            [{'address': 'aa:aa:aa:aa:aa:aa',
+              'network': {'label': 'public',
+                          'subnets': [{'cidr': '10.0.0.0/24',
+                                       'ips': [{'address': '10.0.0.2'}]}]}}])
+        obj = instance_info_cache.InstanceInfoCache._from_db_object(
+            ctxt, instance_info_cache.InstanceInfoCache(),
+            {'instance_uuid': 'fake-uuid', 'network_info': nwinfo.json()})
+        self.assertTrue(obj.obj_attr_is_set('network_info'))
+        self.assertEqual(['10.0.0.2'], obj.fixed_ip_addresses())
+        self.assertEqual(['aa:aa:aa:aa:aa:aa'], obj.mac_addresses())
+        self.assertEqual(nwinfo.json(), obj.obj_to_primitive()[
+            'nova_object.data']['network_info'])
+        self.assertFalse(hasattr(obj, '_network_info'))
+        self.assertEqual(nwinfo, obj.network_info)
+        self.assertTrue(isinstance(obj.network_info,
+                                   network_model.NetworkInfo))
+        self.assertEqual(set(), obj.obj_what_changed())
+
+    def test_network_info_set_after_json(self):
+        obj = instance_info_cache.InstanceInfoCache()
+        obj._set_network_info('[{"address": "foo"}]')
+        obj.network_info = network_model.NetworkInfo()
+        self.assertEqual([], obj.network_info_primitive())
+        self.assertEqual('[]', obj.obj_to_primitive()[
+            'nova_object.data']['network_info'])
+
+    def test_network_info_from_primitive(self):
+        obj = instance_info_cache.InstanceInfoCache()
+        obj.instance_uuid = 'fake-uuid'
+        obj.network_info = network_model.NetworkInfo.hydrate(
+            [{'address': 'foo'}])
+        obj2 = instance_info_cache.InstanceInfoCache.obj_from_primitive(
+            obj.obj_to_primitive())
+        self.assertFalse(hasattr(obj2, '_network_info'))
+        self.assertEqual(['foo'], obj2.mac_addresses())
+        self.assertEqual(obj.network_info, obj2.network_info)
+        self.assertEqual(set(['instance_uuid', 'network_info']),
+                         obj2.obj_what_changed())
+
     def test_get_by_instance_uuid_no_entries(self):
         ctxt = context.get_admin_context()
         self.mox.StubOutWithMock(db, 'instance_info_cache_get')
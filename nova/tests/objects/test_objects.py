@@ -13,9 +13,11 @@
 #    under the License.
 
 import contextlib
+import copy
 import datetime
 import iso8601
 import netaddr
+import types
 
 from nova.conductor import rpcapi as conductor_rpcapi
 from nova import context
@@ -32,6 +34,8 @@ class MyObj(base.NovaObject):
               'bar': str,
               'missing': str,
               }
+    obj_delta_methods = ['save']
+    obj_delta_fields = ['foo']
 
     def obj_load_attr(self, attrname):
         setattr(self, attrname, 'loaded!')
@@ -198,6 +202,12 @@ class TestUtils(test.TestCase):
         self.assertEqual({'foo': 1, 'bar': 'foo'},
                          base.obj_to_primitive(myobj))
 
+    def test_fields_in_slots(self):
+        self.assertEqual(('_bar', '_foo', '_missing'), MyObj.__slots__)
+        self.assertEqual(('_new_field',), TestSubclassedObject.__slots__)
+        self.assertTrue(isinstance(base.NovaObject.__dict__['_created_at'],
+                                   types.MemberDescriptorType))
+
     def test_obj_to_primitive_recursive(self):
         class MyList(base.ObjectListBase, base.NovaObject):
             pass
@@ -310,6 +320,19 @@ class _TestObject(object):
         obj.obj_reset_changes()
         self.assertEqual(obj.obj_to_primitive(), expected)
 
+    def test_delta_dehydration(self):
+        expected = {'nova_object.name': 'MyObj',
+                    'nova_object.namespace': 'nova',
+                    'nova_object.version': '1.5',
+                    'nova_object.changes': ['missing'],
+                    'nova_object.data': {'foo': 1, 'missing': 'changed'}}
+        obj = MyObj()
+        obj.foo = 1
+        obj.bar = 'bar'
+        obj.obj_reset_changes()
+        obj.missing = 'changed'
+        self.assertEqual(obj.obj_to_delta_primitive(), expected)
+
     def test_object_property(self):
         obj = MyObj()
         obj.foo = 1
@@ -373,6 +396,24 @@ class _TestObject(object):
         obj2.obj_reset_changes()
         self.assertEqual(obj2.obj_what_changed(), set())
 
+    def test_changes_reset_some(self):
+        obj = MyObj()
+        obj.foo = 1
+        obj.bar = 'bar'
+        obj.obj_reset_changes(['foo', 'does_not_exist'])
+        self.assertEqual(obj.obj_what_changed(), set(['bar']))
+
+    def test_copy(self):
+        obj = MyObj()
+        obj.foo = 1
+        obj.obj_reset_changes()
+        obj.bar = 'bar'
+        obj2 = copy.deepcopy(obj)
+        self.assertEqual(obj2.foo, 1)
+        self.assertEqual(obj2.bar, 'bar')
+        self.assertFalse(obj2.obj_attr_is_set('missing'))
+        self.assertEqual(obj2.obj_what_changed(), set(['bar']))
+
     def test_unknown_objtype(self):
         self.assertRaises(exception.UnsupportedObjectError,
                           base.NovaObject.obj_class_from_name, 'foo', '1.0')
@@ -541,6 +582,36 @@ class TestRemoteObject(_RemoteTest, _TestObject):
         self.assertEqual(obj.bar, 'bar')
         self.assertRemotes()
 
+    def test_delta_method_sends_delta(self):
+        ctxt = context.get_admin_context()
+        obj = MyObj.query(ctxt)
+        obj.missing = 'changed'
+        obj.save(ctxt)
+        objinst = self.remote_object_calls[-1][0]
+        self.assertEqual(objinst.foo, 1)
+        self.assertEqual(objinst.missing, 'changed')
+        self.assertFalse(objinst.obj_attr_is_set('bar'))
+        self.assertEqual(obj.bar, 'bar')
+        self.assertEqual(obj.obj_what_changed(), set())
+
+    def test_other_method_sends_full_object(self):
+        ctxt = context.get_admin_context()
+        obj = MyObj.query(ctxt)
+        obj.update_test(ctxt)
+        objinst = self.remote_object_calls[-1][0]
+        self.assertTrue(objinst.obj_attr_is_set('bar'))
+
+    def test_delta_method_sends_full_object_to_old_conductor(self):
+        self.flags(conductor='1.56', group='upgrade_levels')
+        base.NovaObject.indirection_api = conductor_rpcapi.ConductorAPI()
+        ctxt = context.get_admin_context()
+        obj = MyObj.query(ctxt)
+        obj.missing = 'changed'
+        obj.save(ctxt)
+        objinst = self.remote_object_calls[-1][0]
+        self.assertTrue(objinst.obj_attr_is_set('bar'))
+        self.assertEqual(obj.obj_what_changed(), set())
+
 
 class TestObjectListBase(test.TestCase):
     def test_list_like_operations(self):
@@ -578,6 +649,23 @@ class TestObjectListBase(test.TestCase):
         self.assertEqual([x.foo for x in obj],
                          [y.foo for y in obj2])
 
+    def test_obj_has_changes(self):
+        class Foo(base.ObjectListBase, base.NovaObject):
+            pass
+
+        class Bar(base.NovaObject):
+            fields = {'foo': str}
+
+        obj = Foo()
+        obj.objects = [Bar(), Bar()]
+        obj.obj_reset_changes()
+        self.assertFalse(base.obj_has_changes(obj))
+        obj.objects[1].foo = 'changed'
+        self.assertTrue(base.obj_has_changes(obj))
+        self.assertTrue(base.obj_has_changes(obj.objects[1]))
+        self.assertFalse(base.obj_has_changes(obj.objects[0]))
+        self.assertFalse(base.obj_has_changes('foo'))
+
 
 class TestObjectSerializer(test.TestCase):
     def test_serialize_entity_primitive(self):
@@ -25,20 +25,23 @@ from nova.conductor import api as conductor_api
 from nova import context
 from nova import db
 from nova import exception
+from nova.openstack.common.notifier import api as notifier
 from nova.scheduler import driver
 from nova.scheduler import filter_scheduler
 from nova.scheduler import host_manager
 from nova.scheduler import utils as scheduler_utils
 from nova.scheduler import weights
+from nova import test
 from nova.tests.scheduler import fakes
 from nova.tests.scheduler import test_scheduler
 
 
-def fake_get_filtered_hosts(hosts, filter_properties, index):
+def fake_get_filtered_hosts(hosts, filter_properties, index, timings=None):
     return list(hosts)
 
 
-def fake_get_group_filtered_hosts(hosts, filter_properties, index):
+def fake_get_group_filtered_hosts(hosts, filter_properties, index,
+                                  timings=None):
     group_hosts = filter_properties.get('group_hosts') or []
     if group_hosts:
         hosts = list(hosts)
@@ -195,6 +198,163 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
         for weighed_host in weighed_hosts:
             self.assertTrue(weighed_host.obj is not None)
 
+    def _schedule_hosts(self, num_instances):
+        sched = fakes.FakeFilterScheduler()
+        fake_context = context.RequestContext('user', 'project',
+                is_admin=True)
+        instance_properties = {'project_id': 1,
+                               'root_gb': 128,
+                               'memory_mb': 512,
+                               'ephemeral_gb': 0,
+                               'vcpus': 1,
+                               'os_type': 'Linux'}
+        request_spec = {'num_instances': num_instances,
+                        'instance_type': instance_properties,
+                        'instance_properties': instance_properties}
+        weighed_hosts = sched._schedule(fake_context, request_spec, {})
+        return [(weighed_host.obj.host, weighed_host.weight)
+                for weighed_host in weighed_hosts]
+
+    def test_schedule_batch_matches_serial_placement(self):
+        self.flags(scheduler_default_filters=['RamFilter', 'DiskFilter'],
+                   ram_allocation_ratio=1.0)
+        self.mox.StubOutWithMock(db, 'compute_node_get_all')
+        db.compute_node_get_all(mox.IgnoreArg()).AndReturn(
+                fakes.COMPUTE_NODES)
+        db.compute_node_get_all(mox.IgnoreArg()).AndReturn(
+                fakes.COMPUTE_NODES)
+        self.mox.ReplayAll()
+
+        serial_hosts = self._schedule_hosts(30)
+        self.flags(scheduler_batch_placement=True)
+        batch_hosts = self._schedule_hosts(30)
+
+        # host1 and host3 run out of RAM, so not every instance fits
+        self.assertEqual(25, len(serial_hosts))
+        self.assertEqual(serial_hosts, batch_hosts)
+
+    def test_schedule_batch_only_refilters_chosen_host(self):
+        self.flags(scheduler_batch_placement=True)
+        sched = fakes.FakeFilterScheduler()
+        fake_context = context.RequestContext('user', 'project',
+                is_admin=True)
+        filtered = []
+
+        def _fake_get_filtered_hosts(hosts, filter_properties, index,
+                                     timings=None):
+            hosts = list(hosts)
+            filtered.append(len(hosts))
+            return hosts
+
+        self.stubs.Set(sched.host_manager, 'get_filtered_hosts',
+                _fake_get_filtered_hosts)
+        fakes.mox_host_manager_db_calls(self.mox, fake_context)
+
+        instance_properties = {'project_id': 1,
+                               'root_gb': 512,
+                               'memory_mb': 512,
+                               'ephemeral_gb': 0,
+                               'vcpus': 1,
+                               'os_type': 'Linux'}
+        request_spec = {'num_instances': 3,
+                        'instance_type': instance_properties,
+                        'instance_properties': instance_properties}
+        self.mox.ReplayAll()
+        weighed_hosts = sched._schedule(fake_context, request_spec, {})
+        self.assertEqual(3, len(weighed_hosts))
+        self.assertEqual([4, 1, 1, 1], filtered)
+
+    def _test_schedule_claim_conflict(self):
+        self.flags(scheduler_claim_resources=True,
+                   scheduler_default_filters=['RamFilter'],
+                   ram_allocation_ratio=1.0)
+        self.mox.StubOutWithMock(db, 'compute_node_get_all')
+        self.mox.StubOutWithMock(db, 'compute_node_reserve')
+        self.mox.StubOutWithMock(db, 'compute_node_get')
+        db.compute_node_get_all(mox.IgnoreArg()).AndReturn(
+                fakes.COMPUTE_NODES)
+        # host4 has the most free RAM, but another scheduler used it up
+        db.compute_node_reserve(mox.IgnoreArg(), 4, 512, 128, 1,
+                {'memory_mb': 8192.0}).AndReturn(False)
+        db.compute_node_get(mox.IgnoreArg(), 4).AndReturn(
+                dict(fakes.COMPUTE_NODES[3], free_ram_mb=0))
+        db.compute_node_reserve(mox.IgnoreArg(), 3, 512, 128, 1,
+                {'memory_mb': 4096.0}).AndReturn(True)
+        db.compute_node_reserve(mox.IgnoreArg(), 3, 512, 128, 1,
+                {'memory_mb': 4096.0}).AndReturn(True)
+        self.mox.ReplayAll()
+
+        hosts = self._schedule_hosts(2)
+        self.assertEqual(['host3', 'host3'], [host for host, w in hosts])
+
+    def test_schedule_claim_conflict(self):
+        self._test_schedule_claim_conflict()
+
+    def test_schedule_batch_claim_conflict(self):
+        self.flags(scheduler_batch_placement=True)
+        self._test_schedule_claim_conflict()
+
+    def test_schedule_claims_disabled(self):
+        self.flags(scheduler_default_filters=['RamFilter'])
+        self.mox.StubOutWithMock(db, 'compute_node_get_all')
+        self.mox.StubOutWithMock(db, 'compute_node_reserve')
+        db.compute_node_get_all(mox.IgnoreArg()).AndReturn(
+                fakes.COMPUTE_NODES)
+        self.mox.ReplayAll()
+
+        hosts = self._schedule_hosts(1)
+        self.assertEqual(1, len(hosts))
+
+    def _test_schedule_timings(self, num_instances, num_selected):
+        self.flags(scheduler_timing_sample_rate=1.0,
+                   scheduler_default_filters=['RamFilter', 'DiskFilter'],
+                   ram_allocation_ratio=1.0)
+        notifications = []
+
+        def _fake_notify(context, publisher_id, event_type, priority,
+                         payload):
+            notifications.append((event_type, payload))
+
+        self.stubs.Set(notifier, 'notify', _fake_notify)
+        self.mox.StubOutWithMock(db, 'compute_node_get_all')
+        db.compute_node_get_all(mox.IgnoreArg()).AndReturn(
+                fakes.COMPUTE_NODES)
+        self.mox.ReplayAll()
+
+        hosts = self._schedule_hosts(num_instances)
+        self.assertEqual(num_selected, len(hosts))
+        self.assertEqual(1, len(notifications))
+        event_type, payload = notifications[0]
+        self.assertEqual('scheduler.select.timings', event_type)
+        self.assertEqual(num_instances, payload['num_instances'])
+        self.assertEqual(num_selected, payload['num_selected'])
+        self.assertEqual('RamFilter', payload['filters'][0]['name'])
+        self.assertEqual(4, payload['filters'][0]['objects_in'])
+        self.assertEqual('RAMWeigher', payload['weighers'][0]['name'])
+        return payload
+
+    def test_schedule_timings(self):
+        payload = self._test_schedule_timings(2, 2)
+        # Both filters run once per instance
+        self.assertEqual(4, len(payload['filters']))
+        self.assertEqual(2, len(payload['weighers']))
+
+    def test_schedule_timings_no_valid_host(self):
+        # host1 and host3 run out of RAM
+        payload = self._test_schedule_timings(30, 25)
+        self.assertEqual(0, payload['filters'][-1]['objects_out'])
+
+    def test_schedule_timings_disabled(self):
+        self.flags(scheduler_default_filters=['RamFilter'])
+        self.mox.StubOutWithMock(notifier, 'notify')
+        self.mox.StubOutWithMock(db, 'compute_node_get_all')
+        db.compute_node_get_all(mox.IgnoreArg()).AndReturn(
+                fakes.COMPUTE_NODES)
+        self.mox.ReplayAll()
+
+        hosts = self._schedule_hosts(1)
+        self.assertEqual(1, len(hosts))
+
     def test_max_attempts(self):
         self.flags(scheduler_max_attempts=4)
 
@@ -590,6 +750,57 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
                 self.driver.select_destinations, self.context,
                 {'num_instances': 1}, {})
 
+    def _claimed_host(self, host, compute_node_id):
+        host_state = host_manager.HostState(host, host)
+        host_state.compute_node_id = compute_node_id
+        return weights.WeighedHost(host_state, 1.0)
+
+    def test_select_destinations_releases_partial_claims(self):
+        self.flags(scheduler_claim_resources=True)
+        instance_properties = {'root_gb': 128, 'ephemeral_gb': 0,
+                               'memory_mb': 512, 'vcpus': 1}
+        request_spec = {'num_instances': 3,
+                        'instance_properties': instance_properties}
+
+        self.mox.StubOutWithMock(self.driver, '_schedule')
+        self.mox.StubOutWithMock(db, 'compute_node_release')
+        self.driver._schedule(self.context, request_spec, {},
+                              None).AndReturn(
+                [self._claimed_host('host1', 1),
+                 self._claimed_host('host2', 2)])
+        db.compute_node_release(mox.IgnoreArg(), 1, 512, 128, 1)
+        db.compute_node_release(mox.IgnoreArg(), 2, 512, 128, 1)
+        self.mox.ReplayAll()
+
+        self.assertRaises(exception.NoValidHost,
+                self.driver.select_destinations, self.context,
+                request_spec, {})
+
+    def test_run_instance_releases_claim_when_cast_fails(self):
+        self.flags(scheduler_claim_resources=True)
+        instance_properties = {'root_gb': 128, 'ephemeral_gb': 0,
+                               'memory_mb': 512, 'vcpus': 1}
+        request_spec = {'instance_uuids': ['fake-uuid1'],
+                        'instance_properties': instance_properties}
+        weighed_host = self._claimed_host('host1', 1)
+
+        self.mox.StubOutWithMock(self.driver, '_schedule')
+        self.mox.StubOutWithMock(self.driver, '_provision_resource')
+        self.mox.StubOutWithMock(db, 'compute_node_release')
+        self.mox.StubOutWithMock(driver, 'handle_schedule_error')
+        self.driver._schedule(self.context, request_spec, {},
+                              ['fake-uuid1']).AndReturn([weighed_host])
+        self.driver._provision_resource(self.context, weighed_host,
+                request_spec, {}, None, None, None, None,
+                instance_uuid='fake-uuid1').AndRaise(test.TestingException)
+        db.compute_node_release(mox.IgnoreArg(), 1, 512, 128, 1)
+        driver.handle_schedule_error(self.context,
+                mox.IsA(test.TestingException), 'fake-uuid1', request_spec)
+        self.mox.ReplayAll()
+
+        self.driver.schedule_run_instance(self.context, request_spec,
+                None, None, None, None, {})
+
     def test_handles_deleted_instance(self):
         """Test instance deletion while being scheduled."""
 
@@ -204,3 +204,31 @@ class FiltersTestCase(test.TestCase):
                                                      filter_objs_initial,
                                                      filter_properties)
         self.assertEqual(None, result)
+
+    def test_get_filtered_objects_with_timings(self):
+        filter_properties = 'fake_filter_properties'
+
+        def _fake_base_loader_init(*args, **kwargs):
+            pass
+
+        def _fake_filter_one(_self, obj, filter_properties):
+            return obj != 'obj2'
+
+        self.stubs.Set(loadables.BaseLoader, '__init__',
+                       _fake_base_loader_init)
+        self.stubs.Set(Filter1, '_filter_one', _fake_filter_one)
+
+        filter_handler = filters.BaseFilterHandler(filters.BaseFilter)
+        timings = []
+        result = filter_handler.get_filtered_objects([Filter1, Filter2],
+                                                     ['obj1', 'obj2', 'obj3'],
+                                                     filter_properties,
+                                                     timings=timings)
+        self.assertEqual(['obj1', 'obj3'], result)
+        self.assertEqual(['Filter1', 'Filter2'],
+                         [timing['name'] for timing in timings])
+        self.assertEqual([3, 2], [timing['objects_in'] for timing in timings])
+        self.assertEqual([2, 2],
+                         [timing['objects_out'] for timing in timings])
+        for timing in timings:
+            self.assertTrue(timing['seconds'] >= 0)
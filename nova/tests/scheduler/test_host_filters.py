@@ -536,6 +536,18 @@ class HostFiltersTestCase(test.NoDBTestCase):
         self.assertTrue(filt_cls.host_passes(host, filter_properties))
         self.assertEqual(2048 * 2.0, host.limits['memory_mb'])
 
+    def test_ram_filter_filter_all(self):
+        filt_cls = self.class_map['RamFilter']()
+        self.flags(ram_allocation_ratio=2.0)
+        filter_properties = {'instance_type': {'memory_mb': 1024}}
+        host1 = fakes.FakeHostState('host1', 'node1',
+                {'free_ram_mb': -1024, 'total_usable_ram_mb': 2048})
+        host2 = fakes.FakeHostState('host2', 'node2',
+                {'free_ram_mb': -1025, 'total_usable_ram_mb': 2048})
+        self.assertEqual([host1], filt_cls.filter_all([host1, host2],
+                                                      filter_properties))
+        self.assertEqual(2048 * 2.0, host1.limits['memory_mb'])
+
     def test_aggregate_ram_filter_value_error(self):
         self._stub_service_is_up(True)
         filt_cls = self.class_map['AggregateRamFilter']()
@@ -649,6 +661,19 @@ class HostFiltersTestCase(test.NoDBTestCase):
                  'capabilities': capabilities, 'service': service})
         self.assertFalse(filt_cls.host_passes(host, filter_properties))
 
+    def test_disk_filter_filter_all(self):
+        filt_cls = self.class_map['DiskFilter']()
+        self.flags(disk_allocation_ratio=10.0)
+        filter_properties = {'instance_type': {'root_gb': 100,
+                                               'ephemeral_gb': 19}}
+        host1 = fakes.FakeHostState('host1', 'node1',
+                {'free_disk_mb': 11 * 1024, 'total_usable_disk_gb': 12})
+        host2 = fakes.FakeHostState('host2', 'node2',
+                {'free_disk_mb': 10 * 1024, 'total_usable_disk_gb': 12})
+        self.assertEqual([host1], filt_cls.filter_all([host1, host2],
+                                                      filter_properties))
+        self.assertEqual(12 * 10.0, host1.limits['disk_gb'])
+
     def test_compute_filter_fails_on_service_disabled(self):
         self._stub_service_is_up(True)
         filt_cls = self.class_map['ComputeFilter']()
@@ -1390,6 +1415,26 @@ class HostFiltersTestCase(test.NoDBTestCase):
                 {'vcpus_total': 4, 'vcpus_used': 8})
         self.assertFalse(filt_cls.host_passes(host, filter_properties))
 
+    def test_core_filter_filter_all(self):
+        filt_cls = self.class_map['CoreFilter']()
+        filter_properties = {'instance_type': {'vcpus': 1}}
+        self.flags(cpu_allocation_ratio=2)
+        host1 = fakes.FakeHostState('host1', 'node1',
+                {'vcpus_total': 4, 'vcpus_used': 7})
+        host2 = fakes.FakeHostState('host2', 'node2',
+                {'vcpus_total': 4, 'vcpus_used': 8})
+        host3 = fakes.FakeHostState('host3', 'node3', {})
+        self.assertEqual([host1, host3],
+                         filt_cls.filter_all([host1, host2, host3],
+                                             filter_properties))
+        self.assertEqual(8, host1.limits['vcpu'])
+
+    def test_core_filter_filter_all_no_instance_type(self):
+        filt_cls = self.class_map['CoreFilter']()
+        host = fakes.FakeHostState('host1', 'node1',
+                {'vcpus_total': 4, 'vcpus_used': 8})
+        self.assertEqual([host], list(filt_cls.filter_all([host], {})))
+
     def test_aggregate_core_filter_value_error(self):
         filt_cls = self.class_map['AggregateCoreFilter']()
         filter_properties = {'context': self.context,
@@ -1464,6 +1509,34 @@ class HostFiltersTestCase(test.NoDBTestCase):
                                    {'service': service})
         self.assertFalse(filt_cls.host_passes(host, request))
 
+    def test_availability_zone_filter_cached_metadata(self):
+        filt_cls = self.class_map['AvailabilityZoneFilter']()
+        self.mox.StubOutWithMock(db, 'aggregate_metadata_get_by_host')
+        self.mox.ReplayAll()
+        host = fakes.FakeHostState('host1', 'node1', {})
+        host.aggregate_metadata = {'availability_zone': set(['az1']),
+                                   'opt1': set(['1'])}
+        self.assertTrue(filt_cls.host_passes(host,
+                                             self._make_zone_request('az1')))
+        self.assertFalse(filt_cls.host_passes(host,
+                                              self._make_zone_request('az2')))
+        host.aggregate_metadata = {}
+        self.assertTrue(filt_cls.host_passes(host,
+                                             self._make_zone_request('nova')))
+
+    def test_aggregate_metadata_get_by_host_with_key(self):
+        host = fakes.FakeHostState('host1', 'node1', {})
+        host.aggregate_metadata = {'availability_zone': set(['az1']),
+                                   'opt1': set(['1'])}
+        self.assertEqual({'opt1': set(['1'])},
+                         filters.aggregate_metadata_get_by_host(host, {},
+                                                                key='opt1'))
+        self.assertEqual({},
+                         filters.aggregate_metadata_get_by_host(host, {},
+                                                                key='opt2'))
+        self.assertEqual(host.aggregate_metadata,
+                         filters.aggregate_metadata_get_by_host(host, {}))
+
     def test_retry_filter_disabled(self):
         # Test case where retry/re-scheduling is disabled.
         filt_cls = self.class_map['RetryFilter']()
@@ -1507,6 +1580,13 @@ class HostFiltersTestCase(test.NoDBTestCase):
         filter_properties = {}
         self.assertFalse(filt_cls.host_passes(host, filter_properties))
 
+    def test_filter_num_iops_filter_all(self):
+        self.flags(max_io_ops_per_host=8)
+        filt_cls = self.class_map['IoOpsFilter']()
+        host1 = fakes.FakeHostState('host1', 'node1', {'num_io_ops': 7})
+        host2 = fakes.FakeHostState('host2', 'node2', {'num_io_ops': 8})
+        self.assertEqual([host1], filt_cls.filter_all([host1, host2], {}))
+
     def test_filter_num_instances_passes(self):
         self.flags(max_instances_per_host=5)
         filt_cls = self.class_map['NumInstancesFilter']()
@@ -1523,6 +1603,13 @@ class HostFiltersTestCase(test.NoDBTestCase):
         filter_properties = {}
         self.assertFalse(filt_cls.host_passes(host, filter_properties))
 
+    def test_filter_num_instances_filter_all(self):
+        self.flags(max_instances_per_host=5)
+        filt_cls = self.class_map['NumInstancesFilter']()
+        host1 = fakes.FakeHostState('host1', 'node1', {'num_instances': 4})
+        host2 = fakes.FakeHostState('host2', 'node2', {'num_instances': 5})
+        self.assertEqual([host1], filt_cls.filter_all([host1, host2], {}))
+
     def test_group_anti_affinity_filter_passes(self):
         filt_cls = self.class_map['GroupAntiAffinityFilter']()
         host = fakes.FakeHostState('host1', 'node1', {})
@@ -265,6 +265,23 @@ class HostManagerTestCase(test.NoDBTestCase):
                 fake_properties)
         self._verify_result(info, result, False)
 
+    def test_record_timings(self):
+        self.host_manager.record_timings([
+                {'name': 'RamFilter', 'seconds': 0.5,
+                 'objects_in': 10, 'objects_out': 4},
+                {'name': 'RamFilter', 'seconds': 0.25,
+                 'objects_in': 4, 'objects_out': 4}])
+        self.host_manager.record_timings([
+                {'name': 'RAMWeigher', 'seconds': 0.125, 'objects': 4}])
+        expected = {'RamFilter': dict(calls=2, seconds=0.75, hosts=14,
+                                      eliminated=6),
+                    'RAMWeigher': dict(calls=1, seconds=0.125, hosts=4,
+                                       eliminated=0)}
+        self.assertEqual(expected, self.host_manager.timing_stats)
+
+        self.host_manager.log_timing_stats()
+        self.assertEqual({}, self.host_manager.timing_stats)
+
     def test_update_service_capabilities(self):
         service_states = self.host_manager.service_states
         self.assertEqual(len(service_states.keys()), 0)
@@ -416,6 +433,178 @@ class HostManagerChangedNodesTestCase(test.NoDBTestCase):
         self.assertEqual(len(host_states_map), 0)
 
 
+class HostManagerHostStateCacheTestCase(test.NoDBTestCase):
+    """Test case for the incremental host state cache of HostManager."""
+
+    def setUp(self):
+        super(HostManagerHostStateCacheTestCase, self).setUp()
+        self.flags(scheduler_use_host_state_cache=True,
+                   scheduler_host_state_cache_max_age=60)
+        self.host_manager = host_manager.HostManager()
+        self.services = [dict(id=i, host='host%s' % i, disabled=False)
+                         for i in xrange(1, 4)]
+        self.compute_nodes = [
+            dict(id=i, local_gb=1024, memory_mb=1024, vcpus=1,
+                 disk_available_least=512, free_ram_mb=512, vcpus_used=1,
+                 local_gb_used=0, updated_at=None, deleted=0,
+                 service=self.services[i - 1],
+                 hypervisor_hostname='node%s' % i, host_ip='127.0.0.1')
+            for i in xrange(1, 4)]
+        self.start = timeutils.utcnow()
+        timeutils.set_time_override(self.start)
+        self.addCleanup(timeutils.clear_time_override)
+        self.mox.StubOutWithMock(db, 'compute_node_get_all')
+        self.mox.StubOutWithMock(db, 'compute_node_get_all_changed_since')
+        self.mox.StubOutWithMock(db, 'service_get_all')
+
+    def test_refresh_only_changed_nodes(self):
+        context = 'fake_context'
+        changed = dict(self.compute_nodes[0], free_ram_mb=256,
+                       updated_at=self.start)
+
+        db.compute_node_get_all(context).AndReturn(self.compute_nodes)
+        db.service_get_all(context).AndReturn(self.services)
+        db.compute_node_get_all_changed_since(
+                context, self.start).AndReturn([changed])
+        self.mox.ReplayAll()
+
+        self.host_manager.get_all_host_states(context)
+        self.host_manager.get_all_host_states(context)
+        host_states_map = self.host_manager.host_state_map
+        self.assertEqual(3, len(host_states_map))
+        self.assertEqual(256, host_states_map[('host1', 'node1')].free_ram_mb)
+        self.assertEqual(512, host_states_map[('host2', 'node2')].free_ram_mb)
+
+        stats = self.host_manager.cache_stats
+        self.assertEqual(1, stats['full_refreshes'])
+        self.assertEqual(1, stats['incremental_refreshes'])
+        self.assertEqual(4, stats['host_state_refreshes'])
+        self.assertEqual(2, stats['host_state_hits'])
+
+    def test_refresh_updates_services(self):
+        context = 'fake_context'
+        disabled = dict(self.services[1], disabled=True)
+
+        db.compute_node_get_all(context).AndReturn(self.compute_nodes)
+        db.service_get_all(context).AndReturn(
+                [self.services[0], disabled])
+        db.compute_node_get_all_changed_since(
+                context, self.start).AndReturn([])
+        self.mox.ReplayAll()
+
+        self.host_manager.get_all_host_states(context)
+        self.host_manager.get_all_host_states(context)
+        host_states_map = self.host_manager.host_state_map
+        # host3's service went away
+        self.assertEqual(2, len(host_states_map))
+        self.assertTrue(
+                host_states_map[('host2', 'node2')].service['disabled'])
+
+    def test_refresh_removes_deleted_nodes(self):
+        context = 'fake_context'
+        deleted = dict(self.compute_nodes[2], deleted=3)
+
+        db.compute_node_get_all(context).AndReturn(self.compute_nodes)
+        db.service_get_all(context).AndReturn(self.services)
+        db.compute_node_get_all_changed_since(
+                context, self.start).AndReturn([deleted])
+        self.mox.ReplayAll()
+
+        self.host_manager.get_all_host_states(context)
+        self.host_manager.get_all_host_states(context)
+        self.assertNotIn(('host3', 'node3'),
+                         self.host_manager.host_state_map)
+        self.assertEqual(2, len(self.host_manager.host_state_map))
+
+    def test_full_refresh_when_cache_too_old(self):
+        context = 'fake_context'
+
+        db.compute_node_get_all(context).AndReturn(self.compute_nodes)
+        db.compute_node_get_all(context).AndReturn(self.compute_nodes[:2])
+        self.mox.ReplayAll()
+
+        self.host_manager.get_all_host_states(context)
+        timeutils.advance_time_seconds(61)
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual(2, len(self.host_manager.host_state_map))
+        self.assertEqual(2, self.host_manager.cache_stats['full_refreshes'])
+
+    def test_cache_disabled(self):
+        self.flags(scheduler_use_host_state_cache=False)
+        context = 'fake_context'
+
+        db.compute_node_get_all(context).AndReturn(self.compute_nodes)
+        db.compute_node_get_all(context).AndReturn(self.compute_nodes)
+        self.mox.ReplayAll()
+
+        self.host_manager.get_all_host_states(context)
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual(2, self.host_manager.cache_stats['full_refreshes'])
+
+
+class HostManagerAggregateMetadataTestCase(test.NoDBTestCase):
+    """Test case for the aggregate metadata cache of HostManager."""
+
+    def setUp(self):
+        super(HostManagerAggregateMetadataTestCase, self).setUp()
+        self.flags(scheduler_use_aggregate_metadata_cache=True,
+                   scheduler_aggregate_metadata_cache_max_age=10)
+        self.host_manager = host_manager.HostManager()
+        self.start = timeutils.utcnow()
+        timeutils.set_time_override(self.start)
+        self.addCleanup(timeutils.clear_time_override)
+        self.mox.StubOutWithMock(db, 'compute_node_get_all')
+        self.mox.StubOutWithMock(db, 'aggregate_metadata_get_all_by_host')
+
+    def _host_metadata(self):
+        host_states = self.host_manager.host_state_map.values()
+        return dict((host_state.host, host_state.aggregate_metadata)
+                    for host_state in host_states)
+
+    def test_aggregate_metadata_loaded_once(self):
+        context = 'fake_context'
+        metadata = {'host1': {'availability_zone': set(['az1'])}}
+
+        db.compute_node_get_all(context).AndReturn(fakes.COMPUTE_NODES)
+        db.compute_node_get_all(context).AndReturn(fakes.COMPUTE_NODES)
+        db.aggregate_metadata_get_all_by_host(context).AndReturn(metadata)
+        self.mox.ReplayAll()
+
+        self.host_manager.get_all_host_states(context)
+        timeutils.advance_time_seconds(10)
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual({'host1': {'availability_zone': set(['az1'])},
+                          'host2': {}, 'host3': {}, 'host4': {}},
+                         self._host_metadata())
+
+    def test_aggregate_metadata_reloaded_when_too_old(self):
+        context = 'fake_context'
+        metadata = {'host1': {'availability_zone': set(['az1'])}}
+
+        db.compute_node_get_all(context).AndReturn(fakes.COMPUTE_NODES)
+        db.compute_node_get_all(context).AndReturn(fakes.COMPUTE_NODES)
+        db.aggregate_metadata_get_all_by_host(context).AndReturn(metadata)
+        db.aggregate_metadata_get_all_by_host(context).AndReturn({})
+        self.mox.ReplayAll()
+
+        self.host_manager.get_all_host_states(context)
+        timeutils.advance_time_seconds(11)
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual({'host1': {}, 'host2': {}, 'host3': {}, 'host4': {}},
+                         self._host_metadata())
+
+    def test_aggregate_metadata_cache_disabled(self):
+        self.flags(scheduler_use_aggregate_metadata_cache=False)
+        context = 'fake_context'
+
+        db.compute_node_get_all(context).AndReturn(fakes.COMPUTE_NODES)
+        self.mox.ReplayAll()
+
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual({'host1': None, 'host2': None, 'host3': None,
+                          'host4': None}, self._host_metadata())
+
+
 class HostStateTestCase(test.NoDBTestCase):
     """Test case for HostState class."""
 
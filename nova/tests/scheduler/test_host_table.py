@@ -0,0 +1,186 @@
+# Copyright (c) 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Tests For the filters and weighers evaluating host tables.
+"""
+
+from oslo.config import cfg
+import testtools
+
+from nova.scheduler import filters
+from nova.scheduler import host_table
+from nova.scheduler import weights
+from nova import servicegroup
+from nova import test
+from nova.tests.scheduler import fakes
+
+CONF = cfg.CONF
+CONF.import_opt('cpu_allocation_ratio', 'nova.scheduler.filters.core_filter')
+CONF.import_opt('ram_weight_multiplier', 'nova.scheduler.weights.ram')
+
+HOST_ATTRIBUTES = [
+    {'free_ram_mb': 1024, 'total_usable_ram_mb': 2048,
+     'free_disk_mb': 20 * 1024, 'total_usable_disk_gb': 40,
+     'vcpus_total': 4, 'vcpus_used': 2, 'num_instances': 2,
+     'num_io_ops': 1,
+     'service': {'disabled': False}, 'capabilities': {}},
+    {'free_ram_mb': -1024, 'total_usable_ram_mb': 2048,
+     'free_disk_mb': 0, 'total_usable_disk_gb': 10,
+     'vcpus_total': 4, 'vcpus_used': 8, 'num_instances': 50,
+     'num_io_ops': 8,
+     'service': {'disabled': True}, 'capabilities': {}},
+    {'free_ram_mb': 511, 'total_usable_ram_mb': 1024,
+     'free_disk_mb': 10 * 1024, 'total_usable_disk_gb': 10,
+     'vcpus_total': 0, 'vcpus_used': 0, 'num_instances': 49,
+     'num_io_ops': 7,
+     'service': {'disabled': False}, 'capabilities': {'enabled': False}},
+    # A host reporting no resources
+    {'total_usable_ram_mb': 0,
+     'service': {'disabled': False}, 'capabilities': {}},
+]
+
+
+@testtools.skipIf(not host_table.available(), "NumPy is not installed")
+class HostTableTestCase(test.NoDBTestCase):
+    """Test that the host table and the one host at a time evaluations of
+    the filters and weighers give the same results.
+    """
+
+    def setUp(self):
+        super(HostTableTestCase, self).setUp()
+        self.flags(cpu_allocation_ratio=2.0)
+        self.filter_properties = {'instance_type': {'memory_mb': 512,
+                                                    'root_gb': 10,
+                                                    'ephemeral_gb': 0,
+                                                    'vcpus': 1}}
+        self.class_map = {}
+        for cls in filters.all_filters():
+            self.class_map[cls.__name__] = cls
+
+        def fake_service_is_up(_self, service):
+            return service is not self.dead_service
+
+        self.dead_service = None
+        self.stubs.Set(servicegroup.API, 'service_is_up', fake_service_is_up)
+
+    def _host_states(self):
+        return [fakes.FakeHostState('host%d' % i, 'node%d' % i,
+                                    dict(attributes))
+                for i, attributes in enumerate(HOST_ATTRIBUTES)]
+
+    def _filter(self, filter_name, host_states, filter_properties):
+        filt = self.class_map[filter_name]()
+        self.assertTrue(filt.supports_host_table)
+        return [host_state.host for host_state in
+                filt.filter_all(host_states, filter_properties)]
+
+    def _assert_same_filtering(self, filter_name, expected_hosts,
+                               filter_properties=None):
+        if filter_properties is None:
+            filter_properties = self.filter_properties
+        table_host_states = self._host_states()
+        host_states = self._host_states()
+        passed = self._filter(filter_name, table_host_states,
+                              filter_properties)
+
+        self.stubs.Set(host_table, 'numpy', None)
+        self.assertEqual(passed, self._filter(filter_name, host_states,
+                                              filter_properties))
+        self.assertEqual(expected_hosts, passed)
+        self.assertEqual([host_state.limits for host_state in host_states],
+                         [host_state.limits
+                          for host_state in table_host_states])
+
+    def test_ram_filter(self):
+        self._assert_same_filtering('RamFilter', ['host0', 'host2'])
+
+    def test_core_filter(self):
+        self._assert_same_filtering('CoreFilter',
+                                    ['host0', 'host2', 'host3'])
+
+    def test_core_filter_without_instance_type(self):
+        self._assert_same_filtering('CoreFilter',
+                                    ['host0', 'host1', 'host2', 'host3'],
+                                    {})
+
+    def test_disk_filter(self):
+        self._assert_same_filtering('DiskFilter', ['host0', 'host2'])
+
+    def test_num_instances_filter(self):
+        self._assert_same_filtering('NumInstancesFilter',
+                                    ['host0', 'host2', 'host3'])
+
+    def test_io_ops_filter(self):
+        self._assert_same_filtering('IoOpsFilter',
+                                    ['host0', 'host2', 'host3'])
+
+    def test_compute_filter(self):
+        self.dead_service = HOST_ATTRIBUTES[3]['service']
+        self._assert_same_filtering('ComputeFilter', ['host0'])
+
+    def test_ram_weigher(self):
+        self.flags(ram_weight_multiplier=-2.0)
+        weight_handler = weights.HostWeightHandler()
+        weigher_classes = weight_handler.get_matching_classes(
+                ['nova.scheduler.weights.ram.RAMWeigher'])
+        self.assertTrue(weigher_classes[0].supports_host_table)
+
+        weighed_hosts = weight_handler.get_weighed_objects(weigher_classes,
+                self._host_states(), {})
+        self.stubs.Set(host_table, 'numpy', None)
+        expected = weight_handler.get_weighed_objects(weigher_classes,
+                self._host_states(), {})
+        self.assertEqual([(host.obj.host, host.weight) for host in expected],
+                         [(host.obj.host, host.weight)
+                          for host in weighed_hosts])
+
+    def test_select_keeps_columns(self):
+        table = host_table.HostTable(self._host_states())
+        table.column('free_ram_mb')
+        hosts = table.select(table.column('num_instances') < 50)
+        self.assertEqual(['host0', 'host2', 'host3'],
+                         [host_state.host for host_state in hosts])
+        self.assertIs(hosts.host_table, host_table.get_table(hosts))
+        self.assertEqual(['free_ram_mb', 'num_instances'],
+                         sorted(hosts.host_table._columns))
+        self.assertEqual([1024.0, 511.0, 0.0],
+                         hosts.host_table.column('free_ram_mb').tolist())
+
+    def test_filters_and_weighers_share_columns(self):
+        self.flags(ram_weight_multiplier=1.0)
+        host_states = self._host_states()
+        filter_handler = filters.HostFilterHandler()
+        hosts = filter_handler.get_filtered_objects(
+                [self.class_map['RamFilter'], self.class_map['DiskFilter']],
+                host_table.HostTable(host_states).host_list(),
+                self.filter_properties)
+        self.assertEqual(['host0', 'host2'],
+                         [host_state.host for host_state in hosts])
+        self.assertEqual(['free_disk_mb', 'free_ram_mb',
+                          'total_usable_disk_gb', 'total_usable_ram_mb'],
+                         sorted(hosts.host_table._columns))
+
+        # The weigher is given the free RAM the filters read, not the
+        # values of the host states.
+        for host_state in host_states:
+            host_state.free_ram_mb = 0
+        weight_handler = weights.HostWeightHandler()
+        weigher_classes = weight_handler.get_matching_classes(
+                ['nova.scheduler.weights.ram.RAMWeigher'])
+        weighed_hosts = weight_handler.get_weighed_objects(weigher_classes,
+                hosts, {})
+        self.assertEqual([('host0', 1024.0), ('host2', 511.0)],
+                         [(host.obj.host, host.weight)
+                          for host in weighed_hosts])
@@ -101,3 +101,13 @@ class RamWeigherTestCase(test.NoDBTestCase):
         weighed_host = self._get_weighed_host(hostinfo_list)
         self.assertEqual(weighed_host.weight, 8192 * 2)
         self.assertEqual(weighed_host.obj.host, 'host4')
+
+    def test_weigher_timings(self):
+        hostinfo_list = list(self._get_all_hosts())
+        timings = []
+        self.weight_handler.get_weighed_objects(self.weight_classes,
+                hostinfo_list, {}, timings=timings)
+        self.assertEqual(1, len(timings))
+        self.assertEqual('RAMWeigher', timings[0]['name'])
+        self.assertEqual(4, timings[0]['objects'])
+        self.assertTrue(timings[0]['seconds'] >= 0)
@@ -0,0 +1,149 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the in process memcache client."""
+
+from nova import cache_utils
+from nova.openstack.common import timeutils
+from nova import test
+
+
+class CacheUtilsTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(CacheUtilsTestCase, self).setUp()
+        timeutils.set_time_override()
+        self.addCleanup(timeutils.clear_time_override)
+
+    def _stats(self, client):
+        return client.get_stats()[0][1]
+
+    def test_get_client(self):
+        self.flags(memcached_servers=None)
+        self.assertTrue(isinstance(cache_utils.get_client(),
+                                   cache_utils.Client))
+
+    def test_set_get_delete(self):
+        client = cache_utils.Client()
+        self.assertTrue(client.set('a', 1))
+        self.assertEqual(1, client.get('a'))
+        client.delete('a')
+        self.assertEqual(None, client.get('a'))
+        client.delete('a')
+
+    def test_lru_eviction(self):
+        client = cache_utils.Client(max_items=2)
+        client.set('a', 1)
+        client.set('b', 2)
+        # 'a' is now the most recently used item
+        client.get('a')
+        client.set('c', 3)
+        self.assertEqual(None, client.get('b'))
+        self.assertEqual(1, client.get('a'))
+        self.assertEqual(3, client.get('c'))
+
+        # setting an existing key makes it the most recently used item
+        client.set('a', 4)
+        client.set('d', 5)
+        self.assertEqual(None, client.get('c'))
+        self.assertEqual(4, client.get('a'))
+        self.assertEqual(2, self._stats(client)['evictions'])
+        self.assertEqual(2, self._stats(client)['curr_items'])
+
+    def test_max_items_option(self):
+        self.flags(memory_cache_max_items=1)
+        client = cache_utils.Client()
+        client.set('a', 1)
+        client.set('b', 2)
+        self.assertEqual(None, client.get('a'))
+        self.assertEqual(2, client.get('b'))
+
+    def test_unlimited_by_default(self):
+        client = cache_utils.Client()
+        for i in xrange(100):
+            client.set(str(i), i)
+        self.assertEqual(100, self._stats(client)['curr_items'])
+        self.assertEqual(0, self._stats(client)['evictions'])
+
+    def test_expiry(self):
+        client = cache_utils.Client()
+        client.set('a', 1, time=10)
+        client.set('b', 2, time=20)
+        client.set('c', 3)
+        timeutils.advance_time_seconds(10)
+        self.assertEqual(None, client.get('a'))
+        self.assertEqual(2, client.get('b'))
+        timeutils.advance_time_seconds(10)
+        self.assertEqual(None, client.get('b'))
+        self.assertEqual(3, client.get('c'))
+        self.assertEqual(1, self._stats(client)['curr_items'])
+        self.assertEqual([], client._timeouts)
+
+    def test_expiry_of_reset_item(self):
+        client = cache_utils.Client()
+        client.set('a', 1, time=10)
+        client.set('a', 2, time=20)
+        timeutils.advance_time_seconds(10)
+        self.assertEqual(2, client.get('a'))
+        timeutils.advance_time_seconds(10)
+        self.assertEqual(None, client.get('a'))
+
+        client.set('b', 1, time=10)
+        client.set('b', 2)
+        timeutils.advance_time_seconds(10)
+        self.assertEqual(2, client.get('b'))
+
+    def test_stale_timeouts_are_dropped(self):
+        client = cache_utils.Client()
+        for i in xrange(1000):
+            client.set('a', i, time=3600)
+            client.set(str(i), i, time=3600)
+            client.delete(str(i))
+        self.assertTrue(len(client._timeouts) <= 2 * 1 + 16)
+        self.assertEqual(999, client.get('a'))
+        timeutils.advance_time_seconds(3600)
+        self.assertEqual(None, client.get('a'))
+
+    def test_add(self):
+        client = cache_utils.Client()
+        self.assertTrue(client.add('a', 1))
+        self.assertFalse(client.add('a', 2))
+        self.assertEqual(1, client.get('a'))
+
+        client.set('b', 1, time=10)
+        timeutils.advance_time_seconds(10)
+        self.assertTrue(client.add('b', 2))
+        self.assertEqual(2, client.get('b'))
+
+    def test_incr(self):
+        client = cache_utils.Client()
+        self.assertEqual(None, client.incr('a'))
+        client.set('a', '1')
+        self.assertEqual(3, client.incr('a', 2))
+        self.assertEqual('3', client.get('a'))
+
+    def test_stats(self):
+        client = cache_utils.Client()
+        client.set('a', 1)
+        client.get('a')
+        client.get('a')
+        client.get('b')
+        # add and incr do not count as gets
+        client.add('a', 2)
+        client.add('c', 3)
+        client.incr('d')
+        self.assertEqual({'curr_items': 2, 'get_hits': 2, 'get_misses': 1,
+                          'evictions': 0}, self._stats(client))
@@ -18,6 +18,7 @@
 """Unit Tests for network code."""
 
 from nova.network import linux_net
+from nova.openstack.common import timeutils
 from nova import test
 
 
@@ -128,6 +129,24 @@ class IptablesManagerTestCase(test.TestCase):
                         '-s 1.2.3.4/5 -j DROP' % self.binary_name
                         not in new_lines)
 
+    def test_unwrapped_rules_removed(self):
+        current_lines = self.sample_filter
+        table = self.manager.ipv4['filter']
+        rules = ['-i virbr0 -p udp -m udp --dport 53 -j ACCEPT',
+                 '-i virbr0 -p tcp -m tcp --dport 53 -j ACCEPT',
+                 '-i virbr0 -p udp -m udp --dport 67 -j ACCEPT']
+        for rule in rules:
+            table.add_rule('INPUT', rule, wrap=False)
+        for rule in rules:
+            table.remove_rule('INPUT', rule, wrap=False)
+
+        new_lines = self.manager._modify_rules(current_lines, table, 'filter')
+        for rule in rules:
+            self.assertFalse('[0:0] -A INPUT %s' % rule in new_lines)
+        self.assertTrue('[0:0] -A INPUT -i virbr0 -p tcp -m tcp --dport 67 '
+                        '-j ACCEPT' in new_lines)
+        self.assertEqual([], table.remove_rules)
+
     def test_remove_rules_regex(self):
         current_lines = self.sample_nat
         table = self.manager.ipv4['nat']
@@ -278,3 +297,94 @@ class IptablesManagerTestCase(test.TestCase):
                                                self.manager.ipv4['filter'],
                                                'filter')
         self.assertEqual(current_lines, new_lines)
+
+
+class IptablesManagerChainsApplyTestCase(test.TestCase):
+
+    binary_name = linux_net.get_binary_name()
+
+    def setUp(self):
+        super(IptablesManagerChainsApplyTestCase, self).setUp()
+        self.flags(iptables_full_apply_interval=600, use_ipv6=False)
+        self.commands = []
+        self.manager = linux_net.IptablesManager(execute=self._fake_execute)
+        self.table = self.manager.ipv4['filter']
+        self.manager.apply()
+        self.commands = []
+
+    def tearDown(self):
+        timeutils.clear_time_override()
+        super(IptablesManagerChainsApplyTestCase, self).tearDown()
+
+    def _fake_execute(self, *cmd, **kwargs):
+        self.commands.append((cmd, kwargs.get('process_input')))
+        return '', ''
+
+    def _wrap(self, chain):
+        return '%s-%s' % (self.binary_name, chain)
+
+    def test_first_apply_is_full(self):
+        manager = linux_net.IptablesManager(execute=self._fake_execute)
+        manager.apply()
+        self.assertEqual([('iptables-save', '-c'), ('iptables-restore', '-c')],
+                         [cmd for cmd, _input in self.commands])
+
+    def test_changed_chains_applied(self):
+        self.table.add_chain('inst-1')
+        self.table.add_rule('inst-1', '-s 10.0.0.1 -j ACCEPT')
+        self.table.add_rule('local', '-d 10.0.0.2 -j $inst-1')
+        self.manager.apply()
+
+        self.assertEqual(1, len(self.commands))
+        cmd, process_input = self.commands[0]
+        self.assertEqual(('iptables-restore', '-c', '--noflush'), cmd)
+        self.assertEqual(['*filter',
+                          ':%s - [0:0]' % self._wrap('inst-1'),
+                          ':%s - [0:0]' % self._wrap('local'),
+                          '[0:0] -A %s -s 10.0.0.1 -j ACCEPT' %
+                          self._wrap('inst-1'),
+                          '[0:0] -A %s -d 10.0.0.2 -j %s' %
+                          (self._wrap('local'), self._wrap('inst-1')),
+                          'COMMIT'],
+                         process_input.split('\n'))
+        self.assertFalse(self.table.dirty)
+        self.assertEqual(set(), self.table.dirty_chains)
+
+    def test_removed_chains_applied(self):
+        self.table.add_chain('inst-1')
+        self.table.add_rule('local', '-d 10.0.0.2 -j $inst-1')
+        self.manager.apply()
+        self.commands = []
+
+        self.table.remove_chain('inst-1')
+        self.manager.apply()
+
+        self.assertEqual(1, len(self.commands))
+        cmd, process_input = self.commands[0]
+        self.assertEqual(['*filter',
+                          ':%s - [0:0]' % self._wrap('local'),
+                          ':%s - [0:0]' % self._wrap('inst-1'),
+                          '-X %s' % self._wrap('inst-1'),
+                          'COMMIT'],
+                         process_input.split('\n'))
+
+    def test_unwrapped_change_applies_all(self):
+        self.table.add_rule('FORWARD', '-s 10.0.0.1 -j DROP', wrap=False)
+        self.manager.apply()
+        self.assertEqual([('iptables-save', '-c'), ('iptables-restore', '-c')],
+                         [cmd for cmd, _input in self.commands])
+
+    def test_interval_applies_all(self):
+        timeutils.set_time_override(timeutils.utcnow())
+        timeutils.advance_time_seconds(600)
+        self.table.add_rule('local', '-s 10.0.0.1 -j DROP')
+        self.manager.apply()
+        self.assertEqual([('iptables-save', '-c'), ('iptables-restore', '-c')],
+                         [cmd for cmd, _input in self.commands])
+
+    def test_disabled_applies_all(self):
+        self.flags(iptables_full_apply_interval=0)
+        self.table.add_rule('local', '-s 10.0.0.1 -j DROP')
+        self.manager.apply()
+        self.assertEqual([('iptables-save', '-c'), ('iptables-restore', '-c')],
+                         [cmd for cmd, _input in self.commands])
@@ -403,3 +403,38 @@ class ServiceCommandsTestCase(test.TestCase):
 
     def test_service_disable_invalid_params(self):
         self.assertEqual(2, self.commands.disable('nohost', 'noservice'))
+
+
+class ImageCommandsTestCase(test.TestCase):
+    def setUp(self):
+        super(ImageCommandsTestCase, self).setUp()
+        self.commands = manage.ImageCommands()
+        ctxt = context.get_admin_context()
+        for host in ('host1', 'host2'):
+            db.service_create(ctxt, {'host': host, 'binary': 'nova-compute',
+                                     'topic': 'compute', 'report_count': 0})
+        self.prefetched = []
+
+        def fake_prefetch_images(_self, ctxt, host, image_ids):
+            self.prefetched.append((host, image_ids))
+
+        self.stubs.Set(manage.compute_rpcapi.ComputeAPI, 'prefetch_images',
+                       fake_prefetch_images)
+
+    def test_prefetch_all_hosts(self):
+        self.commands.prefetch('img1, img2')
+        self.assertEqual([('host1', ['img1', 'img2']),
+                          ('host2', ['img1', 'img2'])], self.prefetched)
+
+    def test_prefetch_some_hosts(self):
+        self.commands.prefetch('img1', host='host2')
+        self.assertEqual([('host2', ['img1'])], self.prefetched)
+
+    def test_prefetch_unknown_host(self):
+        self.assertEqual(2, self.commands.prefetch('img1', host='nohost'))
+        self.assertEqual([], self.prefetched)
+
+    def test_prefetch_without_image_ids(self):
+        self.assertEqual(2, self.commands.prefetch(None))
+        self.assertEqual(2, self.commands.prefetch(' , '))
+        self.assertEqual([], self.prefetched)
@@ -27,6 +27,7 @@ from oslo.config import cfg
 
 from nova.compute import vm_states
 from nova import conductor
+from nova import context
 from nova import db
 from nova.openstack.common import importutils
 from nova.openstack.common import log as logging
@@ -419,6 +420,64 @@ class ImageCacheManagerTestCase(test.TestCase):
             self.assertFalse(os.path.exists(fname))
             self.assertFalse(os.path.exists(info_fname))
 
+    def test_remove_base_file_original_prefetched(self):
+        with self._make_base_file() as fname:
+            imagecache.write_stored_info(fname, field='prefetched',
+                                         value='123')
+            image_cache_manager = imagecache.ImageCacheManager()
+            image_cache_manager.originals = [fname]
+
+            # Prefetched originals outlive unprefetched ones
+            os.utime(fname, (-1, time.time() - 3600 * 25))
+            image_cache_manager._remove_base_file(fname)
+            self.assertTrue(os.path.exists(fname))
+
+            # But are still removed once old enough
+            os.utime(fname, (-1, time.time() - 3600 * 24 * 8))
+            image_cache_manager._remove_base_file(fname)
+            self.assertFalse(os.path.exists(fname))
+
+    def test_remove_base_file_original_info_read_when_needed(self):
+        def fake_read_stored_info(*args, **kwargs):
+            self.fail('Unexpected info file read')
+
+        with self._make_base_file() as fname:
+            image_cache_manager = imagecache.ImageCacheManager()
+            image_cache_manager.originals = [fname]
+            self.stubs.Set(imagecache, 'read_stored_info',
+                           fake_read_stored_info)
+
+            # Neither too young nor too old originals read the info file
+            image_cache_manager._remove_base_file(fname)
+            self.assertTrue(os.path.exists(fname))
+            os.utime(fname, (-1, time.time() - 3600 * 24 * 8))
+            image_cache_manager._remove_base_file(fname)
+            self.assertFalse(os.path.exists(fname))
+
+    def test_prefetch_image(self):
+        fetched = []
+
+        def fake_fetch_image(context, target, image_id, user_id, project_id,
+                             limiter=None):
+            fetched.append((target, image_id, limiter))
+            with open(target, 'w') as f:
+                f.write('data')
+
+        self.stubs.Set(virtutils, 'fetch_image', fake_fetch_image)
+        ctxt = context.RequestContext('fake_user', 'fake_project')
+
+        with utils.tempdir() as tmpdir:
+            self.flags(instances_path=tmpdir)
+            base_file = os.path.join(tmpdir, CONF.base_dir_name,
+                                     hashlib.sha1('123').hexdigest())
+            image_cache_manager = imagecache.ImageCacheManager()
+            image_cache_manager.prefetch_image(ctxt, '123', limiter='lim')
+            image_cache_manager.prefetch_image(ctxt, '123')
+
+            self.assertEqual([(base_file, '123', 'lim')], fetched)
+            self.assertEqual('123', imagecache.read_stored_info(
+                    base_file, field='prefetched'))
+
     def test_remove_base_file_dne(self):
         # This test is solely to execute the "does not exist" code path. We
         # don't expect the method being tested to do anything in this case.
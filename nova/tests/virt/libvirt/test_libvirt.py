@@ -1120,6 +1120,26 @@ class LibvirtConnTestCase(test.TestCase):
         # Only one should be listed, since domain with ID 0 must be skipped
         self.assertEquals(len(instances), 1)
 
+    def test_list_instance_power_states(self):
+        running = FakeVirtDomain(uuidstr='running')
+        stopped = FakeVirtDomain(uuidstr='stopped')
+        stopped.info = lambda: [libvirt_driver.VIR_DOMAIN_SHUTOFF,
+                                None, None, None, None]
+
+        self.mox.StubOutWithMock(libvirt_driver.LibvirtDriver, '_conn')
+        libvirt_driver.LibvirtDriver._conn.lookupByID = lambda _id: running
+        libvirt_driver.LibvirtDriver._conn.lookupByName = lambda _n: stopped
+        libvirt_driver.LibvirtDriver._conn.numOfDomains = lambda: 2
+        libvirt_driver.LibvirtDriver._conn.listDomainsID = lambda: [0, 1]
+        libvirt_driver.LibvirtDriver._conn.listDefinedDomains = lambda: ['s']
+
+        self.mox.ReplayAll()
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        power_states = conn.list_instance_power_states()
+        # The domain with ID 0 must be skipped
+        self.assertEqual({'running': power_state.RUNNING,
+                          'stopped': power_state.SHUTDOWN}, power_states)
+
     def test_list_defined_instances(self):
         self.mox.StubOutWithMock(libvirt_driver.LibvirtDriver, '_conn')
         libvirt_driver.LibvirtDriver._conn.lookupByID = self.fake_lookup
@@ -3612,7 +3632,7 @@ class LibvirtConnTestCase(test.TestCase):
                                  'disk_size': '10737418240',
                                  'over_committed_disk_size': '0'}]}
 
-        def get_info(instance_name):
+        def get_info(instance_name, xml=None):
             return jsonutils.dumps(fake_disks.get(instance_name))
         self.stubs.Set(conn, 'get_instance_disk_info', get_info)
 
@@ -4083,6 +4103,71 @@ class LibvirtConnTestCase(test.TestCase):
 
         self.assertEqual(5, driver.get_vcpu_used())
 
+    def test_prefetch_images(self):
+        self.flags(image_prefetch_concurrency=2, image_prefetch_max_kbps=8)
+        driver = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), True)
+        prefetched = []
+
+        def fake_prefetch_image(context, image_id, limiter=None):
+            prefetched.append(image_id)
+            self.assertEqual(8 * 1024, limiter.bytes_per_second)
+            if image_id == 'bad':
+                raise exception.ImageNotFound(image_id=image_id)
+
+        self.stubs.Set(driver.image_cache_manager, 'prefetch_image',
+                       fake_prefetch_image)
+        driver._prefetch_images(self.context, ['bad', 'good'])
+        self.assertEqual(['bad', 'good'], prefetched)
+
+    def test_get_domain_inventory(self):
+        class InventoryFakeDomain(object):
+            def __init__(self, name, vcpus):
+                self._name = name
+                self._vcpus = vcpus
+
+            def name(self):
+                return self._name
+
+            def info(self):
+                return [power_state.RUNNING, 2048, 1024, self._vcpus, 0]
+
+            def vcpus(self):
+                return ([1] * self._vcpus, [True] * self._vcpus)
+
+            def XMLDesc(self, flags):
+                return '<domain><name>%s</name></domain>' % self._name
+
+        driver = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), True)
+        conn = driver._conn
+        self.mox.StubOutWithMock(driver, 'list_instance_ids')
+        self.mox.StubOutWithMock(driver, '_lookup_by_name')
+        self.mox.StubOutWithMock(driver, 'get_instance_disk_info')
+        conn.lookupByID = self.mox.CreateMockAnything()
+        conn.listDefinedDomains = self.mox.CreateMockAnything()
+
+        driver.list_instance_ids().AndReturn([1, 2])
+        conn.lookupByID(1).AndReturn(InventoryFakeDomain('inst1', 2))
+        conn.lookupByID(2).AndRaise(libvirt.libvirtError('gone'))
+        conn.listDefinedDomains().AndReturn(['inst3'])
+        driver._lookup_by_name('inst3').AndReturn(
+            InventoryFakeDomain('inst3', 4))
+        for name in ('inst1', 'inst3'):
+            driver.get_instance_disk_info(
+                name, xml='<domain><name>%s</name></domain>' % name
+            ).AndReturn(jsonutils.dumps(
+                [{'over_committed_disk_size': '1024'}]))
+        self.mox.StubOutWithMock(libvirt.libvirtError, 'get_error_code')
+        libvirt.libvirtError.get_error_code().AndReturn(
+            libvirt.VIR_ERR_NO_DOMAIN)
+        self.mox.ReplayAll()
+
+        domains = driver.get_domain_inventory()
+        self.assertEqual([1, None], [domain['id'] for domain in domains])
+        self.assertEqual(None, domains[1]['info'])
+        self.assertEqual(2, driver.get_vcpu_used(domains=domains))
+        self.assertEqual(2048, driver.get_disk_over_committed_size_total(
+            domains=domains))
+
     def test_get_instance_capabilities(self):
         conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), True)
 
@@ -4427,13 +4512,16 @@ class HostStateTestCase(test.TestCase):
         def get_vcpu_total(self):
             return 1
 
-        def get_vcpu_used(self):
+        def get_domain_inventory(self):
+            return []
+
+        def get_vcpu_used(self, domains=None):
             return 0
 
         def get_cpu_info(self):
             return HostStateTestCase.cpu_info
 
-        def get_disk_over_committed_size_total(self):
+        def get_disk_over_committed_size_total(self, domains=None):
             return 0
 
         def get_local_gb_info(self):
@@ -4442,7 +4530,7 @@ class HostStateTestCase(test.TestCase):
         def get_memory_mb_total(self):
             return 497
 
-        def get_memory_mb_used(self):
+        def get_memory_mb_used(self, domains=None):
             return 88
 
         def get_hypervisor_type(self):
@@ -4785,6 +4873,80 @@ class IptablesFirewallTestCase(test.TestCase):
         self.fw.instances[instance_ref['id']] = instance_ref
         self.fw.do_refresh_security_group_rules("fake")
 
+    def test_refresh_security_group_rules_coalesced(self):
+        self.flags(firewall_refresh_delay=1)
+        instance_ref = self._create_instance_ref()
+        self.fw.instances[instance_ref['id']] = instance_ref
+        self.fw.network_infos[instance_ref['id']] = []
+
+        spawned = []
+
+        def fake_spawn_after(seconds, func):
+            spawned.append(func)
+            return 'thread'
+
+        self.stubs.Set(greenthread, 'spawn_after', fake_spawn_after)
+        self.mox.StubOutWithMock(self.fw, 'do_refresh_instance_rules')
+        self.mox.StubOutWithMock(self.fw.iptables, 'apply')
+        self.fw.do_refresh_instance_rules(instance_ref)
+        self.fw.iptables.apply()
+        self.mox.ReplayAll()
+
+        self.fw.refresh_security_group_rules('fake')
+        self.fw.refresh_security_group_members('fake')
+        self.fw.refresh_instance_security_rules(instance_ref)
+        self.assertEqual(1, len(spawned))
+
+        spawned[0]()
+        self.assertEqual({'requested': 3,
+                          'coalesced': 2,
+                          'instances_refreshed': 1}, self.fw.refresh_stats)
+        self.assertEqual(None, self.fw.refresh_thread)
+
+    def test_refresh_instance_security_rules_unfiltered(self):
+        instance_ref = self._create_instance_ref()
+        self.mox.StubOutWithMock(self.fw, 'do_refresh_instance_rules')
+        self.mox.ReplayAll()
+        self.fw.refresh_instance_security_rules(instance_ref)
+        self.assertEqual(0, self.fw.refresh_stats['instances_refreshed'])
+
+    def test_instance_rules_caches_security_group_rules(self):
+        admin_ctxt = context.get_admin_context()
+        secgroup = db.security_group_create(admin_ctxt,
+                                            {'user_id': 'fake',
+                                             'project_id': 'fake',
+                                             'name': 'testgroup',
+                                             'description': 'test group'})
+        db.security_group_rule_create(admin_ctxt,
+                                      {'parent_group_id': secgroup['id'],
+                                       'protocol': 'tcp',
+                                       'from_port': 22,
+                                       'to_port': 22,
+                                       'cidr': '192.168.10.0/24'})
+        instances = []
+        for i in range(2):
+            instance_ref = self._create_instance_ref()
+            db.instance_add_security_group(admin_ctxt, instance_ref['uuid'],
+                                           secgroup['id'])
+            instances.append(db.instance_get(admin_ctxt, instance_ref['id']))
+        network_info = _fake_network_info(self.stubs, 1)
+
+        self.mox.StubOutWithMock(self.fw._virtapi,
+                                 'security_group_rule_get_by_security_group')
+        self.fw._virtapi.security_group_rule_get_by_security_group(
+            mox.IgnoreArg(), mox.IgnoreArg()).AndReturn(
+                db.security_group_rule_get_by_security_group(
+                    admin_ctxt, secgroup['id']))
+        self.mox.ReplayAll()
+
+        rules = [self.fw.instance_rules(instance, network_info)
+                 for instance in instances]
+        self.assertEqual(rules[0], rules[1])
+        self.assertTrue(secgroup['id'] in self.fw.security_group_rules)
+
+        self.fw.refresh_security_group_rules(secgroup['id'])
+        self.assertEqual({}, self.fw.security_group_rules)
+
     def test_unfilter_instance_undefines_nwfilter(self):
         admin_ctxt = context.get_admin_context()
 
@@ -5322,7 +5484,8 @@ disk size: 4.4M''', ''))
         image_id = '4'
         user_id = 'fake'
         project_id = 'fake'
-        images.fetch_to_raw(context, image_id, target, user_id, project_id)
+        images.fetch_to_raw(context, image_id, target, user_id, project_id,
+                            limiter=None)
 
         self.mox.ReplayAll()
         libvirt_utils.fetch_image(context, target, image_id,
@@ -5365,7 +5528,7 @@ disk size: 4.4M''', ''))
         self.stubs.Set(utils, 'execute', fake_execute)
         self.stubs.Set(os, 'rename', fake_rename)
         self.stubs.Set(os, 'unlink', fake_unlink)
-        self.stubs.Set(images, 'fetch', lambda *_: None)
+        self.stubs.Set(images, 'fetch', lambda *_, **kw: None)
         self.stubs.Set(images, 'qemu_img_info', fake_qemu_img_info)
         self.stubs.Set(fileutils, 'delete_if_exists', fake_rm_on_errror)
 
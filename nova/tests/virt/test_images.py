@@ -12,8 +12,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import os
 
 from nova import test
+from nova import utils
 from nova.virt import images
 
 
@@ -22,3 +24,113 @@ class QemuTestCase(test.TestCase):
         image_info = images.qemu_img_info("/path/that/does/not/exist")
         self.assertTrue(image_info)
         self.assertTrue(str(image_info))
+
+
+class QemuImgInfoCacheTestCase(test.TestCase):
+    def setUp(self):
+        super(QemuImgInfoCacheTestCase, self).setUp()
+        self.stubs.Set(images, '_qemu_img_info_cache', {})
+        self.stubs.Set(images, '_qemu_img_info_lru',
+                       images.collections.deque())
+        self.executes = []
+
+        def fake_execute(*cmd, **kwargs):
+            self.executes.append(cmd)
+            return 'image: %s\nfile format: raw\n' % cmd[-1], ''
+
+        self.stubs.Set(utils, 'execute', fake_execute)
+
+    def _write_qcow2(self, path, backing_file='', version=2, snapshots=0):
+        header = images.QCOW2_HEADER.pack(
+            images.QCOW2_MAGIC, version,
+            images.QCOW2_HEADER.size if backing_file else 0,
+            len(backing_file), 16, 1024 * 1024 * 1024, 0, 0, 0, 0, 0,
+            snapshots, 0)
+        with open(path, 'wb') as f:
+            f.write(header + backing_file)
+
+    def test_native_qcow2(self):
+        self.flags(qemu_img_info_native_qcow2=True)
+        with utils.tempdir() as tmpdir:
+            path = os.path.join(tmpdir, 'disk')
+            self._write_qcow2(path, backing_file='../base/abc')
+            info = images.qemu_img_info(path)
+            self.assertEqual([], self.executes)
+            self.assertEqual('qcow2', info.file_format)
+            self.assertEqual(1024 * 1024 * 1024, info.virtual_size)
+            self.assertEqual(65536, info.cluster_size)
+            self.assertEqual(os.path.join(tmpdir, '../base/abc'),
+                             info.backing_file)
+
+            self._write_qcow2(path, backing_file='/base/abc', version=3)
+            self.assertEqual('/base/abc',
+                             images.qemu_img_info(path).backing_file)
+            self._write_qcow2(path)
+            self.assertEqual(None, images.qemu_img_info(path).backing_file)
+            self.assertEqual([], self.executes)
+
+    def test_native_qcow2_falls_back(self):
+        self.flags(qemu_img_info_native_qcow2=True)
+        with utils.tempdir() as tmpdir:
+            path = os.path.join(tmpdir, 'disk')
+            self._write_qcow2(path, snapshots=1)
+            images.qemu_img_info(path)
+            self.assertEqual(1, len(self.executes))
+
+            with open(path, 'wb') as f:
+                f.write('\0' * 4096)
+            self.assertEqual('raw', images.qemu_img_info(path).file_format)
+            self.assertEqual(2, len(self.executes))
+
+    def test_cache(self):
+        self.flags(qemu_img_info_cache_size=2)
+        with utils.tempdir() as tmpdir:
+            path1 = os.path.join(tmpdir, 'disk1')
+            path2 = os.path.join(tmpdir, 'disk2')
+            path3 = os.path.join(tmpdir, 'disk3')
+            for path in (path1, path2, path3):
+                with open(path, 'wb') as f:
+                    f.write('\0' * 512)
+
+            info = images.qemu_img_info(path1)
+            self.assertTrue(info is images.qemu_img_info(path1))
+            self.assertEqual(1, len(self.executes))
+
+            # A changed file is looked up again
+            with open(path1, 'ab') as f:
+                f.write('\0' * 512)
+            self.assertFalse(info is images.qemu_img_info(path1))
+            self.assertEqual(2, len(self.executes))
+
+            # The least recently used image is evicted
+            images.qemu_img_info(path2)
+            images.qemu_img_info(path1)
+            self.assertEqual(3, len(self.executes))
+            images.qemu_img_info(path3)
+            self.assertEqual(4, len(self.executes))
+            images.qemu_img_info(path1)
+            self.assertEqual(4, len(self.executes))
+            images.qemu_img_info(path2)
+            self.assertEqual(5, len(self.executes))
+            self.assertEqual([path1, path2], list(images._qemu_img_info_lru))
+            self.assertEqual(set([path1, path2]),
+                             set(images._qemu_img_info_cache))
+
+
+class BandwidthLimiterTestCase(test.TestCase):
+    def test_consume_paces_writes(self):
+        self.now = 100.0
+        sleeps = []
+
+        def fake_sleep(delay):
+            sleeps.append(delay)
+            self.now += delay
+
+        self.stubs.Set(images.time, 'time', lambda: self.now)
+        self.stubs.Set(images.time, 'sleep', fake_sleep)
+
+        limiter = images.BandwidthLimiter(1024)
+        limiter.consume(2048)
+        limiter.consume(1024)
+        limiter.consume(1024)
+        self.assertEqual([2.0, 1.0], sleeps)
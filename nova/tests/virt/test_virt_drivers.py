@@ -21,6 +21,7 @@ import sys
 import traceback
 
 from nova.compute import manager
+from nova.compute import power_state
 from nova import exception
 from nova.openstack.common import importutils
 from nova.openstack.common import log as logging
@@ -224,6 +225,13 @@ class _VirtDriverTestCase(_FakeDriverBackendTestCase):
     def test_list_instance_uuids(self):
         self.connection.list_instance_uuids()
 
+    @catch_notimplementederror
+    def test_list_instance_power_states(self):
+        instance_ref, network_info = self._get_running_instance()
+        power_states = self.connection.list_instance_power_states()
+        self.assertEqual(power_state.RUNNING,
+                         power_states[instance_ref['uuid']])
+
     @catch_notimplementederror
     def test_spawn(self):
         instance_ref, network_info = self._get_running_instance()
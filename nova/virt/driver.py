@@ -214,6 +214,17 @@ class ComputeDriver(object):
         """
         raise NotImplementedError()
 
+    def list_instance_power_states(self):
+        """
+        Return the power states of all the instances known to the
+        virtualization layer, as a dict of power_state codes keyed by
+        instance UUID.
+
+        This lets callers check every instance on the host with a single
+        query rather than one get_info() call per instance.
+        """
+        raise NotImplementedError()
+
     def spawn(self, context, instance, image_meta, injected_files,
               admin_password, network_info=None, block_device_info=None):
         """
@@ -876,6 +887,16 @@ class ComputeDriver(object):
         """
         pass
 
+    def prefetch_images(self, context, image_ids):
+        """
+        Download images into the driver's local image cache.
+
+        This lets the first boot of an image on this host skip the download.
+        The downloads happen in the background, this method does not wait
+        for them to finish.
+        """
+        raise NotImplementedError()
+
     def add_to_aggregate(self, context, aggregate, host, **kwargs):
         """Add a compute host to an aggregate."""
         #NOTE(jogo) Currently only used for XenAPI-Pool
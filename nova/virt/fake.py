@@ -70,9 +70,10 @@ def restore_nodes():
 
 class FakeInstance(object):
 
-    def __init__(self, name, state):
+    def __init__(self, name, state, uuid=None):
         self.name = name
         self.state = state
+        self.uuid = uuid
 
     def __getitem__(self, key):
         return getattr(self, key)
@@ -113,6 +114,9 @@ class FakeDriver(driver.ComputeDriver):
     def list_instances(self):
         return self.instances.keys()
 
+    def list_instance_power_states(self):
+        return dict((i.uuid, i.state) for i in self.instances.values())
+
     def plug_vifs(self, instance, network_info):
         """Plug VIFs into networks."""
         pass
@@ -125,7 +129,7 @@ class FakeDriver(driver.ComputeDriver):
               admin_password, network_info=None, block_device_info=None):
         name = instance['name']
         state = power_state.RUNNING
-        fake_instance = FakeInstance(name, state)
+        fake_instance = FakeInstance(name, state, instance['uuid'])
         self.instances[name] = fake_instance
 
     def live_snapshot(self, context, instance, name, update_task_state):
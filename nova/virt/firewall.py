@@ -17,6 +17,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from eventlet import greenthread
 from oslo.config import cfg
 
 from nova.compute import utils as compute_utils
@@ -37,6 +38,11 @@ firewall_opts = [
     cfg.BoolOpt('allow_same_net_traffic',
                 default=True,
                 help='Whether to allow network traffic from same network'),
+    cfg.FloatOpt('firewall_refresh_delay',
+                 default=0.0,
+                 help='Seconds to collect security group refreshes for '
+                      'before recomputing the rules of all the affected '
+                      'instances at once. 0 refreshes on each request.'),
 ]
 
 CONF = cfg.CONF
@@ -149,6 +155,20 @@ class IptablesFirewallDriver(FirewallDriver):
         self.dhcp_create = False
         self.dhcp_created = False
 
+        # Pending security group refreshes, see _refresh_rules()
+        self.refresh_all_pending = False
+        self.refresh_instances_pending = {}
+        self.refresh_thread = None
+        self.refresh_stats = {'requested': 0,
+                              'coalesced': 0,
+                              'instances_refreshed': 0}
+
+        # Expanded rules of the security groups, shared by the instances
+        # of the host.  Every refresh request clears it, as does
+        # unfiltering an instance since refreshes for a group stop
+        # reaching the host once none of its instances are in it.
+        self.security_group_rules = {}
+
         self.iptables.ipv4['filter'].add_chain('sg-fallback')
         self.iptables.ipv4['filter'].add_rule('sg-fallback', '-j DROP')
         self.iptables.ipv6['filter'].add_chain('sg-fallback')
@@ -171,6 +191,7 @@ class IptablesFirewallDriver(FirewallDriver):
         if self.instances.pop(instance['id'], None):
             # NOTE(vish): use the passed info instead of the stored info
             self.network_infos.pop(instance['id'])
+            self.security_group_rules.clear()
             self.remove_filters_for_instance(instance)
             self.iptables.apply()
         else:
@@ -334,6 +355,66 @@ class IptablesFirewallDriver(FirewallDriver):
                     '--dports', '%s:%s' % (rule['from_port'],
                                            rule['to_port'])]
 
+    def _security_group_rules(self, ctxt, security_group):
+        """Expand the rules of a security group to iptables rules."""
+        ipv4_rules = []
+        ipv6_rules = []
+
+        rules = self._virtapi.security_group_rule_get_by_security_group(
+            ctxt, security_group)
+
+        for rule in rules:
+            LOG.debug(_('Adding security group rule: %r'), rule)
+
+            if not rule['cidr']:
+                version = 4
+            else:
+                version = netutils.get_ip_version(rule['cidr'])
+
+            if version == 4:
+                fw_rules = ipv4_rules
+            else:
+                fw_rules = ipv6_rules
+
+            protocol = rule['protocol']
+
+            if protocol:
+                protocol = rule['protocol'].lower()
+
+            if version == 6 and protocol == 'icmp':
+                protocol = 'icmpv6'
+
+            args = ['-j ACCEPT']
+            if protocol:
+                args += ['-p', protocol]
+
+            if protocol in ['udp', 'tcp']:
+                args += self._build_tcp_udp_rule(rule, version)
+            elif protocol == 'icmp':
+                args += self._build_icmp_rule(rule, version)
+            if rule['cidr']:
+                LOG.debug('Using cidr %r', rule['cidr'])
+                args += ['-s', rule['cidr']]
+                fw_rules += [' '.join(args)]
+            else:
+                if rule['grantee_group']:
+                    for instance in rule['grantee_group']['instances']:
+                        nw_info = compute_utils.get_nw_info_for_instance(
+                                instance)
+
+                        ips = [ip['address']
+                            for ip in nw_info.fixed_ips()
+                                if ip['version'] == version]
+
+                        LOG.debug('ips: %r', ips, instance=instance)
+                        for ip in ips:
+                            subrule = args + ['-s %s' % ip]
+                            fw_rules += [' '.join(subrule)]
+
+            LOG.debug('Using fw_rules: %r', fw_rules)
+
+        return ipv4_rules, ipv6_rules
+
     def instance_rules(self, instance, network_info):
         ctxt = context.get_admin_context()
 
@@ -361,59 +442,13 @@ class IptablesFirewallDriver(FirewallDriver):
 
         # then, security group chains and rules
         for security_group in security_groups:
-            rules = self._virtapi.security_group_rule_get_by_security_group(
-                ctxt, security_group)
-
-            for rule in rules:
-                LOG.debug(_('Adding security group rule: %r'), rule,
-                          instance=instance)
-
-                if not rule['cidr']:
-                    version = 4
-                else:
-                    version = netutils.get_ip_version(rule['cidr'])
-
-                if version == 4:
-                    fw_rules = ipv4_rules
-                else:
-                    fw_rules = ipv6_rules
-
-                protocol = rule['protocol']
-
-                if protocol:
-                    protocol = rule['protocol'].lower()
-
-                if version == 6 and protocol == 'icmp':
-                    protocol = 'icmpv6'
-
-                args = ['-j ACCEPT']
-                if protocol:
-                    args += ['-p', protocol]
-
-                if protocol in ['udp', 'tcp']:
-                    args += self._build_tcp_udp_rule(rule, version)
-                elif protocol == 'icmp':
-                    args += self._build_icmp_rule(rule, version)
-                if rule['cidr']:
-                    LOG.debug('Using cidr %r', rule['cidr'], instance=instance)
-                    args += ['-s', rule['cidr']]
-                    fw_rules += [' '.join(args)]
-                else:
-                    if rule['grantee_group']:
-                        for instance in rule['grantee_group']['instances']:
-                            nw_info = compute_utils.get_nw_info_for_instance(
-                                    instance)
-
-                            ips = [ip['address']
-                                for ip in nw_info.fixed_ips()
-                                    if ip['version'] == version]
-
-                            LOG.debug('ips: %r', ips, instance=instance)
-                            for ip in ips:
-                                subrule = args + ['-s %s' % ip]
-                                fw_rules += [' '.join(subrule)]
-
-                LOG.debug('Using fw_rules: %r', fw_rules, instance=instance)
+            if security_group['id'] not in self.security_group_rules:
+                self.security_group_rules[security_group['id']] = (
+                    self._security_group_rules(ctxt, security_group))
+            sg_ipv4_rules, sg_ipv6_rules = (
+                self.security_group_rules[security_group['id']])
+            ipv4_rules += sg_ipv4_rules
+            ipv6_rules += sg_ipv6_rules
 
         ipv4_rules += ['-j $sg-fallback']
         ipv6_rules += ['-j $sg-fallback']
@@ -424,16 +459,74 @@ class IptablesFirewallDriver(FirewallDriver):
         pass
 
     def refresh_security_group_members(self, security_group):
-        self.do_refresh_security_group_rules(security_group)
-        self.iptables.apply()
+        self._refresh_rules()
 
     def refresh_security_group_rules(self, security_group):
-        self.do_refresh_security_group_rules(security_group)
-        self.iptables.apply()
+        self._refresh_rules()
 
     def refresh_instance_security_rules(self, instance):
-        self.do_refresh_instance_rules(instance)
-        self.iptables.apply()
+        self._refresh_rules(instance)
+
+    def _refresh_rules(self, instance=None):
+        """Refresh the rules of an instance, or of all the instances.
+
+        When firewall_refresh_delay is set, the refresh is queued and the
+        ones requested until it runs are coalesced into it, so the rules of
+        each affected instance are only recomputed once.
+        """
+        self.refresh_stats['requested'] += 1
+        self.security_group_rules.clear()
+        if instance is None:
+            self.refresh_all_pending = True
+        else:
+            self.refresh_instances_pending[instance['id']] = instance
+
+        if self.refresh_thread is not None:
+            self.refresh_stats['coalesced'] += 1
+            return
+
+        if CONF.firewall_refresh_delay > 0:
+            def _flush():
+                try:
+                    self.flush_pending_refreshes()
+                except Exception:
+                    LOG.exception(_('Failed to refresh the security group '
+                                    'rules'))
+
+            self.refresh_thread = greenthread.spawn_after(
+                CONF.firewall_refresh_delay, _flush)
+        else:
+            self.flush_pending_refreshes()
+
+    def flush_pending_refreshes(self):
+        """Recompute and apply the rules of the instances with pending
+        refreshes in a single iptables apply.
+        """
+        self.refresh_thread = None
+        instances = self.refresh_instances_pending
+        self.refresh_instances_pending = {}
+        if self.refresh_all_pending:
+            self.refresh_all_pending = False
+            for instance in self.instances.values():
+                instances.setdefault(instance['id'], instance)
+
+        deferred = self.iptables.iptables_apply_deferred
+        if not deferred:
+            self.filter_defer_apply_on()
+        try:
+            for instance in instances.values():
+                if instance['id'] not in self.network_infos:
+                    LOG.debug(_('Skipping refresh of the rules of unfiltered '
+                                'instance'), instance=instance)
+                    continue
+                self.do_refresh_instance_rules(instance)
+                self.refresh_stats['instances_refreshed'] += 1
+        finally:
+            if not deferred:
+                self.filter_defer_apply_off()
+        LOG.debug(_('Refreshed the rules of %(count)d instances, '
+                    'refresh stats: %(stats)s'),
+                  {'count': len(instances), 'stats': self.refresh_stats})
 
     @utils.synchronized('iptables', external=True)
     def _inner_do_refresh_rules(self, instance, ipv4_rules,
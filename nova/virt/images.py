@@ -21,8 +21,11 @@
 Handling of VM disk images.
 """
 
+import collections
 import os
 import re
+import struct
+import time
 
 from oslo.config import cfg
 
@@ -40,6 +43,15 @@ image_opts = [
     cfg.BoolOpt('force_raw_images',
                 default=True,
                 help='Force backing images to raw format'),
+    cfg.IntOpt('qemu_img_info_cache_size',
+               default=0,
+               help='Number of images whose qemu-img info is kept in '
+                    'memory until the image file changes. 0 disables the '
+                    'cache.'),
+    cfg.BoolOpt('qemu_img_info_native_qcow2',
+                default=False,
+                help='Read the information of plain qcow2 images from '
+                     'their header instead of running qemu-img info'),
 ]
 
 CONF = cfg.CONF
@@ -163,14 +175,102 @@ class QemuImgInfo(object):
         return contents
 
 
+QCOW2_MAGIC = 'QFI\xfb'
+# The fields of the qcow2 header common to versions 2 and 3, up to the
+# snapshots offset.
+QCOW2_HEADER = struct.Struct('>4sIQIIQIIQQIIQ')
+# Longest backing file name qemu accepts.
+QCOW2_MAX_BACKING_FILE_SIZE = 1023
+
+# Path of an image -> ((inode, size, mtime), QemuImgInfo)
+_qemu_img_info_cache = {}
+# The paths in _qemu_img_info_cache, least recently used first.
+_qemu_img_info_lru = collections.deque()
+
+
+def _qemu_img_info_cache_set(path, value, cache_size):
+    """Store value for path as the most recently used cache entry."""
+    if path in _qemu_img_info_cache:
+        _qemu_img_info_lru.remove(path)
+    _qemu_img_info_cache[path] = value
+    _qemu_img_info_lru.append(path)
+    while len(_qemu_img_info_lru) > cache_size:
+        del _qemu_img_info_cache[_qemu_img_info_lru.popleft()]
+
+
+def _qcow2_img_info(path, stat):
+    """Return a QemuImgInfo read from the header of a qcow2 image.
+
+    None is returned when the image isn't a qcow2 image qemu-img info would
+    describe with the header fields alone, like an encrypted image or one
+    with snapshots.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(QCOW2_HEADER.size)
+        if len(header) != QCOW2_HEADER.size:
+            return None
+        (magic, version, backing_file_offset, backing_file_size,
+         cluster_bits, size, crypt_method, _l1_size, _l1_table_offset,
+         _refcount_table_offset, _refcount_table_clusters, nb_snapshots,
+         _snapshots_offset) = QCOW2_HEADER.unpack(header)
+        if (magic != QCOW2_MAGIC or version not in (2, 3) or
+                not 9 <= cluster_bits <= 21 or crypt_method or nb_snapshots):
+            return None
+
+        backing_file = None
+        if backing_file_offset:
+            if backing_file_size > QCOW2_MAX_BACKING_FILE_SIZE:
+                return None
+            f.seek(backing_file_offset)
+            backing_file = f.read(backing_file_size)
+            if len(backing_file) != backing_file_size:
+                return None
+
+    info = QemuImgInfo()
+    info.image = path
+    info.file_format = 'qcow2'
+    info.virtual_size = size
+    info.cluster_size = 1 << cluster_bits
+    info.disk_size = stat.st_blocks * 512
+    if backing_file:
+        # qemu-img reports the actual path of a relative backing file,
+        # which is relative to the directory of the image.
+        info.backing_file = os.path.join(os.path.dirname(path),
+                                         backing_file)
+    return info
+
+
+def _execute_qemu_img_info(path):
+    out, err = utils.execute('env', 'LC_ALL=C', 'LANG=C',
+                             'qemu-img', 'info', path)
+    return QemuImgInfo(out)
+
+
 def qemu_img_info(path):
     """Return an object containing the parsed output from qemu-img info."""
     if not os.path.exists(path):
         return QemuImgInfo()
 
-    out, err = utils.execute('env', 'LC_ALL=C', 'LANG=C',
-                             'qemu-img', 'info', path)
-    return QemuImgInfo(out)
+    cache_size = CONF.qemu_img_info_cache_size
+    if cache_size <= 0 and not CONF.qemu_img_info_native_qcow2:
+        return _execute_qemu_img_info(path)
+
+    stat = os.stat(path)
+    key = (stat.st_ino, stat.st_size, stat.st_mtime)
+    cached = _qemu_img_info_cache.get(path)
+    if cached and cached[0] == key:
+        _qemu_img_info_cache_set(path, cached, cache_size)
+        return cached[1]
+
+    info = None
+    if CONF.qemu_img_info_native_qcow2:
+        info = _qcow2_img_info(path, stat)
+    if info is None:
+        info = _execute_qemu_img_info(path)
+
+    if cache_size > 0:
+        _qemu_img_info_cache_set(path, (key, info), cache_size)
+    return info
 
 
 def convert_image(source, dest, out_format, run_as_root=False):
@@ -179,7 +279,43 @@ def convert_image(source, dest, out_format, run_as_root=False):
     utils.execute(*cmd, run_as_root=run_as_root)
 
 
-def fetch(context, image_href, path, _user_id, _project_id):
+class BandwidthLimiter(object):
+    """Limit the rate of the data written through it.
+
+    One limiter may be shared by several downloads, which then share
+    its rate between them.
+    """
+
+    def __init__(self, bytes_per_second):
+        self.bytes_per_second = float(bytes_per_second)
+        self._next_write = 0
+
+    def consume(self, size):
+        """Sleep until size more bytes may be written."""
+        now = time.time()
+        delay = self._next_write - now
+        self._next_write = (max(self._next_write, now) +
+                            size / self.bytes_per_second)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _LimitedFile(object):
+    """File wrapper whose writes are paced by a BandwidthLimiter."""
+
+    def __init__(self, image_file, limiter):
+        self._file = image_file
+        self._limiter = limiter
+
+    def write(self, data):
+        self._limiter.consume(len(data))
+        self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def fetch(context, image_href, path, _user_id, _project_id, limiter=None):
     # TODO(vish): Improve context handling and add owner and auth data
     #             when it is added to glance.  Right now there is no
     #             auth checking in glance, so we assume that access was
@@ -188,12 +324,16 @@ def fetch(context, image_href, path, _user_id, _project_id):
                                                                 image_href)
     with fileutils.remove_path_on_error(path):
         with open(path, "wb") as image_file:
+            if limiter is not None:
+                image_file = _LimitedFile(image_file, limiter)
             image_service.download(context, image_id, image_file)
 
 
-def fetch_to_raw(context, image_href, path, user_id, project_id):
+def fetch_to_raw(context, image_href, path, user_id, project_id,
+                 limiter=None):
     path_tmp = "%s.part" % path
-    fetch(context, image_href, path_tmp, user_id, project_id)
+    fetch(context, image_href, path_tmp, user_id, project_id,
+          limiter=limiter)
 
     with fileutils.remove_path_on_error(path_tmp):
         data = qemu_img_info(path_tmp)
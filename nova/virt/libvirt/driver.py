@@ -88,6 +88,7 @@ from nova.virt.disk import api as disk
 from nova.virt import driver
 from nova.virt import event as virtevent
 from nova.virt import firewall
+from nova.virt import images
 from nova.virt.libvirt import blockinfo
 from nova.virt.libvirt import config as vconfig
 from nova.virt.libvirt import firewall as libvirt_firewall
@@ -210,6 +211,14 @@ libvirt_opts = [
     cfg.StrOpt('vcpu_pin_set',
                 help='Which pcpus can be used by vcpus of instance '
                      'e.g: "4-12,^8,15"'),
+    cfg.IntOpt('image_prefetch_concurrency',
+               default=2,
+               help='Number of images prefetched into the image cache at '
+                    'the same time'),
+    cfg.IntOpt('image_prefetch_max_kbps',
+               default=0,
+               help='Maximum rate in KiB/s shared by the image prefetch '
+                    'downloads. 0 means unlimited'),
     ]
 
 CONF = cfg.CONF
@@ -735,6 +744,37 @@ class LibvirtDriver(driver.ComputeDriver):
 
         return list(uuids)
 
+    def list_instance_power_states(self):
+        """Efficient override of base list_instance_power_states method."""
+        power_states = {}
+
+        def add_domain(domain):
+            try:
+                state = domain.info()[0]
+            except libvirt.libvirtError:
+                # Ignore instance deleted after the lookup
+                return
+            power_states[domain.UUIDString()] = LIBVIRT_POWER_STATE[state]
+
+        for domain_id in self.list_instance_ids():
+            try:
+                # We skip domains with ID 0 (hypervisors).
+                if domain_id != 0:
+                    add_domain(self._lookup_by_id(domain_id))
+            except exception.InstanceNotFound:
+                # Ignore deleted instance while listing
+                continue
+
+        # extend the states to contain also defined domains
+        for domain_name in self._conn.listDefinedDomains():
+            try:
+                add_domain(self._lookup_by_name(domain_name))
+            except exception.InstanceNotFound:
+                # Ignore deleted instance while listing
+                continue
+
+        return power_states
+
     def plug_vifs(self, instance, network_info):
         """Plug VIFs into networks."""
         for vif in network_info:
@@ -2837,9 +2877,57 @@ class LibvirtDriver(driver.ComputeDriver):
 
         return info
 
-    def get_vcpu_used(self):
+    def get_domain_inventory(self):
+        """Take a snapshot of the domains of the host.
+
+        Each domain is looked up once, and its info, vcpus and XML
+        description are read, so that all the host resource figures of an
+        audit can be derived from the snapshot.
+
+        :returns: a list of dicts with the id (None for the domains that
+                  aren't running), name, info, vcpus and xml of each domain.
+
+        """
+        domains = []
+
+        def add_domain(domain_id, lookup, key):
+            try:
+                dom = lookup(key)
+                domain = {'id': domain_id,
+                          'name': dom.name(),
+                          'info': None,
+                          'vcpus': None,
+                          'xml': None}
+                if domain_id is not None:
+                    domain['info'] = dom.info()
+                    if CONF.libvirt_type != 'lxc':
+                        domain['vcpus'] = dom.vcpus()
+                # The xml is only used for the disks of the instances
+                if domain_id != 0:
+                    domain['xml'] = dom.XMLDesc(0)
+            except exception.InstanceNotFound:
+                LOG.info(_("libvirt can't find a domain with id: %s") % key)
+                return
+            except libvirt.libvirtError as ex:
+                # The domain went away after the lookup
+                LOG.info(_("Error from libvirt while reading domain "
+                           "%(key)s: %(ex)s"), {'key': key, 'ex': ex})
+                return
+            domains.append(domain)
+            # NOTE(gtt116): give change to do other task.
+            greenthread.sleep(0)
+
+        for domain_id in self.list_instance_ids():
+            add_domain(domain_id, self._lookup_by_id, domain_id)
+        for domain_name in self._conn.listDefinedDomains():
+            add_domain(None, self._lookup_by_name, domain_name)
+        return domains
+
+    def get_vcpu_used(self, domains=None):
         """Get vcpu usage number of physical computer.
 
+        :param domains: snapshot from get_domain_inventory() to use instead
+                        of looking up the domains.
         :returns: The total number of vcpu that currently used.
 
         """
@@ -2848,26 +2936,35 @@ class LibvirtDriver(driver.ComputeDriver):
         if CONF.libvirt_type == 'lxc':
             return total + 1
 
-        dom_ids = self.list_instance_ids()
-        for dom_id in dom_ids:
-            try:
-                dom = self._lookup_by_id(dom_id)
-                vcpus = dom.vcpus()
-                if vcpus is None:
-                    LOG.debug(_("couldn't obtain the vpu count from domain id:"
-                                " %s") % dom_id)
-                else:
-                    total += len(vcpus[1])
-            except exception.InstanceNotFound:
-                LOG.info(_("libvirt can't find a domain with id: %s") % dom_id)
+        if domains is None:
+            domains = []
+            for dom_id in self.list_instance_ids():
+                try:
+                    dom = self._lookup_by_id(dom_id)
+                    domains.append({'id': dom_id, 'vcpus': dom.vcpus()})
+                except exception.InstanceNotFound:
+                    LOG.info(_("libvirt can't find a domain with id: %s")
+                             % dom_id)
+                    continue
+                # NOTE(gtt116): give change to do other task.
+                greenthread.sleep(0)
+
+        for domain in domains:
+            if domain['id'] is None:
                 continue
-            # NOTE(gtt116): give change to do other task.
-            greenthread.sleep(0)
+            vcpus = domain['vcpus']
+            if vcpus is None:
+                LOG.debug(_("couldn't obtain the vpu count from domain id:"
+                            " %s") % domain['id'])
+            else:
+                total += len(vcpus[1])
         return total
 
-    def get_memory_mb_used(self):
+    def get_memory_mb_used(self, domains=None):
         """Get the free memory size(MB) of physical computer.
 
+        :param domains: snapshot from get_domain_inventory() to use instead
+                        of looking up the domains.
         :returns: the total usage of memory(MB).
 
         """
@@ -2880,16 +2977,23 @@ class LibvirtDriver(driver.ComputeDriver):
         idx2 = m.index('Buffers:')
         idx3 = m.index('Cached:')
         if CONF.libvirt_type == 'xen':
+            if domains is None:
+                domains = []
+                for domain_id in self.list_instance_ids():
+                    try:
+                        info = self._lookup_by_id(domain_id).info()
+                    except exception.InstanceNotFound:
+                        LOG.info(_("libvirt can't find a domain with id: %s")
+                                 % domain_id)
+                        continue
+                    domains.append({'id': domain_id, 'info': info})
             used = 0
-            for domain_id in self.list_instance_ids():
-                try:
-                    dom_mem = int(self._lookup_by_id(domain_id).info()[2])
-                except exception.InstanceNotFound:
-                    LOG.info(_("libvirt can't find a domain with id: %s")
-                             % domain_id)
+            for domain in domains:
+                if domain['id'] is None:
                     continue
+                dom_mem = int(domain['info'][2])
                 # skip dom0
-                if domain_id != 0:
+                if domain['id'] != 0:
                     used += dom_mem
                 else:
                     # the mem reported by dom0 is be greater of what
@@ -3691,15 +3795,27 @@ class LibvirtDriver(driver.ComputeDriver):
                               'over_committed_disk_size': over_commit_size})
         return jsonutils.dumps(disk_info)
 
-    def get_disk_over_committed_size_total(self):
-        """Return total over committed disk size for all instances."""
+    def get_disk_over_committed_size_total(self, domains=None):
+        """Return total over committed disk size for all instances.
+
+        :param domains: snapshot from get_domain_inventory() to use instead
+                        of looking up the instances.
+
+        """
         # Disk size that all instance uses : virtual_size - disk_size
-        instances_name = self.list_instances()
+        if domains is None:
+            domains = [{'id': None, 'name': i_name, 'xml': None}
+                       for i_name in self.list_instances()]
         disk_over_committed_size = 0
-        for i_name in instances_name:
+        for domain in domains:
+            # We skip domains with ID 0 (hypervisors).
+            if domain['id'] == 0:
+                continue
+            i_name = domain['name']
             try:
                 disk_infos = jsonutils.loads(
-                        self.get_instance_disk_info(i_name))
+                        self.get_instance_disk_info(i_name,
+                                                    xml=domain['xml']))
                 for info in disk_infos:
                     disk_over_committed_size += int(
                         info['over_committed_disk_size'])
@@ -3739,6 +3855,29 @@ class LibvirtDriver(driver.ComputeDriver):
         """Manage the local cache of images."""
         self.image_cache_manager.verify_base_images(context, all_instances)
 
+    def prefetch_images(self, context, image_ids):
+        """Download images into the local cache in the background."""
+        greenthread.spawn(self._prefetch_images, context, image_ids)
+
+    def _prefetch_images(self, context, image_ids):
+        limiter = None
+        if CONF.image_prefetch_max_kbps > 0:
+            limiter = images.BandwidthLimiter(
+                    CONF.image_prefetch_max_kbps * 1024)
+
+        def prefetch_image(image_id):
+            try:
+                self.image_cache_manager.prefetch_image(context, image_id,
+                                                        limiter=limiter)
+            except Exception:
+                LOG.exception(_('Failed to prefetch image %s'), image_id)
+
+        pool = eventlet.GreenPool(max(1, CONF.image_prefetch_concurrency))
+        for image_id in image_ids:
+            pool.spawn_n(prefetch_image, image_id)
+        pool.waitall()
+        LOG.debug(_('Finished prefetching images: %s'), ', '.join(image_ids))
+
     def _cleanup_remote_migration(self, dest, inst_base, inst_base_resize,
                                   shared_storage=False):
         """Used only for cleanup in case migrate_disk_and_power_off fails."""
@@ -4111,20 +4250,33 @@ class HostState(object):
 
             """
             disk_free_gb = disk_info_dict['free']
-            disk_over_committed = (self.driver.
-                    get_disk_over_committed_size_total())
+            disk_over_committed = timed(
+                'disk', self.driver.get_disk_over_committed_size_total,
+                domains=domains)
             # Disk available least size
             available_least = disk_free_gb * (1024 ** 3) - disk_over_committed
             return (available_least / (1024 ** 3))
 
+        timings = []
+
+        def timed(stage, func, *args, **kwargs):
+            start = time.time()
+            result = func(*args, **kwargs)
+            timings.append('%s %.3fs' % (stage, time.time() - start))
+            return result
+
         LOG.debug(_("Updating host stats"))
+        domains = timed('domains', self.driver.get_domain_inventory)
         disk_info_dict = self.driver.get_local_gb_info()
         data = {}
         data["vcpus"] = self.driver.get_vcpu_total()
         data["memory_mb"] = self.driver.get_memory_mb_total()
         data["local_gb"] = disk_info_dict['total']
-        data["vcpus_used"] = self.driver.get_vcpu_used()
-        data["memory_mb_used"] = self.driver.get_memory_mb_used()
+        data["vcpus_used"] = timed('vcpus', self.driver.get_vcpu_used,
+                                   domains=domains)
+        data["memory_mb_used"] = timed('memory',
+                                       self.driver.get_memory_mb_used,
+                                       domains=domains)
         data["local_gb_used"] = disk_info_dict['used']
         data["hypervisor_type"] = self.driver.get_hypervisor_type()
         data["hypervisor_version"] = self.driver.get_hypervisor_version()
@@ -4135,6 +4287,9 @@ class HostState(object):
         data["supported_instances"] = \
             self.driver.get_instance_capabilities()
 
+        LOG.debug(_("Host stats of %(count)d domains updated in: "
+                    "%(timings)s"),
+                  {'count': len(domains), 'timings': ', '.join(timings)})
         self._stats = data
 
         return data
@@ -320,6 +320,7 @@ class IptablesFirewallDriver(base_firewall.IptablesFirewallDriver):
         if self.instances.pop(instance['id'], None):
             # NOTE(vish): use the passed info instead of the stored info
             self.network_infos.pop(instance['id'])
+            self.security_group_rules.clear()
             self.remove_filters_for_instance(instance)
             self.iptables.apply()
             self.nwfilter.unfilter_instance(instance, network_info)
@@ -68,6 +68,10 @@ imagecache_opts = [
                default=(24 * 3600),
                help='Unused unresized base images younger than this will not '
                     'be removed'),
+    cfg.IntOpt('remove_unused_prefetched_minimum_age_seconds',
+               default=(7 * 24 * 3600),
+               help='Unused prefetched base images younger than this will '
+                    'not be removed'),
     cfg.BoolOpt('checksum_base_images',
                 default=False,
                 help='Write a checksum for files in _base to disk'),
@@ -255,6 +259,35 @@ class ImageCacheManager(object):
         self.removable_base_files = []
         self.unexplained_images = []
 
+    def prefetch_image(self, context, image_id, limiter=None):
+        """Download an image into _base ahead of its first use.
+
+        The image is fetched under the same lock and to the same file as
+        when an instance is spawned from it, and is marked as prefetched
+        so that it is not removed while waiting for that instance.
+        """
+        base_dir = os.path.join(CONF.instances_path, CONF.base_dir_name)
+        fileutils.ensure_tree(base_dir)
+        fname = get_cache_fname({'image_id': image_id}, 'image_id')
+        base_file = os.path.join(base_dir, fname)
+
+        @utils.synchronized(fname, external=True, lock_path=self.lock_path)
+        def fetch_if_not_exists():
+            if os.path.exists(base_file):
+                LOG.info(_('image %(id)s at (%(base_file)s): already '
+                           'cached'),
+                         {'id': image_id, 'base_file': base_file})
+                os.utime(base_file, None)
+            else:
+                LOG.info(_('image %(id)s at (%(base_file)s): prefetching'),
+                         {'id': image_id, 'base_file': base_file})
+                virtutils.fetch_image(context, base_file, image_id,
+                                      context.user_id, context.project_id,
+                                      limiter=limiter)
+
+        fetch_if_not_exists()
+        write_stored_info(base_file, field='prefetched', value=image_id)
+
     def _store_image(self, base_dir, ent, original=False):
         """Store a base image for later examination."""
         entpath = os.path.join(base_dir, ent)
@@ -464,6 +497,12 @@ class ImageCacheManager(object):
         maxage = CONF.remove_unused_resized_minimum_age_seconds
         if base_file in self.originals:
             maxage = CONF.remove_unused_original_minimum_age_seconds
+            # The info file is only read for originals which are old
+            # enough to remove, but young enough to keep if prefetched.
+            prefetched = CONF.remove_unused_prefetched_minimum_age_seconds
+            if (maxage <= age < prefetched and
+                    read_stored_info(base_file, field='prefetched')):
+                maxage = prefetched
 
         if age < maxage:
             LOG.info(_('Base file too young to remove: %s'),
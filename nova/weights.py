@@ -17,6 +17,8 @@
 Pluggable Weighing support
 """
 
+import time
+
 from nova import loadables
 
 
@@ -48,24 +50,41 @@ class BaseWeigher(object):
         """Weigh multiple objects.  Override in a subclass if you need
         need access to all objects in order to manipulate weights.
         """
+        multiplier = self._weight_multiplier()
         for obj in weighed_obj_list:
-            obj.weight += (self._weight_multiplier() *
+            obj.weight += (multiplier *
                            self._weigh_object(obj.obj, weight_properties))
 
 
 class BaseWeightHandler(loadables.BaseLoader):
     object_class = WeighedObject
 
+    def _make_weighed_objects(self, obj_list):
+        """Return the list of WeighedObjects given to the weighers."""
+        return [self.object_class(obj, 0.0) for obj in obj_list]
+
     def get_weighed_objects(self, weigher_classes, obj_list,
-            weighing_properties):
-        """Return a sorted (highest score first) list of WeighedObjects."""
+            weighing_properties, timings=None):
+        """Return a sorted (highest score first) list of WeighedObjects.
+
+        If a timings list is given, a dict with the weigher's name, its
+        wall time in seconds and the number of objects it weighed is
+        appended to it for every weigher.
+        """
 
         if not obj_list:
             return []
 
-        weighed_objs = [self.object_class(obj, 0.0) for obj in obj_list]
+        weighed_objs = self._make_weighed_objects(obj_list)
         for weigher_cls in weigher_classes:
             weigher = weigher_cls()
+            if timings is None:
+                weigher.weigh_objects(weighed_objs, weighing_properties)
+                continue
+            start = time.time()
             weigher.weigh_objects(weighed_objs, weighing_properties)
+            timings.append({'name': weigher_cls.__name__,
+                            'seconds': time.time() - start,
+                            'objects': len(weighed_objs)})
 
         return sorted(weighed_objs, key=lambda x: x.weight, reverse=True)